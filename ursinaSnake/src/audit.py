@@ -0,0 +1,102 @@
+from ursina import *
+
+
+class EntityAuditor:
+    """Counts the scene's entities per owning subsystem to catch leaks.
+
+    Each subsystem registers which entities belong to it (by class or a
+    predicate) and, optionally, every entity it still holds on to -
+    active ones plus anything parked in a pool. A snapshot walks
+    scene.entities once and sorts each entity into live, disabled or
+    orphaned: an entity is orphaned when its subsystem no longer holds
+    it, or when it has been detached from the scene graph without being
+    destroyed. Child entities (labels, shields, markers) count towards
+    the subsystem of their outermost registered ancestor.
+    """
+
+    def __init__(self):
+        self.owners = []      # (name, matches(entity), held() or None)
+        self.snapshots = []   # (label, counts)
+        self.restart_counts = []  # counts taken at every restart
+
+    def register(self, name, kinds, held=None):
+        """kinds is a class, a tuple of classes or a predicate; held() returns the entities name still owns"""
+        if isinstance(kinds, (type, tuple)):
+            classes = kinds
+            kinds = lambda entity: isinstance(entity, classes)
+        self.owners.append((name, kinds, held))
+
+    def owner_of(self, entity):
+        """(subsystem name, root entity) for an entity, using its outermost registered ancestor"""
+        owner, root = None, entity
+        node = entity
+        while isinstance(node, Entity):
+            for name, matches, _ in self.owners:
+                if matches(node):
+                    owner, root = name, node
+                    break
+            node = node.parent
+        return owner or 'other', root
+
+    def count(self):
+        """{subsystem: {'live': n, 'disabled': n, 'orphaned': n}} for the current scene"""
+        held = {name: set(held()) for name, _, held in self.owners if held is not None}
+        counts = {}
+        for entity in scene.entities:
+            name, root = self.owner_of(entity)
+            bucket = counts.setdefault(name, {'live': 0, 'disabled': 0, 'orphaned': 0})
+            detached = entity.getParent().isEmpty() and entity is not scene
+            if detached or (name in held and root not in held[name]):
+                bucket['orphaned'] += 1
+            elif entity.enabled and root.enabled:
+                bucket['live'] += 1
+            else:
+                bucket['disabled'] += 1
+        return counts
+
+    def snapshot(self, label=None):
+        counts = self.count()
+        self.snapshots.append((label or f'snapshot {len(self.snapshots)}', counts))
+        return counts
+
+    def on_restart(self):
+        self.restart_counts.append(self.count())
+
+    @staticmethod
+    def diff(before, after):
+        """{subsystem: {state: change}} for every count that changed between two snapshots"""
+        changes = {}
+        for name in sorted(set(before) | set(after)):
+            old, new = before.get(name, {}), after.get(name, {})
+            delta = {state: new.get(state, 0) - old.get(state, 0) for state in ('live', 'disabled', 'orphaned')}
+            delta = {state: value for state, value in delta.items() if value}
+            if delta:
+                changes[name] = delta
+        return changes
+
+    def leaks(self, window=3):
+        """Subsystems whose entity count grew at each of the last window restarts"""
+        if len(self.restart_counts) < window + 1:
+            return []
+        recent = self.restart_counts[-(window + 1):]
+        total = lambda counts, name: sum(counts.get(name, {}).values())
+        names = set().union(*recent)
+        return sorted(
+            name for name in names
+            if all(total(after, name) > total(before, name) for before, after in zip(recent, recent[1:]))
+        )
+
+    def report(self, label=None):
+        """Print the current counts, the change since the last snapshot and any suspected leaks"""
+        previous = self.snapshots[-1][1] if self.snapshots else {}
+        counts = self.snapshot(label)
+        print(f"Entity audit ({self.snapshots[-1][0]}): {len(scene.entities)} entities")
+        for name in sorted(counts):
+            c = counts[name]
+            print(f"  {name:<12} live {c['live']:>5}  disabled {c['disabled']:>5}  orphaned {c['orphaned']:>5}")
+        for name, delta in self.diff(previous, counts).items():
+            print(f"  change {name}: " + ", ".join(f"{state} {value:+d}" for state, value in delta.items()))
+        leaking = self.leaks()
+        if leaking:
+            print(f"  Growing across restarts: {', '.join(leaking)}")
+        return counts
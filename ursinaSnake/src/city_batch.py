@@ -0,0 +1,66 @@
+from ursina import *
+from layers import layer_of
+
+
+class StaticRecord:
+    """Gameplay side of a static city entity whose geometry was merged into a chunk.
+
+    Keeps what the rest of the game still asks about - name, collision
+    layer and world bounds - after the entity itself has been destroyed.
+    """
+
+    __slots__ = ('name', 'collision_layer', 'bounds', 'chunk')
+
+    def __init__(self, name, collision_layer, bounds, chunk):
+        self.name = name
+        self.collision_layer = collision_layer
+        self.bounds = bounds  # (low, high) world-space corners, as from getTightBounds
+        self.chunk = chunk    # (cx, cz) of the chunk holding its geometry
+
+    def __repr__(self):
+        return f"StaticRecord({self.name!r})"
+
+
+class CityChunk(Entity):
+    """One chunk of the city: its static geometry flattened into as few geoms as possible.
+
+    Also owns whatever else was built for the chunk, so it can be torn
+    down in one go: the records of its merged entities, the entities that
+    still move (collapsible buildings, bridges), the pooled vehicles on
+    its roads and its rasterized footprint.
+    """
+
+    def __init__(self, key, chunk_size):
+        super().__init__(name=f'city_chunk_{key[0]}_{key[1]}')
+        self.key = key
+        self.chunk_size = chunk_size
+        self.records = []
+        self.entities = []
+        self.vehicles = []
+        self.footprint = None  # OccupancyGrid of just this chunk, redone only when it changes
+
+
+def entity_tree(entity):
+    """An entity followed by all of its descendant entities"""
+    yield entity
+    for child in entity.children:
+        yield from entity_tree(child)
+
+
+def merge_static(chunk, entity):
+    """Copy a static entity's geometry into chunk and destroy the entity; returns its StaticRecord.
+
+    Every model under the entity is copied with its world transform,
+    texture, UV transform and colour. Once everything is merged, flatten
+    the chunk (chunk.flattenStrong()), so geometry sharing a render state
+    becomes a single geom.
+    """
+    record = StaticRecord(entity.name, layer_of(entity), entity.getTightBounds(scene), chunk.key)
+    chunk.records.append(record)
+    for part in entity_tree(entity):
+        if part.model and part.enabled:
+            transform = part.model.getTransform(chunk)
+            copy = part.model.copyTo(chunk)
+            copy.setTransform(transform)
+    destroy(entity)
+    return record
@@ -0,0 +1,229 @@
+import os
+import math
+import random
+import argparse
+import numpy as np
+from collections import OrderedDict
+from facades import VARIANTS_PER_COLOR
+
+CHUNK_SIZE = 32     # World units per side of a streamed chunk
+LOT_SPACING = 8     # Building lots sit on this grid, offset by half a lot
+ROAD_SPACING = 16   # Roads run along every other gap between lots
+OBSTACLES_PER_CHUNK = 4
+REGION_SIZE = 16    # Chunks per side of a region, the unit layouts are generated and cached in
+MAX_OPEN_REGIONS = 4
+
+BUILDING_HEIGHTS = [(5, 10), (4, 7), (6, 12), (4, 8)]  # Height range of each building style
+OBSTACLE_TYPES = ["firehydrant", "trash_A", "trash_B", "dumpster", "bench"]
+LANE_AXES = ('ew', 'ns')
+
+LAYOUT_VERSION = 1  # Bump whenever generate_chunk or a table changes, so older cached layouts are ignored
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "city")
+
+# One structured array per kind of thing in a chunk, in world units
+TABLES = {
+    'buildings': np.dtype([
+        ('x', 'f4'), ('z', 'f4'), ('width', 'u1'), ('depth', 'u1'), ('height', 'u1'),
+        ('style', 'u1'), ('variant', 'u1'), ('collapsible', '?'),
+    ]),
+    'obstacles': np.dtype([('x', 'f4'), ('z', 'f4'), ('kind', 'u1')]),  # kind indexes OBSTACLE_TYPES
+    'bridges': np.dtype([('a', 'u2'), ('b', 'u2')]),  # Indices into the chunk's buildings
+    # A stretch of road with one car on it: the road runs along axis at offset, from low to high
+    'lanes': np.dtype([
+        ('axis', 'u1'), ('offset', 'f4'), ('low', 'f4'), ('high', 'f4'),
+        ('start', 'f4'), ('direction', 'i1'), ('speed', 'f4'), ('r', 'u1'), ('g', 'u1'), ('b', 'u1'),
+    ]),
+}
+
+
+def chunk_key(x, z, chunk_size=CHUNK_SIZE):
+    return int(x // chunk_size), int(z // chunk_size)
+
+
+class ChunkLayout:
+    """Where everything in one chunk goes, as one NumPy table per kind of thing (see TABLES).
+
+    The tables are often views into a memory-mapped region file, so treat
+    them as read-only.
+    """
+
+    def __init__(self, key, chunk_size, buildings, obstacles, bridges, lanes):
+        self.key = key
+        self.chunk_size = chunk_size
+        self.origin = (key[0] * chunk_size, key[1] * chunk_size)  # World x, z of the chunk's low corner
+        self.buildings = buildings
+        self.obstacles = obstacles
+        self.bridges = bridges
+        self.lanes = lanes
+
+
+def generate_chunk(seed, key, chunk_size=CHUNK_SIZE):
+    """Layout of one chunk; the same seed and key always give the same chunk"""
+    rng = random.Random(f"{seed}:{key[0]}:{key[1]}")
+    x0, z0 = key[0] * chunk_size, key[1] * chunk_size
+
+    # Buildings on a grid of lots, some of them left empty
+    buildings = []
+    for lot_x in range(LOT_SPACING // 2, chunk_size, LOT_SPACING):
+        for lot_z in range(LOT_SPACING // 2, chunk_size, LOT_SPACING):
+            if rng.random() < 0.3:
+                continue
+            style = rng.randrange(len(BUILDING_HEIGHTS))
+            buildings.append((
+                x0 + lot_x + rng.uniform(-1, 1), z0 + lot_z + rng.uniform(-1, 1),
+                rng.randint(2, 4), rng.randint(2, 4), rng.randint(*BUILDING_HEIGHTS[style]),
+                style, rng.randrange(VARIANTS_PER_COLOR), rng.random() < 0.15
+            ))
+
+    # Bridges between some of the buildings 8-15 units apart (centre to centre)
+    bridges = []
+    centers = [(x, height / 2, z) for x, z, _, _, height, *_ in buildings]
+    for i in range(len(centers)):
+        for j in range(i + 1, len(centers)):
+            if 8 <= math.dist(centers[i], centers[j]) <= 15 and rng.random() < 0.25:
+                bridges.append((i, j))
+
+    obstacles = [
+        (x0 + rng.uniform(0, chunk_size), z0 + rng.uniform(0, chunk_size), rng.randrange(len(OBSTACLE_TYPES)))
+        for _ in range(OBSTACLES_PER_CHUNK)
+    ]
+
+    # One car on every stretch of road in the chunk, turning back at the chunk's edges
+    lanes = []
+    for offset in range(0, chunk_size, ROAD_SPACING):
+        for axis, (low, across) in enumerate([(x0, z0), (z0, x0)]):
+            direction = 1 if rng.random() >= 0.5 else -1
+            speed = rng.uniform(3, 8)
+            tint = [int(rng.random() * 255) for _ in range(3)]
+            start = rng.uniform(low, low + chunk_size)
+            lanes.append((axis, across + offset, low, low + chunk_size, start, direction, speed, *tint))
+
+    return ChunkLayout(key, chunk_size, **{
+        name: np.array(rows, dtype=TABLES[name])
+        for name, rows in (('buildings', buildings), ('obstacles', obstacles), ('bridges', bridges), ('lanes', lanes))
+    })
+
+
+def generate_region(seed, region, chunk_size=CHUNK_SIZE, region_size=REGION_SIZE):
+    """(index, tables) of every chunk in a region.
+
+    Each table holds the rows of all the region's chunks back to back,
+    x-major; index[c] holds where chunk c's rows start in each table, in
+    TABLES order, and index[c + 1] where they end.
+    """
+    layouts = [
+        generate_chunk(seed, (region[0] * region_size + i, region[1] * region_size + j), chunk_size)
+        for i in range(region_size) for j in range(region_size)
+    ]
+    index = np.zeros((len(layouts) + 1, len(TABLES)), dtype=np.int32)
+    for row, layout in enumerate(layouts):
+        index[row + 1] = index[row] + [len(getattr(layout, name)) for name in TABLES]
+    tables = {name: np.concatenate([getattr(layout, name) for layout in layouts]) for name in TABLES}
+    return index, tables
+
+
+class CityLayout:
+    """Seeded layout of an unbounded city, generated a region at a time and cached on disk.
+
+    A region's index and tables (see generate_region) are saved as .npy
+    files under cache_dir and memory-mapped when read back, so only the
+    pages of the chunks actually asked for are read. A region that is
+    already cached is never generated again. With cache_dir None nothing
+    is written or read, for seeds that won't be asked for again. At most
+    max_open regions are kept open, least recently used dropped first.
+    """
+
+    def __init__(self, seed, chunk_size=CHUNK_SIZE, region_size=REGION_SIZE, cache_dir=CACHE_DIR,
+                 max_open=MAX_OPEN_REGIONS):
+        self.seed = int(seed)
+        self.chunk_size = chunk_size
+        self.region_size = region_size
+        self.cache_dir = None if cache_dir is None else os.path.join(
+            cache_dir, f"v{LAYOUT_VERSION}_{self.seed}_{chunk_size}_{region_size}")
+        self.max_open = max_open
+        self.regions = OrderedDict()  # {region: (index, tables)}
+        self.generated = 0  # Regions generated rather than read from the cache
+
+    def region_of(self, key):
+        return key[0] // self.region_size, key[1] // self.region_size
+
+    def chunk(self, key):
+        """ChunkLayout of the chunk at key"""
+        region = self.region_of(key)
+        index, tables = self.region(region)
+        row = (key[0] - region[0] * self.region_size) * self.region_size + (key[1] - region[1] * self.region_size)
+        start, end = index[row], index[row + 1]
+        return ChunkLayout(key, self.chunk_size, **{
+            name: tables[name][start[column]:end[column]] for column, name in enumerate(TABLES)
+        })
+
+    def region(self, region):
+        """(index, tables) of a region, from memory, the disk cache or freshly generated"""
+        if region in self.regions:
+            self.regions.move_to_end(region)
+            return self.regions[region]
+        data = self.load(region)
+        if data is None:
+            data = generate_region(self.seed, region, self.chunk_size, self.region_size)
+            self.generated += 1
+            try:
+                self.save(region, *data)
+            except OSError as e:
+                print(f"Could not cache city region {region}: {e}")
+        self.regions[region] = data
+        while len(self.regions) > self.max_open:
+            self.regions.popitem(last=False)
+        return data
+
+    def path(self, region, name):
+        return os.path.join(self.cache_dir, f"{region[0]}_{region[1]}_{name}.npy")
+
+    def load(self, region):
+        if self.cache_dir is None:
+            return None
+        index_path = self.path(region, 'index')
+        if not os.path.exists(index_path):
+            return None
+        try:
+            index = np.load(index_path, mmap_mode='r')
+            tables = {name: np.load(self.path(region, name), mmap_mode='r') for name in TABLES}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable city region {region} in {self.cache_dir}: {e}")
+            return None
+        if index.shape != (self.region_size ** 2 + 1, len(TABLES)) or any(
+                tables[name].dtype != dtype or len(tables[name]) != index[-1, column]
+                for column, (name, dtype) in enumerate(TABLES.items())):
+            print(f"Ignoring mismatched city region {region} in {self.cache_dir}")
+            return None
+        return index, tables
+
+    def save(self, region, index, tables):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # The index goes last: a region only counts as cached once its tables are all in place
+        for name, array in [*tables.items(), ('index', index)]:
+            path = self.path(region, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)  # Never leave a half-written file under the real name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and cache the city layout around the origin")
+    parser.add_argument('--seed', type=int, required=True, help="city seed")
+    parser.add_argument('--radius', type=int, default=1, help="regions to generate on each side of the origin's")
+    args = parser.parse_args()
+
+    layout = CityLayout(args.seed)
+    for rx in range(-args.radius, args.radius + 1):
+        for rz in range(-args.radius, args.radius + 1):
+            layout.region((rx, rz))
+    size = sum(os.path.getsize(os.path.join(layout.cache_dir, name)) for name in os.listdir(layout.cache_dir))
+    print(f"{layout.generated} regions generated, {(2 * args.radius + 1) ** 2 - layout.generated} already cached "
+          f"({size / 1024:.0f} KiB in {layout.cache_dir})")
+
+
+if __name__ == '__main__':
+    main()
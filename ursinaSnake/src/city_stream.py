@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from city_layout import CHUNK_SIZE, chunk_key
+
+
+class ChunkStreamer:
+    """Keeps the chunks around a moving focus loaded, reading their layouts on a worker thread.
+
+    Layouts of every chunk within unload_radius of the focus chunk are
+    read from a CityLayout in the background, which may mean generating
+    a whole region (inline when unthreaded, so headless runs stay
+    deterministic). Chunks within load_radius are built on the main
+    thread, nearest first, one slice at a time until build_budget seconds
+    have gone into an update. Chunks beyond unload_radius are unloaded,
+    one per slice from the same budget; the ring between the two radii
+    stops a chunk on the edge from being built and torn down over and
+    over, and caps the chunks alive at once at about
+    (2 * unload_radius + 1) ** 2 however far the focus travels.
+    """
+
+    def __init__(self, build, unload, city_layout, chunk_size=CHUNK_SIZE, load_radius=1, unload_radius=2,
+                 build_budget=0.002, threaded=False):
+        self.build = build    # build(layout) -> generator that builds the chunk one slice per next()
+        self.unload = unload  # unload(key) tears a loaded chunk down
+        self.city_layout = city_layout  # CityLayout the chunk layouts come from
+        self.chunk_size = chunk_size
+        self.load_radius = load_radius
+        self.unload_radius = unload_radius
+        self.build_budget = build_budget
+        self.focus = None     # Key of the chunk the focus is in
+        self.layouts = {}     # {key: Future or ChunkLayout} for every chunk within unload_radius
+        self.loaded = set()
+        self.unloading = []   # Keys of chunks left behind, torn down within the budget like builds
+        self.building = None  # (key, generator) of the chunk being built
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='city-chunks') if threaded else None
+
+    def distance(self, key):
+        """Chunks between key and the focus chunk (Chebyshev distance)"""
+        return max(abs(key[0] - self.focus[0]), abs(key[1] - self.focus[1]))
+
+    def window(self, radius=None):
+        """Keys of the chunks within radius (default load_radius) of the focus, nearest first"""
+        radius = self.load_radius if radius is None else radius
+        fx, fz = self.focus
+        keys = [(fx + dx, fz + dz) for dx in range(-radius, radius + 1) for dz in range(-radius, radius + 1)]
+        return sorted(keys, key=lambda key: (key[0] - fx) ** 2 + (key[1] - fz) ** 2)
+
+    def update(self, x, z, wait=False):
+        """Follow the focus to world (x, z) and spend the build budget.
+
+        With wait (or unthreaded) every chunk in range is built before
+        returning. Returns True if the focus chunk changed or a chunk was
+        loaded or unloaded.
+        """
+        changed = self._refocus(chunk_key(x, z, self.chunk_size))
+        return self._build(complete=wait or self.executor is None) or changed
+
+    def _refocus(self, focus):
+        if focus == self.focus:
+            return False
+        self.focus = focus
+        for key in [key for key in self.loaded if self.distance(key) > self.unload_radius]:
+            self.loaded.discard(key)
+            self.unloading.append(key)
+        for key in [key for key in self.unloading if self.distance(key) <= self.unload_radius]:
+            # Came back into range before it was torn down
+            self.unloading.remove(key)
+            self.loaded.add(key)
+        for key in [key for key in self.layouts if self.distance(key) > self.unload_radius]:
+            layout = self.layouts.pop(key)
+            if isinstance(layout, Future):
+                layout.cancel()
+        for key in self.window(self.unload_radius):
+            if key not in self.layouts:
+                self.layouts[key] = self._generate(key)
+        return True
+
+    def _generate(self, key):
+        if self.executor is None:
+            return self.city_layout.chunk(key)
+        return self.executor.submit(self.city_layout.chunk, key)
+
+    def _build(self, complete):
+        """Unload, then build, chunks until the budget is spent, or until all of it is done if complete"""
+        changed = False
+        deadline = time.perf_counter() + self.build_budget
+        while self.unloading and (complete or time.perf_counter() < deadline):
+            self.unload(self.unloading.pop())
+            changed = True
+        while complete or time.perf_counter() < deadline:
+            if self.building is None:
+                self.building = self._next_build(wait=complete)
+                if self.building is None:
+                    break
+            key, steps = self.building
+            for _ in steps:
+                if not complete and time.perf_counter() >= deadline:
+                    return changed
+            self.building = None
+            self.loaded.add(key)
+            changed = True
+            if self.distance(key) > self.unload_radius:
+                # The focus moved away while this chunk was being built
+                self.loaded.discard(key)
+                self.unloading.append(key)
+        return changed
+
+    def _next_build(self, wait):
+        """(key, generator) for the nearest unbuilt chunk in range whose layout is ready, or None"""
+        for key in self.window():
+            if key in self.loaded:
+                continue
+            layout = self.layouts[key]
+            if isinstance(layout, Future):
+                if not (wait or layout.done()):
+                    continue
+                layout = self.layouts[key] = layout.result()
+            return key, self.build(layout)
+        return None
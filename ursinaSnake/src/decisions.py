@@ -0,0 +1,135 @@
+import threading
+import numpy as np
+from neighbor_grid import NeighborGrid
+
+
+class Snapshot:
+    """Copy of the swarm state the decision layer works from"""
+
+    def __init__(self, uids, x, z, vx, vz, pursuing, player_position, separation_radius, occupancy=None):
+        self.uids = uids
+        self.x, self.z = x, z
+        self.vx, self.vz = vx, vz
+        self.pursuing = pursuing  # Rows that may head for the player (chasers and guards)
+        self.player_position = player_position
+        self.separation_radius = separation_radius
+        self.occupancy = occupancy  # OccupancyView the paths are searched on
+
+
+class Decisions:
+    """Steering computed from one snapshot, looked up by enemy uid.
+
+    Enemies spawned after the snapshot have no entry; callers fall back
+    to steering without it for that tick.
+    """
+
+    def __init__(self, uids):
+        count = len(uids)
+        self.order = np.argsort(uids)
+        self.sorted_uids = uids[self.order]
+        self.flow_x = np.zeros(count, dtype=np.float32)
+        self.flow_z = np.zeros(count, dtype=np.float32)
+        self.covered = np.zeros(count, dtype=bool)     # flow_x/flow_z are a path to the player
+        self.push_x = np.zeros(count, dtype=np.float32)
+        self.push_z = np.zeros(count, dtype=np.float32)
+        self.mean_vx = np.zeros(count, dtype=np.float32)
+        self.mean_vz = np.zeros(count, dtype=np.float32)
+        self.crowded = np.zeros(count, dtype=bool)     # Has neighbours to align with
+
+    def lookup(self, uids):
+        """(index into these decisions, found mask) for each uid"""
+        if not len(self.sorted_uids):
+            return np.zeros(len(uids), dtype=np.intp), np.zeros(len(uids), dtype=bool)
+        slot = np.minimum(np.searchsorted(self.sorted_uids, uids), len(self.sorted_uids) - 1)
+        return self.order[slot], self.sorted_uids[slot] == uids
+
+
+class DecisionLayer:
+    """The read-only, expensive half of enemy AI: paths to the player and neighbour queries.
+
+    Each tick the swarm submits a Snapshot and reads the latest
+    Decisions. Threaded, a worker thread turns snapshots into decisions
+    while the main loop renders, and publishes each finished result by
+    swapping one reference - the front buffer the main loop reads is
+    never written to again, and the next result is built in a fresh
+    back buffer, so neither side takes a lock. The occupancy the paths
+    are searched on travels in the snapshot as a frozen view, so the main
+    thread can move or reopen the live grid at any time. NumPy releases
+    the GIL inside its array kernels, so the grid and search work
+    overlaps the render thread. Unthreaded (headless runs), decide() runs inline and
+    results are deterministic; either way decisions are one tick old.
+    """
+
+    def __init__(self, flow_field=None, threaded=False):
+        self.flow_field = flow_field  # Shared paths to the player around buildings
+        self.neighbors = NeighborGrid()
+        self.threaded = threaded
+        self.latest = None     # Front buffer: the last complete Decisions
+        self.pending = None    # Newest snapshot submitted to the worker
+        self.wake = threading.Event()
+        self.worker = None
+        self.decided = 0
+
+    def submit(self, snapshot):
+        if not self.threaded:
+            self.latest = self.decide(snapshot)
+            return
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name='enemy-decisions', daemon=True)
+            self.worker.start()
+        self.pending = snapshot  # Replaces any snapshot the worker didn't get to
+        self.wake.set()
+
+    def _run(self):
+        done = None
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            snapshot = self.pending  # Snapshots submitted while busy are skipped for the newest
+            if snapshot is not done:
+                self.latest = self.decide(snapshot)
+                done = snapshot
+
+    def decide(self, snapshot):
+        decisions = Decisions(snapshot.uids)
+        if snapshot.player_position is not None and snapshot.occupancy is not None and self.flow_field is not None:
+            self._paths(snapshot, decisions)
+        self._neighbours(snapshot, decisions)
+        self.decided += 1
+        return decisions
+
+    def _paths(self, snapshot, decisions):
+        px, _, pz = snapshot.player_position
+        self.flow_field.update(snapshot.occupancy, px, pz)
+        rows = snapshot.pursuing
+        flow_x, flow_z, covered = self.flow_field.directions(snapshot.x[rows], snapshot.z[rows])
+        decisions.flow_x[rows], decisions.flow_z[rows], decisions.covered[rows] = flow_x, flow_z, covered
+
+    def _neighbours(self, snapshot, decisions):
+        """Separation push and neighbour average velocity for every enemy"""
+        n = len(snapshot.uids)
+        if n < 2:
+            return
+        x, z, radius = snapshot.x, snapshot.z, snapshot.separation_radius
+        self.neighbors.build(x, z, radius)
+        i, j = self.neighbors.pairs(np.arange(n))
+        dx, dz = x[i] - x[j], z[i] - z[j]
+        distance = np.sqrt(dx * dx + dz * dz)
+        close = distance < radius
+        i, j, dx, dz, distance = i[close], j[close], dx[close], dz[close], distance[close]
+        if not len(i):
+            return
+
+        # Separation: a push away from each neighbour, stronger the closer it is
+        stacked = distance < 1e-4
+        dx = np.where(stacked, np.sign(i - j), dx)  # Split enemies on the exact same spot
+        distance = np.maximum(distance, 1e-4)
+        push = (1 - distance / radius) / distance
+        decisions.push_x[:] = np.bincount(i, dx * push, minlength=n)
+        decisions.push_z[:] = np.bincount(i, dz * push, minlength=n)
+
+        # Alignment: the average velocity of the neighbours
+        count = np.bincount(i, minlength=n)
+        decisions.crowded[:] = count > 0
+        decisions.mean_vx[:] = np.bincount(i, snapshot.vx[j], minlength=n) / np.maximum(count, 1)
+        decisions.mean_vz[:] = np.bincount(i, snapshot.vz[j], minlength=n) / np.maximum(count, 1)
@@ -0,0 +1,86 @@
+from panda3d.core import (
+    NodePath, GeomNode, Geom, GeomTriangles, GeomVertexData, GeomVertexFormat,
+    GeomVertexArrayFormat, InternalName, BoundingBox, Point3
+)
+import numpy as np
+
+
+class DynamicMesh(NodePath):
+    """A single triangle-list mesh whose vertex buffer is rewritten from NumPy arrays.
+
+    Vertices are interleaved float32 rows of position (3), normal (3),
+    uv (2) and optionally colour (4). The buffer is sized once for
+    max_vertices; write() only changes how many rows are drawn, so
+    refilling it every frame costs one memory copy and no scene nodes.
+    Use it as an Entity model: Entity(model=DynamicMesh(...)).
+    """
+
+    def __init__(self, max_vertices, with_colors=False, name='dynamic_mesh'):
+        super().__init__(GeomNode(name))
+        self.with_colors = with_colors
+        self.stride = 12 if with_colors else 8  # floats per vertex
+        self.max_vertices = 0
+
+        array_format = GeomVertexArrayFormat()
+        array_format.addColumn(InternalName.getVertex(), 3, Geom.NTFloat32, Geom.CPoint)
+        array_format.addColumn(InternalName.getNormal(), 3, Geom.NTFloat32, Geom.CNormal)
+        array_format.addColumn(InternalName.getTexcoord(), 2, Geom.NTFloat32, Geom.CTexcoord)
+        if with_colors:
+            array_format.addColumn(InternalName.getColor(), 4, Geom.NTFloat32, Geom.CColor)
+        self.vertex_format = GeomVertexFormat.registerFormat(GeomVertexFormat(array_format))
+
+        self.vdata = GeomVertexData(name, self.vertex_format, Geom.UHDynamic)
+        self.triangles = GeomTriangles(Geom.UHDynamic)
+        geom = Geom(self.vdata)
+        geom.addPrimitive(self.triangles)
+        self.node().addGeom(geom)
+        # Bounds change every frame, so skip culling instead of recomputing them
+        self.node().setBounds(BoundingBox(Point3(-1e6, -1e6, -1e6), Point3(1e6, 1e6, 1e6)))
+        self.node().setFinal(True)
+        self.setTwoSided(True)
+
+        self.reserve(max_vertices)
+        self.write(None, 0)
+
+    def reserve(self, max_vertices):
+        """Grow the vertex buffer (only call this when capacity actually needs to grow)"""
+        if max_vertices <= self.max_vertices:
+            return
+        self.max_vertices = max_vertices
+        self.buffer = np.zeros((max_vertices, self.stride), dtype=np.float32)
+
+    def write(self, buffer, count):
+        """Upload the first count rows of buffer (shape (n, stride), float32) and draw them"""
+        count = min(count, self.max_vertices)
+        geom = self.node().modifyGeom(0)
+        vdata = geom.modifyVertexData()
+        vdata.uncleanSetNumRows(count)
+        if count:
+            view = np.frombuffer(memoryview(vdata.modifyArray(0)).cast('B'), dtype=np.float32)
+            view[:count * self.stride] = buffer[:count].reshape(-1)
+
+        triangles = geom.modifyPrimitive(0)
+        triangles.clearVertices()
+        if count:
+            triangles.setNonindexedVertices(0, count)
+        self.vertex_count = count
+
+
+def cube_template(size=1.0):
+    """Return the 36 (position, normal, uv) rows of a cube centred on the origin as an (36, 8) array"""
+    h = size / 2
+    faces = [
+        # normal, then the four corners counter-clockwise seen from outside
+        ((1, 0, 0), [(h, -h, -h), (h, h, -h), (h, h, h), (h, -h, h)]),
+        ((-1, 0, 0), [(-h, -h, h), (-h, h, h), (-h, h, -h), (-h, -h, -h)]),
+        ((0, 1, 0), [(-h, h, -h), (-h, h, h), (h, h, h), (h, h, -h)]),
+        ((0, -1, 0), [(-h, -h, h), (-h, -h, -h), (h, -h, -h), (h, -h, h)]),
+        ((0, 0, 1), [(h, -h, h), (h, h, h), (-h, h, h), (-h, -h, h)]),
+        ((0, 0, -1), [(-h, -h, -h), (-h, h, -h), (h, h, -h), (h, -h, -h)]),
+    ]
+    uvs = [(0, 0), (0, 1), (1, 1), (1, 0)]
+    rows = []
+    for normal, corners in faces:
+        for i in (0, 1, 2, 0, 2, 3):
+            rows.append((*corners[i], *normal, *uvs[i]))
+    return np.array(rows, dtype=np.float32)
@@ -1,6 +1,9 @@
 from ursina import *
 import random
 import math
+import settings
+from layers import set_layer, ENEMY
+from particles import spread
 
 class Enemy(Entity):
     # Define different enemy types
@@ -27,7 +30,8 @@ class Enemy(Entity):
             'speed': 2,
             'points': 3,
             'model': 'cube',
-            'behavior': 'guard'
+            'behavior': 'guard',
+            'shield_pulse': 1.7  # Shield grows to this scale and back
         },
         'floater': {
             'color': color.cyan,
@@ -35,11 +39,13 @@ class Enemy(Entity):
             'speed': 4,
             'points': 4,
             'model': 'sphere',
-            'behavior': 'wander'
+            'behavior': 'wander',
+            'hover': 0.5,  # Floats this high above its simulated y, bobbing up as much again
+            'pulse': 1.2   # Grows to this scale and back
         }
     }
 
-    def __init__(self, position=(0, 0, 0), enemy_type=None):
+    def __init__(self, position=(0, 0, 0), enemy_type=None, particles=None):
         # If no specific type provided, choose random type
         if not enemy_type:
             enemy_type = random.choice(list(Enemy.TYPES.keys()))
@@ -52,20 +58,37 @@ class Enemy(Entity):
         self.model = self.config['model']
         self.color = self.config['color']
         self.texture = 'brick'  # Better texture
+        self.behavior = self.config['behavior']
+        self.points = self.config['points']
+        
+        # Make sure collider is properly set
+        self.collider = 'box'
+        set_layer(self, ENEMY)
+        
+        # Visual enhancements (nothing to show when running headless)
+        self.particles = particles  # Shared emitters for trails and the death burst
+        self.shield = None
+        if not settings.headless:
+            self.setup_visual_effects()
+        
+        self.spawn(position)
+
+    def spawn(self, position):
+        """Start a new life at position (also used when the enemy is reused from a pool).
+
+        This picks the enemy's speed, heading, patrol route and guard area;
+        from then on EnemySwarm moves it.
+        """
         self.scale = self.config['scale']
         
         # Ensure all enemies are at the same height as player for collisions
         self.position = Vec3(position[0], 1, position[2])
+        self.rotation = Vec3(0, 0, 0)
         self.speed = self.config['speed'] * random.uniform(0.8, 1.2)  # Add some variation
-        self.points = self.config['points']
         
         # Set behavior
-        self.behavior = self.config['behavior']
         self.direction = Vec3(random.choice([-1, 1]), 0, random.choice([-1, 1])).normalized()
         
-        # Make sure collider is properly set
-        self.collider = 'box'
-        
         # Additional properties based on type
         self.patrol_waypoints = []
         self.current_waypoint = 0
@@ -73,7 +96,6 @@ class Enemy(Entity):
         self.guard_radius = random.uniform(5, 10)
         self.target = None
         self.detection_range = 15
-        self.time_alive = 0
         
         # Initialize next_direction_change for all enemies
         self.next_direction_change = random.uniform(1, 3)
@@ -81,8 +103,13 @@ class Enemy(Entity):
         # Initialize behavior specific properties
         self.setup_behavior()
         
-        # Visual enhancements
-        self.setup_visual_effects()
+        if self.shield:
+            self.shield.scale = 1.5
+        self.enable()
+
+    def despawn(self):
+        """Go dormant until the pool hands this enemy out again"""
+        self.disable()
 
     def setup_behavior(self):
         """Setup behavior-specific properties"""
@@ -119,33 +146,8 @@ class Enemy(Entity):
 
     def setup_visual_effects(self):
         """Add visual enhancements based on enemy type"""
-        # Different visual effects based on enemy type
-        if self.enemy_type == 'floater':
-            # Floater enemy hovers and has a pulsing effect
-            self.y = 1.5  # Make it float higher
-            
-            # Bobbing animation - fixed to use supported parameters
-            self.animate_y(
-                self.y + 0.5,
-                duration=1.5,
-                curve=curve.in_out_sine,
-                loop=True
-            )
-            
-            # Pulsing scale animation
-            self.animate_scale(
-                Vec3(1.2, 1.2, 1.2),
-                duration=1,
-                curve=curve.in_out_sine,
-                loop=True
-            )
-            
-        elif self.enemy_type == 'runner':
-            # Runner enemy leaves particles when moving
-            # Create a simple particle effect without using repeat parameter
-            self.particle_timer = 0
-            
-        elif self.enemy_type == 'guardian':
+        # Runners leave a particle trail while moving (see EnemySwarm)
+        if self.enemy_type == 'guardian':
             # Guardian has a shield-like outline
             self.shield = Entity(
                 parent=self,
@@ -154,171 +156,14 @@ class Enemy(Entity):
                 color=color.rgba(1, 1, 1, 0.2),
                 double_sided=True
             )
-            
-            # Pulse the shield - fixed to use supported parameters
-            self.shield.animate_scale(
-                Vec3(1.7, 1.7, 1.7),
-                duration=1.5,
-                curve=curve.in_out_sine,
-                loop=True
-            )
-            
-    def create_movement_particle(self):
-        """Create a particle at the runner's position to simulate trail effect"""
-        if self.enemy_type == 'runner':
-            particle = Entity(
-                model='sphere',
-                color=self.color.tint(-.2),
-                position=self.position + Vec3(0, 0.1, 0),
-                scale=0.3
-            )
-            particle.animate_scale(0, duration=0.5)
-            particle.animate_color(color.clear, duration=0.5)
-            destroy(particle, delay=0.5)
-
-    def update(self):
-        self.time_alive += time.dt
-        
-        if self.behavior == 'patrol':
-            self.patrol_behavior()
-        elif self.behavior == 'guard':
-            self.guard_behavior()
-        elif self.behavior == 'chase':
-            self.chase_behavior()
-        elif self.behavior == 'wander':
-            self.wander_behavior()
-            
-        # Add a subtle hover/bob to all enemies
-        self.y = 1 + math.sin(self.time_alive * 2) * 0.1
-        
-        # Handle particle creation for runner type
-        if self.enemy_type == 'runner':
-            self.particle_timer -= time.dt
-            if self.particle_timer <= 0:
-                self.create_movement_particle()
-                self.particle_timer = 0.1  # Create particle every 0.1 seconds
-        
-    def find_player(self):
-        """Find player in the scene"""
-        for entity in scene.entities:
-            if hasattr(entity, 'name') and entity.name == 'player':
-                return entity
-        return None
-
-    def patrol_behavior(self):
-        """Move between patrol waypoints"""
-        if not self.patrol_waypoints:
-            return
-            
-        # Get current target waypoint
-        target = self.patrol_waypoints[self.current_waypoint]
-        
-        # Move towards waypoint
-        direction = (target - self.position).normalized()
-        direction.y = 0  # Keep y movement zero
-        self.position += direction * self.speed * time.dt
-        
-        # Look towards movement direction
-        self.look_at_2d(target)
-        
-        # Check if reached waypoint
-        distance = (target - self.position).length()
-        if distance < 1:
-            # Move to next waypoint
-            self.current_waypoint = (self.current_waypoint + 1) % len(self.patrol_waypoints)
-
-    def guard_behavior(self):
-        """Guard an area and chase if player comes close"""
-        player = self.find_player()
-        if not player:
-            return
-            
-        # Check if player is within guarding radius
-        player_distance = (player.position - self.guard_position).length()
-        
-        if player_distance < self.guard_radius:
-            # Player is in guarded area, chase them!
-            direction = (player.position - self.position).normalized()
-            direction.y = 0
-            self.position += direction * self.speed * time.dt
-            self.look_at_2d(player.position)
-        else:
-            # Return to guard position
-            direction = (self.guard_position - self.position).normalized()
-            direction.y = 0
-            
-            # Only move if not already at guard position
-            if (self.position - self.guard_position).length() > 0.5:
-                self.position += direction * self.speed * time.dt
-                self.look_at_2d(self.guard_position)
 
-    def chase_behavior(self):
-        """Actively chase the player"""
-        player = self.find_player()
-        if not player:
-            # If no player found, wander
-            self.wander_behavior()
+    def burst(self):
+        """Particle effect for being eaten by the snake"""
+        if settings.headless or self.particles is None:
             return
             
-        # Check if player is within detection range
-        player_distance = (player.position - self.position).length()
-        
-        if player_distance < self.detection_range:
-            # Chase player
-            direction = (player.position - self.position).normalized()
-            direction.y = 0
-            self.position += direction * self.speed * time.dt
-            self.look_at_2d(player.position)
-        else:
-            # Wander if player is too far
-            self.wander_behavior()
-
-    def wander_behavior(self):
-        """Move randomly, occasionally changing direction"""
-        # Check if it's time to change direction
-        self.next_direction_change -= time.dt
-        if self.next_direction_change <= 0:
-            # Choose new random direction
-            self.direction = Vec3(
-                random.uniform(-1, 1),
-                0,
-                random.uniform(-1, 1)
-            ).normalized()
-            self.next_direction_change = random.uniform(1, 3)
-            
-        # Apply movement
-        self.position += self.direction * self.speed * time.dt
-        self.look_at_2d(self.position + self.direction)
-        
-        # Boundary check - reverse direction if hitting boundaries
-        if abs(self.x) > 24 or abs(self.z) > 24:
-            self.direction = -self.direction
-            self.look_at_2d(self.position + self.direction)
-
-    def look_at_2d(self, target_pos):
-        """Look at target but only in the y-axis rotation"""
-        direction = target_pos - self.position
-        self.rotation_y = math.degrees(math.atan2(direction.z, direction.x)) + 90
-        
-    def on_disable(self):
-        """Called when the enemy is disabled (eaten by snake)"""
-        # Create particle effect when eaten
-        for _ in range(10):
-            particle = Entity(
-                model='sphere',
-                color=self.color,
-                position=self.position,
-                scale=0.2,
-                lifetime=1
-            )
-            # Random direction particle burst
-            particle.animate_position(
-                self.position + Vec3(
-                    random.uniform(-2, 2),
-                    random.uniform(0, 2),
-                    random.uniform(-2, 2)
-                ),
-                duration=0.5
-            )
-            particle.animate_scale(0, duration=0.5)
-            destroy(particle, delay=0.5)
\ No newline at end of file
+        # Random direction particle burst when eaten
+        self.particles.enemy_death.emit(
+            self.position, spread(10, (-2, 0, -2), (2, 2, 2)),
+            sizes=0.2, lifetimes=0.5, color=self.color
+        )
\ No newline at end of file
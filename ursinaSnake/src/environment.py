@@ -1,17 +1,75 @@
 from ursina import *
-from random import randint, uniform
 import random
 import os
 import shutil
 import math
+import numpy as np
+import settings
+from occupancy import OccupancyGrid
+from facades import facade_key, bake_facades, FacadeAtlas, VARIANTS_PER_COLOR
+from particles import spread
+from pool import Pool
+from static_colliders import StaticColliders
+from city_batch import merge_static, StaticRecord, CityChunk
+from city_stream import ChunkStreamer
+from city_layout import CityLayout, CACHE_DIR, CHUNK_SIZE, OBSTACLE_TYPES, LANE_AXES
+from layers import set_layer, layer_of, BUILDING, OBSTACLE, BRIDGE, VEHICLE, GROUND
+
+LOAD_RADIUS = 1  # Chunks built around the player's chunk; the next ring out stays until it is left behind
+FOOTPRINT_APRON = 2  # Cells around a chunk's own that its footprint covers
+GROUND_REPEAT = 4  # World units per repeat of the ground texture (divides CHUNK_SIZE, so tiles meet seamlessly)
+BUILDING_COLORS = [color.light_gray, color.gray, color.dark_gray, color.rgba(0.6, 0.6, 0.7, 1)]  # Per building style
 
 # Define the base path for KayKit assets relative to the project root
 KAYKIT_ASSETS_RELATIVE_PATH = os.path.join("KayKit_City_Builder_Bits_1.0_FREE", "Assets")
 
+class Vehicle(Entity):
+    """A car driving back and forth along one axis of the road grid"""
+    AXES = ('ew', 'ns')
+
+    def __init__(self, axis):
+        super().__init__(
+            model='cube',
+            scale=(2, 1, 1) if axis == 'ew' else (1, 1, 2),
+            collider='box',
+        )
+        set_layer(self, VEHICLE)
+        self.axis = axis
+        self.road_bounds = (-25, 25)  # Along the driving axis
+        self.name = f'vehicle_{axis}'
+
+    def spawn(self, position, direction, speed, vehicle_color, road_bounds=(-25, 25)):
+        """Put the vehicle on the road (also used when it is reused from a pool)"""
+        self.position = position
+        self.color = vehicle_color
+        self.direction = Vec3(direction, 0, 0) if self.axis == 'ew' else Vec3(0, 0, direction)
+        self.rotation_y = 0 if direction > 0 else 180
+        self.speed = speed
+        self.road_bounds = road_bounds
+        self.enable()
+
+    def despawn(self):
+        self.disable()
+
+
 class Environment(Entity):
-    def __init__(self):
+    """The city, streamed in chunks around the player.
+
+    Each chunk's layout comes from the city seed, so a chunk that is
+    unloaded and later reloaded comes back the same, and so does the
+    whole city for the same seed. Layouts of a seed passed in explicitly
+    are cached on disk (see CityLayout), so such a seed loads without
+    generating anything the second time. The lists below hold whatever
+    is currently loaded, across all chunks.
+    """
+
+    def __init__(self, spatial_hash=None, timers=None, tweens=None, particles=None, seed=None, threaded=False):
         super().__init__()
         print("Initializing environment...")
+        self.spatial_hash = spatial_hash  # Moving vehicles register here for player collisions
+        self.timers = timers  # Simulation-time timers shared with the game
+        self.tweens = tweens  # Looping decorative animations
+        self.particles = particles  # Shared particle emitters (None when headless)
         
         # Get the base directory of the script to build absolute paths
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,32 +77,74 @@ class Environment(Entity):
         self.assets_root = os.path.join(self.project_root, "assets")
         self.kaykit_base_path = os.path.abspath(os.path.join(self.project_root, KAYKIT_ASSETS_RELATIVE_PATH))
         
-        self.create_ground()
         self.buildings = []  # Store buildings for reference
-        self.dynamic_elements = []  # Initialize dynamic_elements list before using it
+        self.obstacles = []
+        self.bridges = []
+        self.vehicles = []
+        self.dynamic_elements = []  # Collapsible buildings, bridges and vehicles, updated in tick()
+        self.chunks = {}  # {key: CityChunk} for every chunk loaded or being built
+        self.static_colliders = StaticColliders()
+        # Vehicles are pooled per driving axis, which fixes their shape
+        self.vehicle_pool = Pool(lambda axis: Vehicle(axis), keys=Vehicle.AXES)
+        self.vehicle_pool.prewarm(9)
+        
+        self.ground_texture = self.load_ground_texture()
         self.building_models, self.building_texture = self.load_building_assets() # Load models and texture
-        self.create_city_layout()
-        self.create_obstacles()
-        self.create_dynamic_elements()
+        self.obstacle_models = self.load_obstacle_models()
+        self.load_facades()
+        
+        # Chunk layouts are read on a worker thread (inline when headless), generated from one seed if not cached.
+        # Only a seed asked for by name is cached on disk; one drawn at random would never be read back.
+        self.seed = random.getrandbits(32) if seed is None else seed  # Follows the game's seed unless given
+        self.city_layout = CityLayout(self.seed, CHUNK_SIZE, cache_dir=None if seed is None else CACHE_DIR)
+        self.streamer = ChunkStreamer(
+            self.build_chunk, self.unload_chunk, self.city_layout,
+            chunk_size=CHUNK_SIZE, load_radius=LOAD_RADIUS, unload_radius=LOAD_RADIUS + 1, threaded=threaded
+        )
+        # Spawning and enemy paths cover the chunks within LOAD_RADIUS of the player's
+        self.occupancy = OccupancyGrid(half_size=(LOAD_RADIUS + 0.5) * CHUNK_SIZE, cell_size=1.0)
+        self.occupancy_stale = False  # The loaded chunks changed since the grid was built
+        self.stream((0, 0, 0), wait=True)
+
+    def stream(self, position, wait=False):
+        """Load and unload chunks around position; True if the occupancy grid was rebuilt for a changed city.
 
-    def create_ground(self):
-        # Create a large textured ground plane
+        The grid is rebuilt on the step after the chunks change, so it never
+        shares a step with building a chunk. With wait, every chunk within
+        LOAD_RADIUS is built and the grid rebuilt before returning (used when
+        the game starts or the player is moved back to the start).
+        """
+        if self.occupancy_stale and not wait:
+            self.build_occupancy()
+            return True
+        self.occupancy_stale |= self.streamer.update(position[0], position[2], wait=wait)
+        if self.occupancy_stale and wait:
+            self.build_occupancy()
+            return True
+        return False
+
+    def load_ground_texture(self):
         ground_texture_path = os.path.join(self.assets_root, "textures", "ground_texture.png") 
-        # Fallback texture if the specific one doesn't exist
-        ground_texture = 'grass'  # Use a built-in texture or a known good one
-        
+        if settings.headless:
+            return None  # Nothing is rendered in headless mode
         if os.path.exists(ground_texture_path):
-            ground_texture = load_texture(ground_texture_path)
-        else:
-            print(f"Warning: Ground texture not found at {ground_texture_path}. Using fallback.")
+            return load_texture(ground_texture_path)
+        print(f"Warning: Ground texture not found at {ground_texture_path}. Using fallback.")
+        return 'grass'  # Use a built-in texture or a known good one
 
-        self.ground = Entity(
+    def create_ground_tile(self, layout):
+        """Textured ground plane under one chunk"""
+        size = layout.chunk_size
+        tile = Entity(
             model='plane',
-            scale=(50, 1, 50),
-            texture=ground_texture, 
-            texture_scale=(10, 10),
-            collider='box'
+            position=(layout.origin[0] + size / 2, 0, layout.origin[1] + size / 2),
+            scale=(size, 1, size),
+            texture=self.ground_texture,
+            texture_scale=(size / GROUND_REPEAT, size / GROUND_REPEAT),
+            name=f'ground_{layout.key[0]}_{layout.key[1]}'
         )
+        set_layer(tile, GROUND)
+        return tile
 
     def load_building_assets(self):
         """Load custom building models and the shared texture from assets folder, copying if necessary."""
@@ -141,61 +241,121 @@ class Environment(Entity):
         
         return building_models, building_texture
 
-    def _create_cube_city(self):
-        """Create a city with procedurally textured cube buildings"""
-        # Building type definitions with procedural texture generation
-        building_types = [
-            {'height': randint(5, 10), 'base_color': color.light_gray},
-            {'height': randint(4, 7), 'base_color': color.gray},
-            {'height': randint(6, 12), 'base_color': color.dark_gray},
-            {'height': randint(4, 8), 'base_color': color.rgba(0.6, 0.6, 0.7, 1)},
-        ]
+
+    def load_facades(self):
+        """Bake every facade variant up front (cached on disk) and pack them into one shared atlas"""
+        self.facade_atlas = None
+        if settings.headless:
+            return
+        keys = [facade_key(variant, base_color, size=128) for base_color in BUILDING_COLORS for variant in range(VARIANTS_PER_COLOR)]
+        facades = bake_facades(keys)
+        self.facade_atlas = FacadeAtlas(tile_size=128)
+        for key in keys:
+            self.facade_atlas.add(key, facades[key])
+        self.facade_atlas.upload()
+        self.facade_textures = [Texture(texture) for texture in self.facade_atlas.textures]
+
+    def apply_facade(self, building, variant, base_color):
+        """Point a building at its facade's tile in the atlas"""
+        page, offset, scale = self.facade_atlas.uvs(facade_key(variant, base_color, size=128))
+        building.texture = self.facade_textures[page]
+        building.texture_scale = scale
+        building.texture_offset = offset
+
+    def build_chunk(self, layout):
+        """Build one chunk from its layout, an entity per step (a generator the streamer advances within its budget)"""
+        key = layout.key
+        chunk = self.chunks[key] = CityChunk(key, layout.chunk_size)
+        ground = self.create_ground_tile(layout)
+        yield
         
-        for x in range(-20, 21, 8):
-            for z in range(-20, 21, 8):
-                if random.random() < 0.3:
-                    continue
-                    
-                pos_x = x + uniform(-1, 1)
-                pos_z = z + uniform(-1, 1)
-                self._create_procedural_building(pos_x, pos_z, building_types)
-
-    def _create_procedural_building(self, pos_x, pos_z, building_types=None):
-        """Create a building with procedurally generated texture"""
-        if not building_types:
-            building_types = [
-                {'height': randint(5, 10), 'base_color': color.light_gray},
-                {'height': randint(4, 7), 'base_color': color.gray},
-                {'height': randint(6, 12), 'base_color': color.dark_gray},
-                {'height': randint(4, 8), 'base_color': color.rgba(0.6, 0.6, 0.7, 1)},
-            ]
-            
-        # Select random building type
-        building_type = random.choice(building_types)
-        height = building_type['height']
-        width = random.randint(2, 4)
-        depth = random.randint(2, 4)
+        buildings = []
+        for index, spec in enumerate(layout.buildings.tolist()):
+            buildings.append(self.create_building(key, index, *spec))
+            yield
+        
+        obstacles = []
+        for index, (x, z, kind) in enumerate(layout.obstacles.tolist()):
+            obstacles.append(self.create_obstacle(key, index, x, z, OBSTACLE_TYPES[kind]))
+            yield
+        
+        bridges = []
+        for i, j in layout.bridges.tolist():
+            bridges.append(self.create_bridge(key, len(bridges), buildings[i], buildings[j]))
+            yield
         
+        # One car per road lane
+        for axis, offset, low, high, start, direction, speed, r, g, b in layout.lanes.tolist():
+            position = (start, 0.5, offset) if LANE_AXES[axis] == 'ew' else (offset, 0.5, start)
+            vehicle_color = color.rgba(r / 255, g / 255, b / 255, 1)
+            chunk.vehicles.append(self.spawn_vehicle(LANE_AXES[axis], position, direction, speed, vehicle_color, (low, high)))
+        
+        # Collider boxes come from the entities, so take them before the static ones are merged away
+        self.add_static_colliders(buildings + obstacles)
+        yield
+        
+        # Merge everything that never moves into the chunk's geometry, keeping records in its place
+        collapsible = [building for building in buildings if building.collapsible]
+        records = {}
+        for entity in [ground] + [building for building in buildings if not building.collapsible] + obstacles:
+            records[entity] = merge_static(chunk, entity)
+            self.static_colliders.rekey(entity, records[entity])
+            yield
+        chunk.flattenStrong()
+        yield
+        
+        chunk.entities = collapsible + bridges
+        self.rasterize_chunk(chunk)
+        
+        for bridge in bridges:
+            bridge.connected_buildings = tuple(records.get(building, building) for building in bridge.connected_buildings)
+        self.buildings.extend(records.get(building, building) for building in buildings)
+        self.obstacles.extend(records[obstacle] for obstacle in obstacles)
+        self.bridges.extend(bridges)
+        self.dynamic_elements.extend(chunk.entities)
+        print(f"Loaded city chunk {key}: {len(buildings)} buildings ({len(collapsible)} collapsible), "
+              f"{len(obstacles)} obstacles, {len(bridges)} bridges, {len(chunk.vehicles)} vehicles")
+
+    def unload_chunk(self, key):
+        """Tear down a chunk the player left behind: vehicles go back to their pool, everything else is destroyed"""
+        chunk = self.chunks.pop(key)
+        for vehicle in chunk.vehicles:
+            self.remove_vehicle(vehicle)
+        self.static_colliders.remove(chunk.records + chunk.entities)
+        
+        self.buildings = [building for building in self.buildings if building.chunk != key]
+        self.obstacles = [obstacle for obstacle in self.obstacles if obstacle.chunk != key]
+        self.bridges = [bridge for bridge in self.bridges if bridge.chunk != key]
+        self.dynamic_elements = [element for element in self.dynamic_elements if getattr(element, 'chunk', None) != key]
+        for entity in chunk.entities:
+            if self.tweens is not None:
+                self.tweens.remove(*entity.children)  # Warning signs blink
+            destroy(entity)
+        destroy(chunk)
+
+    def create_building(self, key, index, pos_x, pos_z, width, depth, height, style, variant, collapsible):
+        """Create a building with a procedural facade"""
         # Create the main building structure
         building = Entity(
             model='cube',
             position=(pos_x, height/2, pos_z),  # Position at half height
             scale=(width, height, depth),
-            name=f'building_cube_{len(self.buildings)}'
+            name=f'building_cube_{key[0]}_{key[1]}_{index}'
         )
         
-        # Generate a procedural texture for the building - no external files needed
-        building_texture = self.generate_building_texture(
-            building_type['base_color'], 
-            width=128, 
-            height=128,
-            window_color=color.rgba(0.7, 0.9, 1.0, 1.0)
-        )
-        
-        building.texture = building_texture
-        
         # Make sure it has a proper collider
         building.collider = 'box'
+        set_layer(building, BUILDING)
+        building.chunk = key
+        building.collapsible = collapsible
+        building.collapsed = False
+        
+        # Texture, roof and warning sign are visual only
+        if settings.headless:
+            return building
+        
+        # Procedural facade from the shared atlas of variants (see load_facades)
+        self.apply_facade(building, variant, BUILDING_COLORS[style])
         
         # Add a simple roof
         roof = Entity(
@@ -205,79 +365,25 @@ class Environment(Entity):
             scale=(1, 0.1, 1),
             color=color.dark_gray
         )
-
-        self.buildings.append(building)
-        return building
-
-    def generate_building_texture(self, base_color, width=128, height=128, window_color=color.azure):
-        """Generate a procedural building texture with windows and details"""
-        # Create a new texture using Ursina's Texture class
-        from PIL import Image, ImageDraw
-        import numpy as np
         
-        # Create a blank image with the base color
-        r, g, b = int(base_color.r * 255), int(base_color.g * 255), int(base_color.b * 255)
-        img = Image.new('RGBA', (width, height), (r, g, b, 255))
-        draw = ImageDraw.Draw(img)
-        
-        # Add windows
-        num_floors = random.randint(4, 8)
-        num_windows_x = random.randint(3, 6)
-        
-        window_width = width // (num_windows_x * 2)
-        window_height = height // (num_floors * 2)
-        window_spacing_x = width // num_windows_x
-        window_spacing_y = height // num_floors
-        
-        # Convert window color to RGB
-        w_r, w_g, w_b = int(window_color.r * 255), int(window_color.g * 255), int(window_color.b * 255)
-        
-        # Drawing pattern depends on time of day - some windows lit, some dark
-        for floor in range(num_floors):
-            for win_x in range(num_windows_x):
-                # Randomize window lighting
-                if random.random() < 0.7:  # 70% of windows are lit
-                    window_fill = (w_r, w_g, w_b, 255)
-                else:
-                    # Dark window
-                    window_fill = (30, 30, 40, 255)
-                    
-                # Draw the window
-                x1 = win_x * window_spacing_x + (window_spacing_x - window_width) // 2
-                y1 = floor * window_spacing_y + (window_spacing_y - window_height) // 2
-                x2 = x1 + window_width
-                y2 = y1 + window_height
-                
-                draw.rectangle([x1, y1, x2, y2], fill=window_fill)
-        
-        # Add some architectural details
-        # Horizontal lines between floors
-        for floor in range(num_floors + 1):
-            y = floor * window_spacing_y
-            draw.line([(0, y), (width, y)], fill=(r//2, g//2, b//2, 255), width=2)
-        
-        # Edge details
-        edge_color = (min(r+30, 255), min(g+30, 255), min(b+30, 255), 255)
-        draw.rectangle([0, 0, width-1, height-1], outline=edge_color, width=3)
-        
-        # Add some texture/noise for realism
-        pixels = np.array(img)
-        noise = (np.random.rand(height, width, 4) * 20 - 10).astype(np.int32)
-        pixels = np.clip(pixels + noise, 0, 255).astype(np.uint8)
-        img = Image.fromarray(pixels)
-        
-        # Convert to Ursina texture
-        texture = Texture(img)
-        return texture
+        if collapsible:
+            # Add a warning sign on top
+            warning = Entity(
+                parent=building,
+                model='cube',
+                color=color.yellow,
+                scale=(0.5, 0.5, 0.5),
+                y=5,  # Place on top of building
+                billboard=True  # Always face camera
+            )
+            # Make it blink
+            if self.tweens is not None:
+                self.tweens.color_loop(warning, color.red, duration=0.5)
 
-    def create_city_layout(self):
-        """Create a city with procedurally generated buildings"""
-        print("Creating city with procedural buildings")
-        self._create_cube_city()
+        return building
 
-    def create_obstacles(self):
-        """Create various obstacles throughout the environment"""
-        obstacles = []
+    def load_obstacle_models(self):
+        """Copy the KayKit obstacle models into the project's assets; returns {obstacle type: model path}"""
         available_models = {}
 
         # Source path for KayKit OBJ models
@@ -322,241 +428,254 @@ class Environment(Entity):
                 relative_model_path = os.path.join("assets", "models", "obstacles", model_filename)
                 available_models[obs_type] = relative_model_path
                 print(f"Found obstacle model {obs_type}")
+        # A model that fails to load is searched for on disk on every try, so only try once
+        for obs_type, model_path in available_models.items():
+            if load_model(model_path) is None:
+                print(f"Could not load obstacle model {obs_type}")
+                available_models[obs_type] = None
         
-        # Create obstacles with available models
-        for i in range(10):  # Create 10 obstacles
-            if available_models:
-                # Use a random available model
-                obs_type = random.choice(list(available_models.keys()))
-                model_path = available_models[obs_type]
+        if not available_models:
+            print("No obstacle models found, obstacles will be fallback cubes.")
+        return available_models
 
-                try:
-                    # Create obstacle container entity
-                    container = Entity(
-                        position=(uniform(-24, 24), 0, uniform(-24, 24)),
-                        name=f'obstacle_container_{obs_type}_{i}'
-                    )
-                    
-                    # Create obstacle with the model and building texture
-                    obstacle = Entity(
-                        parent=container,
-                        model=model_path,
-                        texture=self.building_texture,
-                        scale=3.0,  # Make obstacles bigger for better visibility
-                        color=color.white,  # Use white color to properly show texture
-                        name=f'obstacle_{obs_type}_{i}',
-                        collider='box'
-                    )
-                    
-                    # Add a colored marker on top to make obstacles more visible
-                    marker = Entity(
-                        parent=container,
-                        model='sphere',
-                        scale=0.5,
-                        y=2,
-                        color=color.red,
-                        billboard=True,  # Always face the camera
-                    )
-                    
-                    print(f"Created obstacle {obs_type}")
-                    obstacles.append(container)
-                    
-                except Exception as e:
-                    print(f"Error creating obstacle {obs_type}: {e}")
-                    # Fallback to cube if model loading fails
-                    self._create_fallback_obstacle(i, obstacles)
-            else:
-                # Fallback to basic cube if no models loaded
-                print("No obstacle models found, creating fallback obstacles.")
-                self._create_fallback_obstacle(i, obstacles)
-
-        # Add obstacles to dynamic elements
-        self.dynamic_elements.extend(obstacles)
+    def create_obstacle(self, key, index, x, z, obs_type):
+        """Create an obstacle from its KayKit model, or a plain cube if the model is missing"""
+        name = f'{obs_type}_{key[0]}_{key[1]}_{index}'
+        if obs_type not in self.obstacle_models:
+            return self._create_fallback_obstacle(name, x, z, key)
+        model_path = self.obstacle_models[obs_type]
+        
+        try:
+            # Create obstacle container entity
+            container = Entity(
+                position=(x, 0, z),
+                name=f'obstacle_container_{name}'
+            )
+            
+            # Create obstacle with the model and building texture
+            obstacle = Entity(
+                parent=container,
+                model=model_path,
+                texture=self.building_texture,
+                scale=3.0,  # Make obstacles bigger for better visibility
+                color=color.white,  # Use white color to properly show texture
+                name=f'obstacle_{name}',
+                collider='box'
+            )
+            set_layer(container, OBSTACLE)
+            set_layer(obstacle, OBSTACLE)
+            container.chunk = key
+            
+            # Add a colored marker on top to make obstacles more visible
+            if not settings.headless:
+                marker = Entity(
+                    parent=container,
+                    model='sphere',
+                    scale=0.5,
+                    y=2,
+                    color=color.red,
+                    billboard=True,  # Always face the camera
+                )
+            return container
+            
+        except Exception as e:
+            print(f"Error creating obstacle {obs_type}: {e}")
+            # Fallback to cube if model loading fails
+            return self._create_fallback_obstacle(name, x, z, key)
 
-    def _create_fallback_obstacle(self, index, obstacles_list):
+    def _create_fallback_obstacle(self, name, x, z, key):
         """Create a fallback obstacle when model loading fails"""
         # Create a simple colored cube as a fallback
         obstacle = Entity(
             model='cube',
             color=color.orange,
-            position=(uniform(-24, 24), 0.5, uniform(-24, 24)),
+            position=(x, 0.5, z),
             scale=(1, 1, 1),
             collider='box',
-            name=f'obstacle_fallback_{index}'
+            name=f'obstacle_fallback_{name}'
         )
-        obstacles_list.append(obstacle)
-
-    def create_dynamic_elements(self):
-        """Create dynamic environment elements like collapsible buildings and movable bridges"""
-        # Set some buildings as collapsible
-        for building in self.buildings:
-            # 15% chance for a building to be collapsible
-            if random.random() < 0.15:
-                building.collapsible = True
-                building.collapsed = False
-                self.dynamic_elements.append(building)
-                print(f"Made building {building.name} collapsible")
-                
-                # Add a warning sign on top
-                warning = Entity(
-                    parent=building,
-                    model='cube',
-                    color=color.yellow,
-                    scale=(0.5, 0.5, 0.5),
-                    y=5,  # Place on top of building
-                    billboard=True  # Always face camera
+        set_layer(obstacle, OBSTACLE)
+        obstacle.chunk = key
+        return obstacle
+
+    def build_occupancy(self):
+        """Rebuild the occupancy grid used for spawning and paths around the streaming focus"""
+        focus_x, focus_z = self.streamer.focus
+        center = ((focus_x + 0.5) * CHUNK_SIZE, (focus_z + 0.5) * CHUNK_SIZE)
+        grid = OccupancyGrid(half_size=self.occupancy.half_size, cell_size=self.occupancy.cell_size, center=center)
+        self.rasterize_static(grid)
+        self.occupancy.move_to(center, grid.blocked)
+        self.occupancy_stale = False
+
+    def rasterize_static(self, grid):
+        """Block every loaded chunk's footprint in grid, and every chunk in the window not built yet"""
+        for key in self.streamer.window():
+            if key not in self.streamer.loaded:
+                # Nothing is known about it yet, so nothing may spawn or path there
+                x0, z0 = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+                grid.block_box(x0, z0, x0 + CHUNK_SIZE, z0 + CHUNK_SIZE, margin=0)
+        for chunk in self.chunks.values():
+            if chunk.footprint is not None:
+                grid.block_grid(chunk.footprint)
+
+    def rasterize_chunk(self, chunk):
+        """Rasterize the standing buildings, obstacles and bridges of one chunk into its footprint"""
+        x0, z0 = chunk.key[0] * chunk.chunk_size, chunk.key[1] * chunk.chunk_size
+        half = chunk.chunk_size / 2
+        # The apron catches footprints (and their margins) poking over the chunk's edge
+        grid = OccupancyGrid(
+            half_size=half + FOOTPRINT_APRON, cell_size=self.occupancy.cell_size, center=(x0 + half, z0 + half)
+        )
+        for entity in chunk.records + chunk.entities:
+            layer = layer_of(entity)
+            if layer & (BUILDING | OBSTACLE):
+                if getattr(entity, 'collapsed', False):
+                    continue  # Only rubble is left, which can be walked over
+                bounds = self.bounds_of(entity)
+                if not bounds:
+                    continue
+                low, high = bounds
+                grid.block_box(low.x, low.z, high.x, high.z)
+            
+            elif layer == BRIDGE:
+                # Bridges are rotated, so rasterize their actual footprint rather than an AABB
+                right, forward = entity.right, entity.forward
+                grid.block_rotated_box(
+                    entity.x, entity.z,
+                    (right.x, right.z), (forward.x, forward.z),
+                    entity.scale_x / 2, entity.scale_z / 2
                 )
-                # Make it blink
-                warning.animate_color(color.red, duration=0.5, loop=True)
-        
-        # Create bridges between some buildings
-        self.create_bridges()
+        chunk.footprint = grid
+
+    def bounds_of(self, entity):
+        """World-space (low, high) corners of a city entity or of a batched entity's record"""
+        if isinstance(entity, StaticRecord):
+            return entity.bounds
+        return entity.getTightBounds(scene)
+
+    def reopen_collapsed(self, building):
+        """Free the cells only a collapsed building was blocking, so enemies can path over the rubble"""
+        self.rasterize_chunk(self.chunks[building.chunk])
+        occupancy = self.occupancy
+        standing = OccupancyGrid(half_size=occupancy.half_size, cell_size=occupancy.cell_size, center=occupancy.center)
+        self.rasterize_static(standing)
+        occupancy.unblock(~standing.blocked)
+
+
+    def add_static_colliders(self, entities):
+        """Add building and obstacle boxes for the player's swept movement tests"""
+        boxed, lows, highs, layers = [], [], [], []
+        for entity in entities:
+            # Model obstacles sit inside a container next to their marker; use the model itself
+            body = entity.children[0] if layer_of(entity) == OBSTACLE and entity.children else entity
+            bounds = body.getTightBounds(scene)
+            if bounds:
+                boxed.append(entity)
+                lows.append(bounds[0])
+                highs.append(bounds[1])
+                layers.append(layer_of(entity))
+        self.static_colliders.add_many(boxed, lows, highs, layers)
         
-        # Create traffic with moving vehicles
-        self.create_traffic()
-    
-    def create_bridges(self):
-        """Create movable bridges between buildings"""
-        self.bridges = []
+        # Bridges are raised above the street and moving vehicles go through the
+        # spatial hash, so neither is part of the static set
+
+    def create_bridge(self, key, index, building1, building2):
+        """Create a movable bridge between two buildings"""
+        # Calculate bridge position and rotation
+        distance = (building1.position - building2.position).length()
+        bridge_pos = (building1.position + building2.position) / 2
+        direction = building2.position - building1.position
+        bridge_angle = math.degrees(math.atan2(direction.z, direction.x))
         
-        # Find pairs of buildings that are close enough for bridges
-        for i, building1 in enumerate(self.buildings):
-            for j, building2 in enumerate(self.buildings[i+1:], i+1):
-                # Calculate distance between buildings
-                distance = (building1.position - building2.position).length()
-                
-                # If buildings are between 8-15 units apart, they're candidates for a bridge
-                if 8 <= distance <= 15:
-                    # 25% chance to create a bridge
-                    if random.random() < 0.25:
-                        # Calculate bridge position and rotation
-                        bridge_pos = (building1.position + building2.position) / 2
-                        direction = building2.position - building1.position
-                        bridge_angle = math.degrees(math.atan2(direction.z, direction.x))
-                        
-                        # Create bridge entity
-                        bridge = Entity(
-                            model='cube',
-                            color=color.dark_gray,
-                            position=bridge_pos,
-                            scale=(distance, 0.5, 2),
-                            rotation_y=bridge_angle,
-                            collider='box',
-                            name=f'bridge_{len(self.bridges)}'
-                        )
-                        
-                        # Add railings
-                        left_railing = Entity(
-                            parent=bridge,
-                            model='cube',
-                            color=color.light_gray,
-                            position=(0, 0.5, -0.9),
-                            scale=(1, 0.5, 0.1)
-                        )
-                        
-                        right_railing = Entity(
-                            parent=bridge,
-                            model='cube',
-                            color=color.light_gray,
-                            position=(0, 0.5, 0.9),
-                            scale=(1, 0.5, 0.1)
-                        )
-                        
-                        # Store open/closed state
-                        bridge.is_open = False
-                        bridge.is_moving = False
-                        bridge.connected_buildings = (building1, building2)
-                        
-                        # Add bridge to dynamic elements
-                        self.bridges.append(bridge)
-                        self.dynamic_elements.append(bridge)
-                        
-                        print(f"Created bridge between buildings at ({bridge_pos.x:.1f}, {bridge_pos.z:.1f})")
-    
-    def create_traffic(self):
-        """Create moving vehicles that add dynamic obstacles"""
-        self.vehicles = []
+        # Create bridge entity
+        bridge = Entity(
+            model='cube',
+            color=color.dark_gray,
+            position=bridge_pos,
+            scale=(distance, 0.5, 2),
+            rotation_y=bridge_angle,
+            collider='box',
+            name=f'bridge_{key[0]}_{key[1]}_{index}'
+        )
+        set_layer(bridge, BRIDGE)
+        bridge.chunk = key
         
-        # Create a few main roads
-        for i in range(3):
-            # Create east-west road
-            z_pos = -15 + (i * 15)
-            
-            for j in range(3):  # 3 vehicles per road
-                # Create vehicle
-                vehicle = Entity(
-                    model='cube',
-                    color=color.random_color(),
-                    position=(random.uniform(-20, 20), 0.5, z_pos),
-                    scale=(2, 1, 1),
-                    collider='box',
-                    name=f'vehicle_ew_{i}_{j}'
-                )
-                
-                # Set movement properties
-                vehicle.direction = Vec3(1, 0, 0)  # Move east
-                if random.random() < 0.5:
-                    vehicle.direction = -vehicle.direction  # 50% chance to move west
-                    vehicle.rotation_y = 180
-                
-                vehicle.speed = random.uniform(3, 8)
-                vehicle.road_bounds = (-25, 25)  # X boundaries
-                
-                self.vehicles.append(vehicle)
-                self.dynamic_elements.append(vehicle)
-            
-            # Create north-south road
-            x_pos = -15 + (i * 15)
+        # Add railings
+        if not settings.headless:
+            left_railing = Entity(
+                parent=bridge,
+                model='cube',
+                color=color.light_gray,
+                position=(0, 0.5, -0.9),
+                scale=(1, 0.5, 0.1)
+            )
             
-            for j in range(3):  # 3 vehicles per road
-                # Create vehicle
-                vehicle = Entity(
-                    model='cube',
-                    color=color.random_color(),
-                    position=(x_pos, 0.5, random.uniform(-20, 20)),
-                    scale=(1, 1, 2),
-                    collider='box',
-                    name=f'vehicle_ns_{i}_{j}'
-                )
-                
-                # Set movement properties
-                vehicle.direction = Vec3(0, 0, 1)  # Move north
-                if random.random() < 0.5:
-                    vehicle.direction = -vehicle.direction  # 50% chance to move south
-                    vehicle.rotation_y = 180
-                
-                vehicle.speed = random.uniform(3, 8)
-                vehicle.road_bounds = (-25, 25)  # Z boundaries
-                
-                self.vehicles.append(vehicle)
-                self.dynamic_elements.append(vehicle)
+            right_railing = Entity(
+                parent=bridge,
+                model='cube',
+                color=color.light_gray,
+                position=(0, 0.5, 0.9),
+                scale=(1, 0.5, 0.1)
+            )
+        
+        # Store open/closed state
+        bridge.is_open = False
+        bridge.is_moving = False
+        bridge.connected_buildings = (building1, building2)
+        return bridge
     
-    def update(self):
-        """Update dynamic environment elements"""
+    def spawn_vehicle(self, axis, position, direction, speed, vehicle_color, road_bounds=(-25, 25)):
+        vehicle = self.vehicle_pool.acquire(axis)
+        vehicle.spawn(position, direction, speed, vehicle_color, road_bounds)
+        self.vehicles.append(vehicle)
+        self.dynamic_elements.append(vehicle)
+        if self.spatial_hash is not None:
+            self.spatial_hash.insert(vehicle, vehicle.x, vehicle.z, VEHICLE)
+        return vehicle
+    
+    def remove_vehicle(self, vehicle):
+        self.vehicles.remove(vehicle)
+        self.dynamic_elements.remove(vehicle)
+        if self.spatial_hash is not None:
+            self.spatial_hash.remove(vehicle)
+        self.vehicle_pool.release(vehicle)
+
+    def tick(self, dt):
+        """Update dynamic environment elements by dt seconds (driven by Game)"""
         # Update elements like collapsing buildings, moving bridges and vehicles
         for element in self.dynamic_elements:
             # Handle collapsible buildings
-            if hasattr(element, 'collapsible') and not getattr(element, 'collapsed', True):
+            if getattr(element, 'collapsible', False) and not element.collapsed:
                 # Small random chance for buildings to collapse
                 if random.random() < 0.0005:  # Very low chance per frame
                     element.collapsed = True
-                    element.animate_scale((element.scale_x, 0.2, element.scale_z), duration=1.0)
-                    element.animate_position((element.x, 0.1, element.z), duration=1.0)
+                    self.static_colliders.set_top(element, 0.2)  # Only rubble is left
+                    self.reopen_collapsed(element)
+                    if settings.headless:
+                        element.scale_y = 0.2
+                        element.y = 0.1
+                    else:
+                        element.animate_scale((element.scale_x, 0.2, element.scale_z), duration=1.0)
+                        element.animate_position((element.x, 0.1, element.z), duration=1.0)
                     print(f"Building {element.name} collapsed!")
                     
                     # Create dust cloud effect
-                    self.create_collapse_effect(element.position)
+                    if self.particles is not None:
+                        self.create_collapse_effect(element.position)
             
             # Handle bridges opening/closing
-            if element in self.bridges and not element.is_moving:
+            layer = layer_of(element)
+            if layer == BRIDGE and not element.is_moving:
                 # Random chance to change bridge state
                 if random.random() < 0.0002:  # Very low chance per frame
                     self.toggle_bridge(element)
             
             # Handle moving vehicles
-            if element in self.vehicles:
+            if layer == VEHICLE:
                 # Move vehicle
-                element.position += element.direction * element.speed * time.dt
+                element.position += element.direction * element.speed * dt
+                if self.spatial_hash is not None:
+                    self.spatial_hash.move(element, element.x, element.z)
                 
                 # Check if reached boundary
                 if element.direction.x != 0:  # East-west movement
@@ -574,6 +693,13 @@ class Environment(Entity):
         if bridge.is_moving:
             return
             
+        if settings.headless:
+            # Snap straight to the new state without tweening
+            bridge.is_open = not bridge.is_open
+            bridge.y = 5 if bridge.is_open else 1
+            print(f"{'Opening' if bridge.is_open else 'Closing'} bridge {bridge.name}")
+            return
+            
         bridge.is_moving = True
         if bridge.is_open:
             # Close the bridge
@@ -595,34 +721,15 @@ class Environment(Entity):
             bridge.is_open = True
             
         # Reset is_moving after animation completes
-        invoke(setattr, bridge, 'is_moving', False, delay=2.1)
+        self.timers.after(2.1, setattr, bridge, 'is_moving', False)
     
     def create_collapse_effect(self, position):
         """Create dust cloud effect when buildings collapse"""
-        # Create multiple dust particles
-        for _ in range(20):
-            dust = Entity(
-                model='sphere',
-                color=color.light_gray,
-                position=position + Vec3(
-                    random.uniform(-2, 2),
-                    random.uniform(0, 3),
-                    random.uniform(-2, 2)
-                ),
-                scale=random.uniform(0.5, 1.5)
-            )
-            
-            # Animate the dust particles
-            dust.animate_scale(0, duration=random.uniform(1.0, 2.0))
-            dust.animate_color(color.rgba(0.7, 0.7, 0.7, 0), duration=random.uniform(1.0, 2.0))
-            dust.animate_position(
-                dust.position + Vec3(
-                    random.uniform(-3, 3),
-                    random.uniform(1, 5),
-                    random.uniform(-3, 3)
-                ),
-                duration=random.uniform(1.0, 2.0)
-            )
-            
-            # Destroy after animation
-            destroy(dust, delay=2.0)
\ No newline at end of file
+        count = 20
+        origins = np.asarray(position, dtype=np.float32) + spread(count, (-2, 0, -2), (2, 3, 2))
+        self.particles.collapse_dust.emit(
+            origins, spread(count, (-3, 1, -3), (3, 5, 3)),
+            sizes=np.random.uniform(0.5, 1.5, count),
+            lifetimes=np.random.uniform(1.0, 2.0, count),
+            color=color.light_gray, end_color=color.rgba(0.7, 0.7, 0.7, 0)
+        )
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+
+class EventBus:
+    """Synchronous publish/subscribe bus keyed by event class.
+
+    Handlers are looked up by the exact type of the published event, so a
+    publish only costs as much as the number of subscribers to that type.
+    """
+
+    def __init__(self):
+        self.subscribers = {}  # {event class: [handler]}
+
+    def subscribe(self, event_type, handler):
+        self.subscribers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type, handler):
+        handlers = self.subscribers.get(event_type)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+
+    def publish(self, event):
+        # Copy so handlers can (un)subscribe while the event is being delivered
+        for handler in tuple(self.subscribers.get(type(event), ())):
+            handler(event)
+
+    def clear(self):
+        self.subscribers.clear()
+
+
+@dataclass
+class Damaged:
+    """The player lost health"""
+    health: int
+    source: str  # 'building', 'vehicle' or 'tail'
+
+
+@dataclass
+class Healed:
+    """The player regained health"""
+    health: int
+
+
+@dataclass
+class ScoreChanged:
+    score: int
+    points: int  # How much was just added
+
+
+@dataclass
+class ComboChanged:
+    """The combo counter went up (with a score bonus) or expired (count 0)"""
+    count: int
+    bonus: int = 0
+
+
+@dataclass
+class PowerUpApplied:
+    powerup_type: str
+    duration: float
+
+
+@dataclass
+class PowerUpExpired:
+    powerup_type: str
+
+
+@dataclass
+class GameOver:
+    score: int
+
+
+@dataclass
+class GameRestarted:
+    pass
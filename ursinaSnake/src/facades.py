@@ -0,0 +1,174 @@
+import os
+import numpy as np
+from panda3d.core import Texture as PandaTexture
+
+WINDOW_COLOR = (179, 230, 255)  # Lit windows
+DARK_WINDOW_COLOR = (30, 30, 40)
+LIT_CHANCE = 0.7
+VARIANTS_PER_COLOR = 8  # Buildings of one base colour share this many facades
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "facades")
+
+
+def facade_key(seed, base_color, size=128):
+    """Cache key for a facade: its seed, 8-bit RGB base colour and size"""
+    rgb = tuple(int(channel * 255) for channel in tuple(base_color)[:3])
+    return (int(seed), rgb, int(size))
+
+
+def facade_pixels(key):
+    """RGBA facade (size x size x 4 uint8, top row first) with windows, floor lines, edges and noise.
+
+    Everything is computed as whole-image masks instead of drawing
+    rectangles one at a time, and the same key always gives the same image.
+    """
+    seed, (r, g, b), size = key
+    rng = np.random.default_rng(seed)
+    num_floors = int(rng.integers(4, 9))
+    num_windows_x = int(rng.integers(3, 7))
+    lit = rng.random((num_floors, num_windows_x)) < LIT_CHANCE
+
+    window_width = size // (num_windows_x * 2)
+    window_height = size // (num_floors * 2)
+    spacing_x = size // num_windows_x
+    spacing_y = size // num_floors
+
+    ys = np.arange(size)[:, None]
+    xs = np.arange(size)[None, :]
+    floor, window = ys // spacing_y, xs // spacing_x
+    in_x = np.abs(xs % spacing_x - (spacing_x - window_width) // 2 - window_width / 2) <= window_width / 2
+    in_y = np.abs(ys % spacing_y - (spacing_y - window_height) // 2 - window_height / 2) <= window_height / 2
+    in_window = in_x & in_y & (floor < num_floors) & (window < num_windows_x)
+    window_lit = lit[np.minimum(floor, num_floors - 1), np.minimum(window, num_windows_x - 1)]
+
+    pixels = np.empty((size, size, 4), dtype=np.int16)
+    pixels[:] = (r, g, b, 255)
+    pixels[in_window & window_lit, :3] = WINDOW_COLOR
+    pixels[in_window & ~window_lit, :3] = DARK_WINDOW_COLOR
+
+    # Lines between floors, then a lighter edge around the whole facade
+    offset = ys % spacing_y
+    floor_line = ((offset == 0) | (offset == spacing_y - 1)) & (ys <= num_floors * spacing_y)
+    pixels[np.broadcast_to(floor_line, (size, size)), :3] = (r // 2, g // 2, b // 2)
+    edge = (np.minimum(ys, size - 1 - ys) < 3) | (np.minimum(xs, size - 1 - xs) < 3)
+    pixels[edge, :3] = (min(r + 30, 255), min(g + 30, 255), min(b + 30, 255))
+
+    # Add some texture/noise for realism
+    pixels[:, :, :3] += rng.integers(-10, 10, (size, size, 3), dtype=np.int16)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def cache_path(key):
+    seed, (r, g, b), size = key
+    return os.path.join(CACHE_DIR, f"{seed}_{r:02x}{g:02x}{b:02x}_{size}.npy")
+
+
+def load_cached(key):
+    path = cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable facade cache file {path}: {e}")
+        return None
+
+
+def save_cached(key, pixels):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, pixels)
+    os.replace(tmp_path, path)  # Never leave a half-written file under the real name
+
+
+def bake_facades(keys):
+    """{key: pixels} for every key, from the disk cache or freshly generated.
+
+    Missing facades are generated in-process and written back to the
+    cache; the few dozen variants the game uses take well under a second,
+    less than starting a process pool would.
+    """
+    facades = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        pixels = load_cached(key)
+        if pixels is None:
+            missing.append(key)
+        else:
+            facades[key] = pixels
+
+    for key in missing:
+        pixels = facade_pixels(key)
+        facades[key] = pixels
+        try:
+            save_cached(key, pixels)
+        except OSError as e:
+            print(f"Could not cache facade {key}: {e}")
+    if missing:
+        print(f"Baked {len(missing)} building facades ({len(facades) - len(missing)} from cache)")
+    return facades
+
+
+def upload_texture(pixels):
+    """Panda texture straight from an RGBA pixel array (top row first)"""
+    height, width = pixels.shape[:2]
+    texture = PandaTexture()
+    texture.setup2dTexture(width, height, PandaTexture.TUnsignedByte, PandaTexture.FRgba)
+    texture.setRamImageAs(np.ascontiguousarray(pixels[::-1]).tobytes(), 'RGBA')
+    return texture
+
+
+class FacadeAtlas:
+    """Facade tiles packed into a few shared texture pages.
+
+    Each page is a grid of tile_size tiles uploaded as one texture, so
+    buildings that share a page share a texture and only differ in UVs.
+    At most max_pages pages are ever made, capping texture memory; once
+    they are full, further facades reuse an existing tile.
+    """
+
+    def __init__(self, tile_size=128, page_size=1024, max_pages=2):
+        self.tile_size = tile_size
+        self.tiles_per_row = page_size // tile_size
+        self.tiles_per_page = self.tiles_per_row ** 2
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = []      # RGBA pixel arrays, top row first
+        self.textures = []   # Uploaded pages, filled in by upload()
+        self.slot_of = {}    # {facade key: (page, column, row)}
+
+    @property
+    def capacity(self):
+        return self.max_pages * self.tiles_per_page
+
+    def add(self, key, pixels):
+        """Place a facade in the atlas (a no-op if it is already there)"""
+        if key in self.slot_of:
+            return self.slot_of[key]
+        index = len(self.slot_of)
+        if index >= self.capacity:
+            # Full: share the tile of an earlier facade instead of growing
+            slot = list(self.slot_of.values())[hash(key) % self.capacity]
+            self.slot_of[key] = slot
+            return slot
+        page, within = divmod(index, self.tiles_per_page)
+        row, column = divmod(within, self.tiles_per_row)
+        if page == len(self.pages):
+            self.pages.append(np.zeros((self.page_size, self.page_size, 4), dtype=np.uint8))
+        t = self.tile_size
+        self.pages[page][row * t:(row + 1) * t, column * t:(column + 1) * t] = pixels
+        self.slot_of[key] = (page, column, row)
+        return self.slot_of[key]
+
+    def upload(self):
+        self.textures = [upload_texture(page) for page in self.pages]
+
+    def uvs(self, key):
+        """(page index, uv offset, uv scale) that map a model's 0-1 UVs onto the facade's tile"""
+        page, column, row = self.slot_of[key]
+        scale = 1 / self.tiles_per_row
+        # Pages are stored top row first, but v runs bottom to top
+        offset = (column * scale, 1 - (row + 1) * scale)
+        return page, offset, (scale, scale)
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Neighbour offsets (dix, diz): orthogonal first, then diagonal
+OFFSETS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+UNREACHED = np.iinfo(np.int32).max
+
+
+class FlowField:
+    """Shared path to the player over the occupancy grid, for every chasing enemy at once.
+
+    One breadth-first search runs outwards from the player's cell; each
+    cell then points at its neighbour closest to the player. Enemies look
+    up the cell they stand in instead of steering straight at the player,
+    so they walk around buildings. The search only covers a window of
+    radius cells around the player (enemies further out aren't chasing)
+    and is redone only when the player enters a new cell or the grid's
+    blocked cells change. It only ever reads OccupancyViews handed in by
+    the main thread, never the live grid, so it can run on a worker.
+    """
+
+    def __init__(self, radius=24):
+        self.radius = radius
+        self.occupancy = None   # OccupancyView the field was built from
+        self.goal = None        # Player cell the field currently leads to
+        self.origin = (0, 0)    # Grid index of the window's first cell
+        self.dir_x = np.zeros((0, 0), dtype=np.float32)
+        self.dir_z = np.zeros((0, 0), dtype=np.float32)
+        self.searches = 0
+
+    def update(self, occupancy, x, z):
+        """Follow the player to (x, z) on an OccupancyView; returns True if the field was rebuilt"""
+        goal = occupancy.cell_of(x, z)
+        if goal == self.goal and self.occupancy is not None and occupancy.version == self.occupancy.version:
+            return False
+        self.occupancy = occupancy
+        self.goal = goal
+        if goal is None:
+            # Player is off the grid: nothing to follow, everyone steers straight
+            self.dir_x = self.dir_z = np.zeros((0, 0), dtype=np.float32)
+            return True
+        self.build(goal)
+        return True
+
+    def build(self, goal):
+        size = self.occupancy.size
+        ix0, iz0 = max(goal[0] - self.radius, 0), max(goal[1] - self.radius, 0)
+        ix1, iz1 = min(goal[0] + self.radius + 1, size), min(goal[1] + self.radius + 1, size)
+        self.origin = (ix0, iz0)
+        passable = ~self.occupancy.blocked[ix0:ix1, iz0:iz1]
+        gx, gz = goal[0] - ix0, goal[1] - iz0
+        passable[gx, gz] = True  # The player may stand in a building's margin
+
+        # Wavefront BFS: grow the reached region by one orthogonal step per ring
+        distance = np.full(passable.shape, UNREACHED, dtype=np.int32)
+        distance[gx, gz] = 0
+        frontier = np.zeros(passable.shape, dtype=bool)
+        frontier[gx, gz] = True
+        ring = 0
+        while frontier.any():
+            ring += 1
+            grown = np.zeros_like(frontier)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            frontier = grown & passable & (distance == UNREACHED)
+            distance[frontier] = ring
+        self.searches += 1
+
+        # Point every reached cell at its nearest-to-goal neighbour
+        padded_distance = np.pad(distance, 1, constant_values=UNREACHED)
+        padded_passable = np.pad(passable, 1, constant_values=False)
+        w, h = distance.shape
+        neighbours = np.empty((len(OFFSETS), w, h), dtype=np.int32)
+        for i, (dix, diz) in enumerate(OFFSETS):
+            neighbours[i] = padded_distance[1 + dix:1 + dix + w, 1 + diz:1 + diz + h]
+            if dix and diz:
+                # No cutting corners past a blocked cell
+                clear = (padded_passable[1 + dix:1 + dix + w, 1:1 + h]
+                         & padded_passable[1:1 + w, 1 + diz:1 + diz + h])
+                neighbours[i][~clear] = UNREACHED
+        best = np.argmin(neighbours, axis=0)
+        downhill = np.take_along_axis(neighbours, best[None], axis=0)[0] < distance
+
+        step = OFFSETS[best] / np.linalg.norm(OFFSETS[best], axis=-1, keepdims=True)
+        self.dir_x = np.where(downhill, step[..., 0], 0).astype(np.float32)
+        self.dir_z = np.where(downhill, step[..., 1], 0).astype(np.float32)
+
+    def directions(self, xs, zs):
+        """Unit steering (dx, dz) for positions, plus a mask of those the field covers.
+
+        Positions outside the window, cut off from the player or already in
+        the player's cell are not covered; steer those straight.
+        """
+        w, h = self.dir_x.shape
+        if not w or not h:
+            zeros = np.zeros(len(xs), dtype=np.float32)
+            return zeros, zeros, np.zeros(len(xs), dtype=bool)
+        occupancy = self.occupancy
+        ix = np.floor((xs - occupancy.min_x) / occupancy.cell_size).astype(np.int64) - self.origin[0]
+        iz = np.floor((zs - occupancy.min_z) / occupancy.cell_size).astype(np.int64) - self.origin[1]
+        inside = (ix >= 0) & (ix < w) & (iz >= 0) & (iz < h)
+        ix, iz = np.where(inside, ix, 0), np.where(inside, iz, 0)
+        dx, dz = self.dir_x[ix, iz], self.dir_z[ix, iz]
+        covered = inside & ((dx != 0) | (dz != 0))
+        return dx, dz, covered
@@ -1,20 +1,37 @@
 from ursina import *
 import random  # Make sure random is imported
+import settings
 
 try:
     from player import Player
     from enemy import Enemy
-    from environment import Environment
+    from environment import Environment, Vehicle
     from powerup import PowerUp
     from ui import UI  # Import the UI class
+    from snake_body import SnakeBody
     from camera import setup_camera
+    from timestep import FixedTimestep, TransformInterpolator
+    from timers import Timers
+    from tweens import TweenManager
+    from particles import Particles, ParticleEmitter
+    from pool import Pool
+    from audit import EntityAuditor
+    from city_batch import CityChunk
+    from spatial_hash import SpatialHash
+    from swarm import EnemySwarm
+    from flow_field import FlowField
+    from layers import layer_of, name_of, ENEMY, POWERUP, VEHICLE, PLAYER_HITS, STATIC, GROUND
+    from events import EventBus, ComboChanged, ScoreChanged, GameOver, GameRestarted
 except ImportError as e:
     print(f"Import error in game.py: {e}")
     raise
 
 class Game(Entity):
-    def __init__(self):
+    def __init__(self, city_seed=None):
         super().__init__()
+        # Headless games simulate without UI, camera or visual effects; the entry point picks the mode
+        self.headless = settings.headless
+        self.city_seed = city_seed  # Same seed, same city; None picks one from the game's random state
         self.player = None
         self.enemies = []
         self.powerups = []
@@ -25,16 +42,55 @@ class Game(Entity):
         self.started = False
         self.mode = 'normal'
         self.mode_text = None
+        self.paused = False
         
         # Power-up spawning
         self.powerup_spawn_timer = 0
         self.powerup_spawn_interval = 15  # Spawn a power-up every 15 seconds
         self.max_powerups = 3  # Maximum number of power-ups allowed at once
+        
+        # Fixed-rate simulation, decoupled from the render frame rate
+        self.timestep = FixedTimestep(rate=60, max_steps=5)
+        self.interpolator = TransformInterpolator()
+        # Power-up durations, cooldowns and delayed calls, on simulation time
+        self.timers = Timers()
+        # Looping visual animations (bob, spin, pulse, colour) advanced in one batch per frame
+        self.tweens = TweenManager()
+        # Pooled particle effects, each drawn as a single mesh (nothing to draw headless)
+        self.particles = None if self.headless else Particles()
+        
+        # Enemies and power-ups are reused rather than rebuilt, one free list per type
+        self.enemy_pool = Pool(
+            lambda enemy_type: Enemy(enemy_type=enemy_type, particles=self.particles),
+            keys=Enemy.TYPES
+        )
+        self.powerup_pool = Pool(
+            lambda powerup_type: PowerUp(powerup_type=powerup_type, tweens=self.tweens, particles=self.particles),
+            keys=PowerUp.TYPES
+        )
+        
+        # Entity counts per subsystem, to catch scene graph leaks (F9 prints a report)
+        self.auditor = EntityAuditor()
+        
+        # Every enemy's movement, simulated in arrays rather than per entity; paths and
+        # neighbour queries run on a worker thread (inline when headless, to stay deterministic)
+        self.swarm = EnemySwarm(particles=self.particles, threaded=not self.headless)
+        
+        # Broadphase for player collisions: power-ups and vehicles register here
+        self.spatial_hash = SpatialHash(cell_size=4.0)
+        self.collision_query_radius = 2.0  # player half-size + largest collider half-size
+        
+        # Game, player and UI talk through events instead of searching the scene for each other
+        self.events = EventBus()
+        self.events.subscribe(ComboChanged, self.on_combo)
 
     def setup(self):
+        if self.headless:
+            return
+            
         try:
             # Setup UI first
-            self.ui = UI()
+            self.ui = UI(self.events)
             
             # Show mode selection text
             self.mode_text = Text(text="Choose mode: 1=Normal, 2=Crazy", origin=(0, 0), scale=2, color=color.azure)
@@ -50,60 +106,155 @@ class Game(Entity):
             destroy(self.mode_text)
         
         # Setup player and pass UI reference for health updates
-        self.player = Player()
+        self.player = Player(events=self.events, timers=self.timers)
         self.player.crazy_mode = (self.mode == 'crazy')
-        self.player.max_health = self.ui.max_health  # Sync max health
-        self.player.health = self.ui.health  # Sync initial health
+        if self.ui:
+            self.player.max_health = self.ui.max_health  # Sync max health
+            self.player.health = self.ui.health  # Sync initial health
         
         # Setup the rest of the game
         self.setup_environment()
+        self.player.static_colliders = self.environment.static_colliders
+        self.enemy_pool.prewarm(2)
+        self.powerup_pool.prewarm(1)
+        self.register_audit()
         self.spawn_enemies()
         self.spawn_powerup()
+        self.started = True
+        
+        if self.headless:
+            return
+            
         # Initialize camera after player is created
         self.camera_controller = setup_camera(self.player)
         # Set default camera view to third-person
         self.set_camera_view('third')
-        self.started = True
+
+    def register_audit(self):
+        """Tell the auditor which subsystem owns which entities"""
+        environment = self.environment
+        self.auditor.register('player', (Player, SnakeBody), held=lambda: [self.player, self.player.body])
+        self.auditor.register('enemies', Enemy, held=lambda: self.enemies + self.enemy_pool.free_objects())
+        self.auditor.register('powerups', PowerUp, held=lambda: self.powerups + self.powerup_pool.free_objects())
+        self.auditor.register(
+            'vehicles', Vehicle,
+            held=lambda: environment.vehicles + environment.vehicle_pool.free_objects()
+        )
+        self.auditor.register(
+            'city', lambda entity: entity is environment or isinstance(entity, CityChunk) or layer_of(entity) & (STATIC | GROUND)
+        )
+        self.auditor.register('particles', ParticleEmitter, held=lambda: self.particles.emitters if self.particles else [])
+        self.auditor.register('ui', (UI, Text))
 
     def spawn_enemies(self):
         for _ in range(5):  # Spawn 5 enemies for example
-            enemy = Enemy()
-            self.enemies.append(enemy)
+            self.spawn_enemy()
+
+    def spawn_enemy(self):
+        position = self.free_spawn_position()
+        enemy = self.enemy_pool.acquire(random.choice(list(Enemy.TYPES)))
+        enemy.spawn(position)
+        self.add_enemy(enemy)
+
+    def add_enemy(self, enemy):
+        self.enemies.append(enemy)
+        self.swarm.add(enemy)
+
+    def remove_enemy(self, enemy):
+        self.enemies.remove(enemy)
+        self.swarm.remove(enemy)
+        self.enemy_pool.release(enemy)
+
+    def free_spawn_position(self):
+        """Random spot clear of buildings, obstacles and bridges"""
+        position = self.environment.occupancy.random_free_position(y=1)
+        return position or (0, 1, -10)  # Fallback if the city has no free cells
 
     def setup_environment(self):
         # Initialize the game environment here
-        self.environment = Environment()
+        # City chunks stream in around the player, read on a worker thread unless headless
+        self.environment = Environment(
+            spatial_hash=self.spatial_hash, timers=self.timers, tweens=self.tweens, particles=self.particles,
+            seed=self.city_seed, threaded=not self.headless
+        )
+        # One search from the player's cell steers every chasing enemy around the city
+        self.swarm.decisions.flow_field = FlowField()
+        self.swarm.occupancy = self.environment.occupancy
+        self.swarm.bounds = self.environment.occupancy.bounds
 
     def update(self):
+        if self.headless or not self.started or self.paused:
+            return  # Headless games are stepped explicitly
+            
+        # Run as many fixed steps as the frame time allows, then blend for rendering
+        entities = self.interpolated_entities()
+        steps = self.timestep.advance(time.dt)
+        if steps:
+            self.interpolator.restore(entities)
+            for _ in range(steps):
+                # Spawns and removals change the tracked set between steps
+                entities = self.interpolated_entities()
+                self.interpolator.capture_previous(entities)
+                self.step(self.timestep.step_dt)
+            entities = self.interpolated_entities()
+            self.interpolator.capture_current(entities)
+        self.interpolator.apply(entities, self.timestep.alpha)
+        self.swarm.apply(self.timestep.alpha)  # Enemies blend from their own arrays
+        self.tweens.advance(time.dt)
+        self.particles.advance(time.dt)
+
+    def interpolated_entities(self):
+        """Entities moved by the simulation whose rendered transform is interpolated"""
+        entities = [self.player]
+        entities.extend(self.environment.vehicles)
+        return entities
+
+    def step(self, dt):
+        """Advance the whole game simulation by dt seconds"""
         if not self.started:
             return
 
+        self.timers.advance(dt)
+        
+        # Load the chunks the player is heading into and drop the ones left behind
+        if self.environment.stream(self.player.position):
+            self.fit_to_city()
+        
+        # The city keeps moving even after game over
+        self.environment.tick(dt)
+
         if not self.game_over:
             # Update player and enemies
-            self.player.update()
-            # Clamp player within city bounds
-            x = min(max(self.player.position.x, -20), 20)
-            z = min(max(self.player.position.z, -20), 20)
-            if x != self.player.position.x or z != self.player.position.z:
-                self.player.position = Vec3(x, self.player.position.y, z)
-
-            for enemy in self.enemies:
-                enemy.update()
+            self.player.tick(dt)
+            self.swarm.step(dt, self.player.position)
             self.check_collisions()
-            self.update_powerups()
-            
-            # Update UI score from game state
-            if self.ui:
-                self.ui.set_score(self.score)
+            self.update_powerups(dt)
             
             # Check for game over condition
             if self.player and self.player.health <= 0:
                 self.game_over_sequence()
 
-    def update_powerups(self):
+    def fit_to_city(self):
+        """Keep enemies and power-ups within the loaded part of the city after it moved"""
+        occupancy = self.environment.occupancy
+        self.swarm.bounds = occupancy.bounds
+        # Enemies left behind come back somewhere near the player
+        for enemy in self.swarm.outside(*occupancy.bounds):
+            self.remove_enemy(enemy)
+            self.spawn_enemy()
+        
+        # The grid was rebuilt, so every power-up claims its cell again
+        for powerup in list(self.powerups):
+            powerup.spawn_cell = occupancy.cell_id_of(powerup.x, powerup.z)
+            if powerup.spawn_cell is None:
+                self.release_powerup(powerup)
+            else:
+                occupancy.claim(powerup.spawn_cell)
+
+    def update_powerups(self, dt):
         """Handle power-up spawning and timeouts"""
         # Update power-up spawn timer
-        self.powerup_spawn_timer += time.dt
+        self.powerup_spawn_timer += dt
         
         # Spawn new power-up if timer expired and below max limit
         if self.powerup_spawn_timer >= self.powerup_spawn_interval and len(self.powerups) < self.max_powerups:
@@ -112,89 +263,107 @@ class Game(Entity):
 
     def spawn_powerup(self):
         """Spawn a random power-up in the game world"""
-        # Find a safe position away from buildings
-        for _ in range(10):  # Try up to 10 times to find a good spot
-            pos_x = random.uniform(-20, 20)
-            pos_z = random.uniform(-20, 20)
-            
-            # Check if position is clear of buildings
-            hit_info = raycast(
-                origin=Vec3(pos_x, 10, pos_z),  # Cast from above
-                direction=Vec3(0, -1, 0),  # Cast downward
-                distance=20,
-                ignore=[self.player] + self.player.segments
-            )
-            
-            # If no building at position, it's safe to spawn
-            if not hit_info.hit or not hasattr(hit_info.entity, 'name') or 'building' not in hit_info.entity.name:
-                # Create power-up at position
-                powerup = PowerUp(position=(pos_x, 1, pos_z))
-                self.powerups.append(powerup)
-                print(f"Spawned {powerup.powerup_type} power-up at ({pos_x:.1f}, 1, {pos_z:.1f})")
-                return
+        occupancy = self.environment.occupancy
         
-        # If we couldn't find a safe spot after 10 tries, spawn at a default location
-        powerup = PowerUp(position=(0, 1, -10))
+        # Take a free cell so other pickups can't land on the same spot
+        cell = occupancy.random_free_cell()
+        if cell is None:
+            # Fall back to a default location if the city is full
+            powerup = self.acquire_powerup((0, 1, -10))
+            powerup.spawn_cell = None
+            self.add_powerup(powerup)
+            print(f"Spawned {powerup.powerup_type} power-up at fallback position")
+            return
+            
+        occupancy.claim(cell)
+        pos_x, pos_z = occupancy.cell_center(cell)
+        powerup = self.acquire_powerup((pos_x, 1, pos_z))
+        powerup.spawn_cell = cell
+        self.add_powerup(powerup)
+        print(f"Spawned {powerup.powerup_type} power-up at ({pos_x:.1f}, 1, {pos_z:.1f})")
+
+    def acquire_powerup(self, position):
+        powerup = self.powerup_pool.acquire(random.choice(list(PowerUp.TYPES)))
+        powerup.spawn(position)
+        return powerup
+
+    def add_powerup(self, powerup):
         self.powerups.append(powerup)
-        print(f"Spawned {powerup.powerup_type} power-up at fallback position")
+        self.spatial_hash.insert(powerup, powerup.x, powerup.z, POWERUP)
+
+    def release_powerup(self, powerup):
+        """Give a power-up's spawn cell back to the free list and the power-up to its pool"""
+        if powerup.spawn_cell is not None:
+            self.environment.occupancy.release(powerup.spawn_cell)
+        self.powerups.remove(powerup)
+        self.spatial_hash.remove(powerup)
+        self.powerup_pool.release(powerup)
 
     def check_collisions(self):
-        # Check enemy collisions
-        for enemy in list(self.enemies):
-            if not enemy or not self.player:
-                continue
-                
-            try:
-                # Check collision with enemy
-                hit_info = self.player.intersects(enemy)
-                if hit_info.hit:
-                    print(f"Hit enemy! Distance: {hit_info.distance}")
-                    # Increase score
-                    self.score += 1
-                    print(f"Score: {self.score}")
-                    # Remove the enemy
-                    enemy.disable()
-                    self.enemies.remove(enemy)
-                    # Grow the snake
-                    self.player.grow()
-                    # Add to combo
-                    self.player.add_combo()
-                    # Spawn a new enemy
-                    new_enemy = Enemy(position=(random.uniform(-15, 15), 1, random.uniform(-15, 15)))
-                    self.enemies.append(new_enemy)
-            except Exception as e:
-                print(f"Error in enemy collision detection: {e}")
-        
-        # Check power-up collisions
-        for powerup in list(self.powerups):
-            if not powerup or not self.player:
-                continue
-                
+        if not self.player:
+            return
+            
+        # Broadphase: only objects near the player get an exact intersects() test
+        x, z, radius = self.player.x, self.player.z, self.collision_query_radius
+        candidates = [(enemy, ENEMY) for enemy in self.swarm.near(x, z, radius)]
+        candidates += self.spatial_hash.query(x, z, radius, mask=PLAYER_HITS & ~ENEMY)
+        for entity, layer in candidates:
             try:
-                # Check collision with power-up
-                hit_info = self.player.intersects(powerup)
-                if hit_info.hit:
-                    print(f"Collected power-up: {powerup.powerup_type}")
-                    # Activate power-up effect
-                    powerup.on_collect(self.player)
-                    # Remove from tracking list
-                    self.powerups.remove(powerup)
+                hit_info = self.player.intersects(entity)
+                if not hit_info.hit:
+                    continue
+                    
+                if layer == ENEMY:
+                    self.eat_enemy(entity, hit_info)
+                elif layer == POWERUP:
+                    self.collect_powerup(entity)
+                elif layer == VEHICLE:
+                    self.player.handle_vehicle_collision()
             except Exception as e:
-                print(f"Error in power-up collision detection: {e}")
+                print(f"Error in {name_of(layer)} collision detection: {e}")
+
+    def eat_enemy(self, enemy, hit_info):
+        print(f"Hit enemy! Distance: {hit_info.distance}")
+        # Increase score
+        self.add_score(1)
+        print(f"Score: {self.score}")
+        # Remove the enemy
+        enemy.burst()
+        self.remove_enemy(enemy)
+        # Grow the snake
+        self.player.grow()
+        # Add to combo
+        self.player.add_combo()
+        # Spawn a new enemy
+        self.spawn_enemy()
+
+    def add_score(self, points):
+        self.score += points
+        self.events.publish(ScoreChanged(self.score, points))
+
+    def on_combo(self, event):
+        if event.bonus:
+            self.add_score(event.bonus)
+
+    def collect_powerup(self, powerup):
+        print(f"Collected power-up: {powerup.powerup_type}")
+        # Activate power-up effect
+        powerup.on_collect(self.player)
+        # Remove from tracking list
+        self.release_powerup(powerup)
     
     def game_over_sequence(self):
         """Handle game over state when player's health reaches 0"""
         if not self.game_over:
             self.game_over = True
             print("GAME OVER")
-            # Create game over text
-            Text(text="GAME OVER", origin=(0, 0), scale=3, color=color.red)
-            Text(text=f"Final Score: {self.score}", origin=(0, 0), position=(0, -0.1), scale=2, color=color.yellow)
-            Text(text="Press R to restart", origin=(0, 0), position=(0, -0.2), scale=1.5, color=color.white)
             
             # Disable player movement
             if self.player:
                 self.player.disable_movement = True
+            
+            # The UI shows the game over screen
+            self.events.publish(GameOver(self.score))
 
     def input(self, key):
         """Handle input for game functionality like restart"""
@@ -208,6 +377,10 @@ class Game(Entity):
 
         if key == 'r' and self.game_over:
             self.restart()
+        elif key == 'p':
+            self.toggle_pause()
+        elif key == 'f9':
+            self.auditor.report()
         
         # Toggle camera view with keys 1/2
         elif key == '1':
@@ -217,47 +390,49 @@ class Game(Entity):
             self.set_camera_view('third')
             print("Third-person view activated")
     
+    def toggle_pause(self):
+        """Freeze the simulation, including every pending timer"""
+        self.paused = not self.paused
+        self.timers.paused = self.paused
+        if not self.paused:
+            self.timestep.reset()  # Don't catch up on the time spent paused
+        print("Paused" if self.paused else "Resumed")
+
     def restart(self):
         """Restart the game when R is pressed after game over"""
-        # Clean up existing entities
-        for enemy in self.enemies:
-            destroy(enemy)
-        self.enemies = []
-        
-        # Clean up power-ups
-        for powerup in self.powerups:
-            destroy(powerup)
-        self.powerups = []
+        # Return enemies and power-ups to their pools
+        for enemy in list(self.enemies):
+            self.remove_enemy(enemy)
+        for powerup in list(self.powerups):
+            self.release_powerup(powerup)
         
         if self.player:
             # Reset player position and segments
             self.player.reset()
             self.player.disable_movement = False
+            # Back at the start, which may have been unloaded
+            if self.environment.stream(self.player.position, wait=True):
+                self.fit_to_city()
+        
+        # Positions were changed outside a sim step, so don't blend from the old ones
+        self.interpolator.clear()
+        self.timestep.reset()
         
         # Reset game state
         self.game_over = False
         self.score = 0
         self.powerup_spawn_timer = 0
-        # Immediately reset UI score
-        if self.ui:
-            self.ui.set_score(self.score)
         
-        # Clear game over text
-        for entity in scene.entities:
-            if isinstance(entity, Text) and "GAME OVER" in entity.text:
-                destroy(entity)
-            if isinstance(entity, Text) and "Final Score" in entity.text:
-                destroy(entity)
-            if isinstance(entity, Text) and "Press R" in entity.text:
-                destroy(entity)
+        if self.particles is not None:
+            self.particles.clear()
         
-        # Reset UI using the new reset method
-        if self.ui:
-            self.ui.reset()
+        # Clears the game over screen and resets the HUD
+        self.events.publish(GameRestarted())
             
         # Refresh game elements
         self.spawn_enemies()
         self.spawn_powerup()  # Initial power-up
+        self.auditor.on_restart()
 
     def set_camera_view(self, view):
         """Switch camera between first and third person views"""
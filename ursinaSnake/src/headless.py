@@ -0,0 +1,109 @@
+from ursina import *
+import argparse
+import random
+import sys
+import os
+
+# Add the script directory to sys.path to make imports work correctly
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+try:
+    import settings
+    from game import Game
+except ImportError as e:
+    print(f"Import error: {e}")
+    print("Make sure you're running the game from the correct directory")
+    sys.exit(1)
+
+
+class Autopilot:
+    """Drives the snake with seeded random key presses so headless runs exercise movement"""
+
+    def __init__(self, seed, steer_interval=1.0):
+        self.rng = random.Random(seed)
+        self.steer_interval = steer_interval
+        self.steer_timer = 0
+
+    def tick(self, dt):
+        self.steer_timer -= dt
+        if self.steer_timer > 0:
+            return
+        self.steer_timer = self.steer_interval
+
+        # Always push forward and pick a new turn/strafe direction
+        held_keys['w'] = 1
+        turn = self.rng.choice(['a', 'd', None])
+        held_keys['a'] = 1 if turn == 'a' else 0
+        held_keys['d'] = 1 if turn == 'd' else 0
+
+
+def run_headless(ticks=3600, dt=1/60, seed=0, mode='normal', autopilot=True, restart_on_game_over=True, audit=False,
+                 city_seed=None):
+    """Run the game simulation for a fixed number of ticks without a window"""
+    random.seed(seed)
+    settings.headless = True
+
+    # No window is opened, but the engine is still needed for colliders and raycasts
+    app = Ursina(window_type='none')
+
+    game = Game(city_seed=city_seed)
+    game.setup()
+    game.mode = mode
+    game.start_game()
+
+    pilot = Autopilot(seed) if autopilot else None
+    restarts = 0
+    if audit:
+        game.auditor.report('start')
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if pilot:
+            pilot.tick(dt)
+        game.step(dt)
+
+        if game.game_over and restart_on_game_over:
+            game.restart()
+            restarts += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Simulated {ticks} ticks ({ticks * dt:.1f}s of game time) in {elapsed:.2f}s "
+          f"({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(f"Score: {game.score} | Health: {game.player.health} | Segments: {game.player.segment_count} | "
+          f"Enemies: {len(game.enemies)} | Power-ups: {len(game.powerups)} | Restarts: {restarts}")
+    if audit:
+        game.auditor.report('end')
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run snakeX3000 as a headless simulation")
+    parser.add_argument('--ticks', type=int, default=3600, help="number of simulation ticks to run")
+    parser.add_argument('--dt', type=float, default=1/60, help="fixed time step in seconds")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the run")
+    parser.add_argument('--city-seed', type=int, default=None, help="city layout seed (default: from --seed)")
+    parser.add_argument('--mode', choices=['normal', 'crazy'], default='normal')
+    parser.add_argument('--no-autopilot', action='store_true', help="leave the snake standing still")
+    parser.add_argument('--audit', action='store_true', help="print entity counts per subsystem at the start and end")
+    args = parser.parse_args()
+
+    try:
+        run_headless(
+            ticks=args.ticks,
+            dt=args.dt,
+            seed=args.seed,
+            mode=args.mode,
+            autopilot=not args.no_autopilot,
+            audit=args.audit,
+            city_seed=args.city_seed
+        )
+    except Exception as e:
+        # Print detailed error information
+        import traceback
+        print(f"Error running headless simulation: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
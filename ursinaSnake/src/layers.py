@@ -0,0 +1,50 @@
+from panda3d.core import BitMask32
+
+# Collision layers shared by every game object. Each object lives on exactly
+# one layer bit; queries pass a mask of the layers they care about.
+# Bits stay below 20 so the engine's default picking rays still see everything.
+PLAYER = 1 << 0
+SNAKE_BODY = 1 << 1
+ENEMY = 1 << 2
+POWERUP = 1 << 3
+BUILDING = 1 << 4
+OBSTACLE = 1 << 5
+VEHICLE = 1 << 6
+BRIDGE = 1 << 7
+GROUND = 1 << 8
+
+STATIC = BUILDING | OBSTACLE | BRIDGE
+PLAYER_HITS = ENEMY | POWERUP | VEHICLE  # What the player collides with each tick
+
+NAMES = {
+    PLAYER: 'player',
+    SNAKE_BODY: 'snake_body',
+    ENEMY: 'enemy',
+    POWERUP: 'powerup',
+    BUILDING: 'building',
+    OBSTACLE: 'obstacle',
+    VEHICLE: 'vehicle',
+    BRIDGE: 'bridge',
+    GROUND: 'ground',
+}
+
+
+def set_layer(entity, layer):
+    """Put an entity on a collision layer.
+
+    The layer also becomes the engine collider's into-mask, so engine
+    collision queries skip it unless their from-mask includes the layer.
+    """
+    entity.collision_layer = layer
+    node_path = getattr(getattr(entity, 'collider', None), 'node_path', None)
+    if node_path:
+        node_path.node().setIntoCollideMask(BitMask32(layer))
+
+
+def layer_of(entity):
+    """Collision layer of an entity (0 if it isn't on one)"""
+    return getattr(entity, 'collision_layer', 0)
+
+
+def name_of(layer):
+    return NAMES.get(layer, 'none')
@@ -0,0 +1,84 @@
+import numpy as np
+
+# The 3x3 block of cells around (and including) a point's own cell
+NEIGHBOR_CELLS = [(ox, oz) for ox in (-1, 0, 1) for oz in (-1, 0, 1)]
+
+
+class NeighborGrid:
+    """Uniform grid over a set of points, rebuilt from scratch every tick in O(n).
+
+    Unlike SpatialHash, which tracks individual objects as they move,
+    this grid is rebuilt with a counting sort over NumPy arrays: cell
+    counts, their prefix sums and the points ordered by cell. Neighbor
+    pairs for many points at once are then read from the 3x3 cells
+    around each one, so nothing is ever compared pairwise, and around()
+    reads the points near a single position the same way.
+    """
+
+    MAX_CELLS = 65535  # Keeps cell ids in 16 bits, where NumPy's stable sort is a radix sort
+
+    def __init__(self, max_per_cell=16):
+        self.max_per_cell = max_per_cell  # Neighbours considered per cell, so a pile-up can't explode the pair count
+        self.cx = self.cz = np.zeros(0, dtype=np.intp)
+        self.counts = self.starts = np.zeros(0, dtype=np.intp)
+        self.order = np.zeros(0, dtype=np.intp)
+        self.width = self.depth = 0
+        self.min_x = self.min_z = 0.0
+        self.cell_size = 1.0
+
+    def build(self, xs, zs, cell_size):
+        """Bucket points (xs[i], zs[i]) into cells at least cell_size wide"""
+        if not len(xs):
+            self.order = np.zeros(0, dtype=np.intp)
+            return
+        min_x, min_z = xs.min(), zs.min()
+        extent_x, extent_z = xs.max() - min_x, zs.max() - min_z
+        # Grow the cells if the points are too spread out for 16-bit cell ids
+        while (int(extent_x / cell_size) + 1) * (int(extent_z / cell_size) + 1) > self.MAX_CELLS:
+            cell_size *= 1.25
+        self.min_x, self.min_z, self.cell_size = float(min_x), float(min_z), cell_size
+        self.width = int(extent_x / cell_size) + 1
+        self.depth = int(extent_z / cell_size) + 1
+
+        self.cx = np.minimum(((xs - min_x) / cell_size).astype(np.intp), self.width - 1)
+        self.cz = np.minimum(((zs - min_z) / cell_size).astype(np.intp), self.depth - 1)
+        keys = self.cx * self.depth + self.cz
+        self.counts = np.bincount(keys, minlength=self.width * self.depth)
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.order = np.argsort(keys.astype(np.uint16), kind='stable')
+
+    def around(self, x, z, radius):
+        """Indices of every point in the cells overlapping the square of half-size radius around (x, z)"""
+        if not len(self.order):
+            return np.zeros(0, dtype=np.intp)
+        cx0 = max(int((x - radius - self.min_x) // self.cell_size), 0)
+        cz0 = max(int((z - radius - self.min_z) // self.cell_size), 0)
+        cx1 = min(int((x + radius - self.min_x) // self.cell_size), self.width - 1)
+        cz1 = min(int((z + radius - self.min_z) // self.cell_size), self.depth - 1)
+        if cx0 > cx1 or cz0 > cz1:
+            return np.zeros(0, dtype=np.intp)
+        keys = (np.arange(cx0, cx1 + 1)[:, None] * self.depth + np.arange(cz0, cz1 + 1)[None, :]).reshape(-1)
+        starts, counts = self.starts[keys], self.counts[keys]
+        within = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.order[np.repeat(starts, counts) + within]
+
+    def pairs(self, rows):
+        """(i, j) index arrays of every point j in the cells around each point i in rows (i != j)"""
+        queries, starts, counts = [], [], []
+        for ox, oz in NEIGHBOR_CELLS:
+            cx, cz = self.cx[rows] + ox, self.cz[rows] + oz
+            inside = (cx >= 0) & (cx < self.width) & (cz >= 0) & (cz < self.depth)
+            keys = cx[inside] * self.depth + cz[inside]
+            queries.append(rows[inside])
+            starts.append(self.starts[keys])
+            counts.append(np.minimum(self.counts[keys], self.max_per_cell))
+        queries, starts, counts = np.concatenate(queries), np.concatenate(starts), np.concatenate(counts)
+
+        # Expand each (query, cell) into one pair per point stored in that cell
+        total = int(counts.sum())
+        first = np.cumsum(counts) - counts
+        within = np.arange(total) - np.repeat(first, counts)
+        i = np.repeat(queries, counts)
+        j = self.order[np.repeat(starts, counts) + within]
+        distinct = i != j
+        return i[distinct], j[distinct]
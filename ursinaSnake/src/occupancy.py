@@ -0,0 +1,202 @@
+import numpy as np
+import random
+
+
+class OccupancyView:
+    """Frozen copy of an OccupancyGrid's frame and blocked cells, safe to read off the main thread"""
+
+    __slots__ = ('min_x', 'min_z', 'cell_size', 'size', 'version', 'blocked')
+
+    def __init__(self, min_x, min_z, cell_size, size, version, blocked):
+        self.min_x = min_x
+        self.min_z = min_z
+        self.cell_size = cell_size
+        self.size = size
+        self.version = version
+        self.blocked = blocked
+
+    def cell_of(self, x, z):
+        """Grid indices (ix, iz) containing a world position, or None if outside the grid"""
+        ix = int((x - self.min_x) // self.cell_size)
+        iz = int((z - self.min_z) // self.cell_size)
+        if 0 <= ix < self.size and 0 <= iz < self.size:
+            return ix, iz
+        return None
+
+
+class OccupancyGrid:
+    """Static occupancy of the city on a regular grid, with an O(1) free-cell sampler.
+
+    The grid covers a square of 2 * half_size around center. Buildings,
+    obstacles and bridges are rasterized whenever the loaded part of the
+    city changes, and move_to() swaps the result in. Free cells are kept
+    in a dense list plus a cell -> slot index, so picking a random free
+    cell, blocking one or releasing one are all constant time.
+    """
+
+    def __init__(self, half_size=20, cell_size=1.0, center=(0, 0)):
+        self.half_size = half_size
+        self.cell_size = cell_size
+        self.center = tuple(center)
+        self.min_x = center[0] - half_size  # World position of the grid's low corner
+        self.min_z = center[1] - half_size
+        self.size = int(round(2 * half_size / cell_size))
+        self.blocked = np.zeros((self.size, self.size), dtype=bool)  # indexed [ix, iz]
+        self.version = 0  # Bumped whenever blocked cells change at runtime
+        self._view = None
+
+        cell_count = self.size * self.size
+        self.free_cells = np.zeros(cell_count, dtype=np.int32)  # Flat cell ids, first free_count are valid
+        self.slot_of = np.full(cell_count, -1, dtype=np.int32)  # Flat cell id -> slot in free_cells (-1 if taken)
+        self.free_count = 0
+        self.rebuild_free_list()
+
+    # --- Coordinates ---
+
+    def cell_of(self, x, z):
+        """Grid indices (ix, iz) containing a world position, or None if outside the grid"""
+        ix = int((x - self.min_x) // self.cell_size)
+        iz = int((z - self.min_z) // self.cell_size)
+        if 0 <= ix < self.size and 0 <= iz < self.size:
+            return ix, iz
+        return None
+
+    def view(self):
+        """OccupancyView of the grid as it is now; the mask is copied once per version"""
+        if self._view is None or self._view.version != self.version:
+            self._view = OccupancyView(self.min_x, self.min_z, self.cell_size, self.size, self.version,
+                                       self.blocked.copy())
+        return self._view
+
+    def cell_id_of(self, x, z):
+        """Flat cell id containing a world position, or None if outside the grid"""
+        cell = self.cell_of(x, z)
+        return None if cell is None else cell[0] * self.size + cell[1]
+
+    @property
+    def bounds(self):
+        """World-space (min_x, min_z, max_x, max_z) the grid covers"""
+        extent = self.size * self.cell_size
+        return self.min_x, self.min_z, self.min_x + extent, self.min_z + extent
+
+    def cell_center(self, cell_id):
+        ix, iz = divmod(int(cell_id), self.size)
+        return (self.min_x + (ix + 0.5) * self.cell_size,
+                self.min_z + (iz + 0.5) * self.cell_size)
+
+    def _centers(self, ix0, ix1, iz0, iz1):
+        """World-space x and z of the cell centres in an index range, as broadcastable arrays"""
+        xs = self.min_x + (np.arange(ix0, ix1) + 0.5) * self.cell_size
+        zs = self.min_z + (np.arange(iz0, iz1) + 0.5) * self.cell_size
+        return xs[:, None], zs[None, :]
+
+    def _index_range(self, min_x, min_z, max_x, max_z):
+        ix0 = max(int((min_x - self.min_x) // self.cell_size), 0)
+        iz0 = max(int((min_z - self.min_z) // self.cell_size), 0)
+        ix1 = min(int((max_x - self.min_x) // self.cell_size) + 1, self.size)
+        iz1 = min(int((max_z - self.min_z) // self.cell_size) + 1, self.size)
+        return ix0, ix1, iz0, iz1
+
+    # --- Rasterization (build time) ---
+
+    def block_box(self, min_x, min_z, max_x, max_z, margin=0.5):
+        """Mark every cell whose centre lies inside an axis-aligned box (grown by margin)"""
+        ix0, ix1, iz0, iz1 = self._index_range(min_x - margin, min_z - margin, max_x + margin, max_z + margin)
+        if ix0 < ix1 and iz0 < iz1:
+            self.blocked[ix0:ix1, iz0:iz1] = True
+
+    def block_rotated_box(self, center_x, center_z, right, forward, half_length, half_width, margin=0.5):
+        """Mark cells inside a box rotated about y, given its unit right/forward axes in the xz plane"""
+        half_length += margin
+        half_width += margin
+        reach = abs(half_length) + abs(half_width)
+        ix0, ix1, iz0, iz1 = self._index_range(center_x - reach, center_z - reach, center_x + reach, center_z + reach)
+        if ix0 >= ix1 or iz0 >= iz1:
+            return
+
+        xs, zs = self._centers(ix0, ix1, iz0, iz1)
+        dx, dz = xs - center_x, zs - center_z
+        local_x = dx * right[0] + dz * right[1]
+        local_z = dx * forward[0] + dz * forward[1]
+        inside = (np.abs(local_x) <= half_length) & (np.abs(local_z) <= half_width)
+        self.blocked[ix0:ix1, iz0:iz1] |= inside
+
+    def block_grid(self, other):
+        """Mark every cell that is blocked in other, a grid with the same cell size aligned to this one"""
+        ox = int(round((other.min_x - self.min_x) / self.cell_size))
+        oz = int(round((other.min_z - self.min_z) / self.cell_size))
+        ix0, iz0 = max(ox, 0), max(oz, 0)
+        ix1, iz1 = min(ox + other.size, self.size), min(oz + other.size, self.size)
+        if ix0 < ix1 and iz0 < iz1:
+            self.blocked[ix0:ix1, iz0:iz1] |= other.blocked[ix0 - ox:ix1 - ox, iz0 - oz:iz1 - oz]
+
+    def rebuild_free_list(self):
+        """Recompute the free-cell list from the blocked mask (drops every claim)"""
+        free = np.flatnonzero(~self.blocked.reshape(-1)).astype(np.int32)
+        self.free_count = len(free)
+        self.free_cells[:self.free_count] = free
+        self.slot_of[:] = -1
+        self.slot_of[free] = np.arange(self.free_count, dtype=np.int32)
+
+    # --- Map changes ---
+
+    def move_to(self, center, blocked):
+        """Recentre the grid on center with a freshly rasterized blocked mask (claims are dropped)"""
+        self.center = tuple(center)
+        self.min_x = center[0] - self.half_size
+        self.min_z = center[1] - self.half_size
+        self.blocked = blocked  # Swapped in whole, so readers never see a half-rasterized mask
+        self.rebuild_free_list()
+        self.version += 1
+
+    def unblock(self, mask):
+        """Open up the cells set in mask (e.g. where a building collapsed) and make them free"""
+        cells = np.flatnonzero(mask.reshape(-1) & self.blocked.reshape(-1))
+        if not len(cells):
+            return
+        blocked = self.blocked.copy()  # Swapped in, like move_to, rather than edited in place
+        blocked.reshape(-1)[cells] = False
+        self.blocked = blocked
+        for cell_id in cells:
+            self.release(cell_id)
+        self.version += 1
+
+    # --- Runtime (all O(1)) ---
+
+    def is_free(self, x, z):
+        cell = self.cell_of(x, z)
+        return cell is not None and not self.blocked[cell]
+
+    def claim(self, cell_id):
+        """Take a free cell out of the free list (e.g. while a power-up sits on it)"""
+        slot = self.slot_of[cell_id]
+        if slot < 0:
+            return
+        # Swap the last free cell into this slot
+        last = self.free_cells[self.free_count - 1]
+        self.free_cells[slot] = last
+        self.slot_of[last] = slot
+        self.slot_of[cell_id] = -1
+        self.free_count -= 1
+
+    def release(self, cell_id):
+        """Return a claimed cell to the free list"""
+        if self.slot_of[cell_id] >= 0 or self.blocked.reshape(-1)[cell_id]:
+            return
+        self.free_cells[self.free_count] = cell_id
+        self.slot_of[cell_id] = self.free_count
+        self.free_count += 1
+
+    def random_free_cell(self, rng=random):
+        """Pick a random free cell id, or None if the city is full"""
+        if self.free_count == 0:
+            return None
+        return int(self.free_cells[rng.randrange(self.free_count)])
+
+    def random_free_position(self, y=1, rng=random):
+        """World position at the centre of a random free cell, or None if there is none"""
+        cell_id = self.random_free_cell(rng)
+        if cell_id is None:
+            return None
+        x, z = self.cell_center(cell_id)
+        return (x, y, z)
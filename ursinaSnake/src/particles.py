@@ -0,0 +1,136 @@
+from ursina import *
+from panda3d.core import TransparencyAttrib
+import numpy as np
+from dynamic_mesh import DynamicMesh
+
+# How particles travel from their origin to origin + displacement over their life
+LINEAR = 0
+OUT_EXPO = 1
+
+
+def octahedron_template(size=1.0):
+    """Return the 24 (position, normal, uv) rows of an octahedron - a cheap stand-in for a sphere"""
+    h = size / 2
+    tips = [(h, 0, 0), (0, 0, h), (-h, 0, 0), (0, 0, -h)]
+    rows = []
+    for top in ((0, h, 0), (0, -h, 0)):
+        for i in range(4):
+            a, b = tips[i], tips[(i + 1) % 4]
+            if top[1] < 0:
+                a, b = b, a
+            normal = np.add(np.add(a, b), top)
+            normal = normal / np.linalg.norm(normal)
+            for corner, uv in ((a, (0, 0)), (b, (1, 0)), (top, (0.5, 1))):
+                rows.append((*corner, *normal, *uv))
+    return np.array(rows, dtype=np.float32)
+
+
+def spread(count, low, high):
+    """count random vectors with each axis uniform between low and high"""
+    return np.random.uniform(low, high, (count, 3)).astype(np.float32)
+
+
+class ParticleEmitter(Entity):
+    """Fixed budget of particles simulated in NumPy arrays and drawn as one mesh.
+
+    emit() writes new particles over the oldest slots in a ring, so the
+    pool never allocates after construction and a busy emitter simply
+    recycles its earliest particles. Each particle shrinks to nothing and
+    fades between two colours over its lifetime.
+    """
+
+    def __init__(self, capacity=256, ease=LINEAR, **kwargs):
+        self.capacity = capacity
+        self.ease = ease
+        self.template = octahedron_template()
+        self.vertices_per_particle = len(self.template)
+        self.mesh = DynamicMesh(capacity * self.vertices_per_particle, with_colors=True, name='particles')
+        super().__init__(model=self.mesh, **kwargs)
+        self.model.setTransparency(TransparencyAttrib.MAlpha)
+        self.model.setDepthWrite(False)
+
+        self.starts = np.zeros((capacity, 3), dtype=np.float32)
+        self.displacements = np.zeros((capacity, 3), dtype=np.float32)
+        self.sizes = np.zeros(capacity, dtype=np.float32)
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.lifetimes = np.ones(capacity, dtype=np.float32)
+        self.start_colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.end_colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.cursor = 0  # Next slot to (re)use
+
+        # Normals and uvs never change, so fill them in once for every slot
+        self.vertices = self.mesh.buffer.reshape(capacity, self.vertices_per_particle, -1)
+        self.vertices[:, :, 3:8] = self.template[None, :, 3:8]
+
+    @property
+    def live_count(self):
+        return int(np.count_nonzero(self.alive))
+
+    def emit(self, origin, displacements, sizes, lifetimes, color, end_color=None):
+        """Spawn len(displacements) particles at origin, each moving by its displacement over its lifetime.
+
+        origin is one point for the whole batch or one point per particle.
+        """
+        count = min(len(displacements), self.capacity)
+        if not count:
+            return
+        slots = (self.cursor + np.arange(count)) % self.capacity
+        self.cursor = int((self.cursor + count) % self.capacity)
+
+        origin = np.asarray(origin, dtype=np.float32)
+        self.starts[slots] = origin[:count] if origin.ndim == 2 else origin
+        self.displacements[slots] = displacements[:count]
+        self.sizes[slots] = sizes if np.isscalar(sizes) else sizes[:count]
+        self.lifetimes[slots] = lifetimes if np.isscalar(lifetimes) else lifetimes[:count]
+        self.ages[slots] = 0
+        self.start_colors[slots] = tuple(color)
+        self.end_colors[slots] = tuple(end_color if end_color is not None else color)
+        self.alive[slots] = True
+
+    def advance(self, dt):
+        if not self.alive.any():
+            if self.mesh.vertex_count:
+                self.mesh.write(None, 0)
+            return
+
+        self.ages[self.alive] += dt
+        self.alive &= self.ages < self.lifetimes
+        live = np.flatnonzero(self.alive)
+        n = len(live)
+
+        t = self.ages[live] / self.lifetimes[live]
+        travel = 1 - np.power(2.0, -10 * t) if self.ease == OUT_EXPO else t
+        position = self.starts[live] + self.displacements[live] * travel[:, None]
+        size = self.sizes[live] * (1 - t)
+        start = self.start_colors[live]
+        rgba = start + (self.end_colors[live] - start) * t[:, None]
+
+        # Pack the live particles at the front of the vertex buffer
+        vertices = self.vertices[:n]
+        np.multiply(self.template[None, :, 0:3], size[:, None, None], out=vertices[:, :, 0:3])
+        vertices[:, :, 0:3] += position[:, None, :]
+        vertices[:, :, 8:12] = rgba[:, None, :]
+        self.mesh.write(self.mesh.buffer, n * self.vertices_per_particle)
+
+    def clear(self):
+        self.alive[:] = False
+
+
+class Particles:
+    """The game's particle emitters, one per effect, advanced together once per frame"""
+
+    def __init__(self):
+        self.runner_trail = ParticleEmitter(capacity=512)  # ~5 live per runner
+        self.enemy_death = ParticleEmitter(capacity=256)
+        self.pickup_burst = ParticleEmitter(capacity=256, ease=OUT_EXPO)
+        self.collapse_dust = ParticleEmitter(capacity=256)
+        self.emitters = (self.runner_trail, self.enemy_death, self.pickup_burst, self.collapse_dust)
+
+    def advance(self, dt):
+        for emitter in self.emitters:
+            emitter.advance(dt)
+
+    def clear(self):
+        for emitter in self.emitters:
+            emitter.clear()
@@ -1,9 +1,17 @@
 from ursina import *
-from collections import deque
+import math
+import settings
+from trail import TrailBuffer, TrailGrid
+from snake_body import SnakeBody
+from layers import set_layer, PLAYER, BUILDING, OBSTACLE
+from events import EventBus, Damaged, Healed, ComboChanged, PowerUpApplied, PowerUpExpired
+from timers import Timers
 
 class Player(Entity):
-    def __init__(self, **kwargs):
+    def __init__(self, events=None, timers=None, **kwargs):
         super().__init__(**kwargs)
+        self.events = events if events is not None else EventBus()  # Shared with Game and UI
+        self.timers = timers if timers is not None else Timers()  # Advanced by Game on simulation time
         self.model = 'cube'
         self.texture = 'brick'
         self.color = color.green
@@ -13,10 +21,16 @@ class Player(Entity):
         self.speed = self.base_speed
         self.growth_rate = 0.1
         self.length = 1
-        self.segments = []
-        self.segment_spacing = 10  # frames between segments
-        self.position_history = deque(maxlen=1000)
+        self.segment_count = 0
+        self.segment_gap = 1.0  # distance along the trail between segments
+        self.trail = TrailBuffer(sample_spacing=0.1, grid=TrailGrid(cell_size=1.0))
+        self.segment_positions = self.trail.segment_positions(0, self.segment_gap)
+        # The whole body is drawn as one mesh (nothing to draw headless)
+        self.body = None if settings.headless else SnakeBody()
         self.collider = 'box'
+        set_layer(self, PLAYER)
+        self.collision_half_extents = (0.5, 0.5, 0.5)
+        self.static_colliders = None  # Set by Game once the city is built
         self.mouse_sensitivity = 0  # disable mouse look
         self.turn_speed = 100        # degrees per second for turning
         self.crazy_mode = False      # toggle crazy mode (rotate on A/D)
@@ -24,9 +38,13 @@ class Player(Entity):
         # Health system
         self.max_health = 3
         self.health = self.max_health
-        self.damage_cooldown = 0  # Cooldown timer for damage
+        self.damage_cooldown = None  # Timer running while damage is on cooldown
         self.damage_cooldown_duration = 1.0  # 1 second cooldown between damage
         
+        # Self-collision with the tail
+        self.self_collision_radius = 0.8  # head half-size + segment half-size
+        self.self_collision_skip = 3      # segments right behind the head never count
+        
         # Visual damage feedback
         self.original_color = self.color
         
@@ -34,36 +52,31 @@ class Player(Entity):
         self.disable_movement = False
         
         # Power-up system
-        self.active_powerups = {}  # {powerup_name: timer}
+        self.active_powerups = {}  # {powerup_name: expiry timer}
         self.is_invisible = False
         self.can_jump_obstacles = False
-        self.jump_cooldown = 0
+        self.jump_cooldown = None  # Timer running while jumping is on cooldown
         self.jump_cooldown_max = 3.0
+        self.jump_duration = 0.3
+        self.jump_timer = 0  # Time left in the current leap
+        self.jump_velocity = Vec3(0, 0, 0)
         
         # Combo system
         self.combo_count = 0
-        self.combo_timer = 0
+        self.combo_timer = None  # Fires reset_combo when the combo runs out
         self.combo_timeout = 5.0  # Seconds before combo resets
         
         print("Player initialized - press WASD to move, mouse to look, 1/2 to switch views")
 
-    def update(self):
+    def tick(self, dt):
+        """Advance the player simulation by dt seconds (driven by Game)"""
         if self.disable_movement:
             return
             
-        self.handle_movement()
+        self.handle_movement(dt)
         self.update_segments()
         self.check_collisions()
-        self.update_powerups()
-        self.update_combo()
-        
-        # Update damage cooldown
-        if self.damage_cooldown > 0:
-            self.damage_cooldown -= time.dt
-            
-        # Update jump cooldown
-        if self.jump_cooldown > 0:
-            self.jump_cooldown -= time.dt
+        # Power-up, combo and cooldown expiry are driven by timers
 
     def input(self, key):
         # Toggle crazy mode
@@ -72,13 +85,13 @@ class Player(Entity):
             print(f"Crazy mode {'ON' if self.crazy_mode else 'OFF'}")
             return
 
-    def handle_movement(self):
+    def handle_movement(self, dt):
         # Crazy mode: turn on A/D; Normal: no turn
         if self.crazy_mode:
             if held_keys['a']:
-                self.rotation_y += self.turn_speed * time.dt
+                self.rotation_y += self.turn_speed * dt
             if held_keys['d']:
-                self.rotation_y -= self.turn_speed * time.dt
+                self.rotation_y -= self.turn_speed * dt
         
         # Build movement direction
         move_direction = Vec3(0, 0, 0)
@@ -102,151 +115,182 @@ class Player(Entity):
             current_speed = self.speed
         
         # Jump over obstacles with space if we have the power-up
-        if held_keys['space'] and self.can_jump_obstacles and self.jump_cooldown <= 0:
+        if held_keys['space'] and self.can_jump_obstacles and not self.on_cooldown(self.jump_cooldown):
             self.perform_jump()
             
         # Apply movement
         if move_direction.length() > 0:
-            new_position = self.position + move_direction * current_speed * time.dt
+            self.move_and_collide(move_direction * current_speed * dt)
+        
+        # Carry an active jump along its arc, otherwise keep player at constant height
+        if self.jump_timer > 0:
+            self.jump_timer = max(self.jump_timer - dt, 0)
+            progress = 1 - self.jump_timer / self.jump_duration
+            self.y = 1 + math.sin(progress * math.pi) * 2
+            self.move_and_collide(self.jump_velocity * dt)
+        else:
+            self.y = 1
+
+    def move(self, delta):
+        """Sweep the player along the ground plane, sliding along static colliders.
+
+        Returns a bitmask of the collision layers that were hit.
+        """
+        if self.static_colliders is None:
+            self.position += delta
+            return 0
             
-            # Collision check
-            hit_info = raycast(
-                origin=self.position + Vec3(0, 0.5, 0),
-                direction=move_direction,
-                distance=1.0,
-                ignore=[self] + self.segments
-            )
+        # Invisible snakes pass through buildings but not street obstacles
+        mask = OBSTACLE if self.is_invisible else BUILDING | OBSTACLE
+        x, z, hits = self.static_colliders.sweep(
+            self.x, self.y, self.z, delta.x, delta.z, self.collision_half_extents, mask
+        )
+        self.x, self.z = x, z
+        return self.static_colliders.layers_of(hits)
+
+    def move_and_collide(self, delta):
+        """Move and apply the penalty for running into a building"""
+        if self.move(delta) & BUILDING:
+            self.handle_building_collision()
+
+    def take_damage(self, source):
+        """Reduce health and provide visual feedback. Returns False while in damage cooldown."""
+        # Only take damage if not in cooldown
+        if self.on_cooldown(self.damage_cooldown):
+            return False
             
-            if hit_info.hit:
-                entity = hit_info.entity
-                # Check if we hit a building
-                if hasattr(entity, 'name') and 'building' in entity.name:
-                    # Don't collide if player is invisible
-                    if not self.is_invisible:
-                        self.handle_building_collision()
-                    else:
-                        # Pass through if invisible
-                        self.position = new_position
-                else:
-                    # Not a building, can move
-                    self.position = new_position
-            else:
-                self.position = new_position
+        # Apply damage
+        self.health -= 1
+        self.damage_cooldown = self.timers.after(self.damage_cooldown_duration)
+        
+        # Visual feedback - flash red
+        if not settings.headless:
+            self.color = color.red
+            self.body.color = color.red
+            self.timers.after(0.2, self.reset_color)
+        
+        self.events.publish(Damaged(self.health, source))
         
-        # Keep player at constant height
-        self.y = 1
+        # Sound effect would go here
+        return True
 
     def handle_building_collision(self):
         """Handle collision with buildings - reduce health and provide visual feedback"""
-        # Only take damage if not in cooldown
-        if self.damage_cooldown <= 0:
-            # Apply damage
-            self.health -= 1
-            self.damage_cooldown = self.damage_cooldown_duration
-            
-            # Visual feedback - flash red
-            self.color = color.red
-            invoke(self.reset_color, delay=0.2)
-            
-            # Update UI if we can find the game instance
-            game_instance = None
-            for entity in scene.entities:
-                if hasattr(entity, 'ui') and hasattr(entity, 'player'):
-                    game_instance = entity
-                    break
-            
-            if game_instance and game_instance.ui:
-                game_instance.ui.set_health(self.health)
-            
-            # Sound effect would go here
-            
+        if self.take_damage('building'):
             # Print debug info
             print(f"Player hit a building! Health: {self.health}")
             
-            # Apply knockback
+            # Apply knockback (swept, so it can't push us into another building)
             knockback_direction = -self.forward
-            self.position += knockback_direction * 2  # Knock back 2 units
+            self.move(knockback_direction * 2)  # Knock back 2 units
+
+    def handle_vehicle_collision(self):
+        """Handle getting hit by traffic"""
+        if self.is_invisible:
+            return
+        if self.take_damage('vehicle'):
+            print(f"Player hit by a vehicle! Health: {self.health}")
+
+    def handle_tail_collision(self):
+        """Handle the head running into the snake's own tail"""
+        if self.take_damage('tail'):
+            print(f"Player bit its own tail! Health: {self.health}")
     
     def reset_color(self):
         """Reset player color after collision flash"""
         self.color = self.original_color
+        if self.body:
+            self.body.color = color.green
+        if self.is_invisible:
+            # Still see-through until the power-up runs out
+            self.alpha = 0.5
+            if self.body:
+                self.body.alpha = 0.5
         
     def update_segments(self):
-        # Record current head position each frame
-        self.position_history.append(self.position)
-        # Update segment positions based on history
-        for i, segment in enumerate(self.segments):
-            idx = -((i+1) * self.segment_spacing)
-            if abs(idx) <= len(self.position_history):
-                segment.position = self.position_history[idx]
+        # Record the head position along the trail
+        self.trail.push(self.position)
+        if not self.segment_count:
+            return
+            
+        # Place every segment at its arc distance behind the head in one pass
+        self.segment_positions = self.trail.segment_positions(self.segment_count, self.segment_gap)
+        if self.body:
+            self.body.refresh(self.segment_positions, self.position)
 
     def grow(self):
-        # Create a new segment matching player appearance
-        new_segment = Entity(
-            model='cube', 
-            color=color.green,
-            texture='brick',
-            scale=(0.9, 0.9, 0.9)
-        )
-        
-        # Position it behind the player or the last segment
-        if len(self.segments) == 0:
-            new_segment.position = self.position - (self.forward * 1.2)
-        else:
-            new_segment.position = self.segments[-1].position
-            
-        self.segments.append(new_segment)
+        # Add a segment to the tail - it is placed from the trail on the next update
+        self.segment_count += 1
         self.length += self.growth_rate
+        self.trail.ensure_length((self.segment_count + 1) * self.segment_gap)
+        if self.body:
+            self.body.reserve(self.segment_count)
 
     def check_collisions(self):
-        # Additional collision checks can be added here
-        pass
+        """Check the head against the snake's own tail using the trail grid"""
+        trail = self.trail
+        samples_per_segment = self.segment_gap / trail.sample_spacing
+        
+        # Forget trail samples the tail has already moved past
+        tail_samples = int((self.segment_count + 0.5) * samples_per_segment)
+        trail.grid.evict_before(trail.total - tail_samples)
+        
+        # Short snakes can't reach their tail; invisible or airborne snakes pass over it
+        if self.segment_count <= self.self_collision_skip or self.is_invisible or self.jump_timer > 0:
+            return
+            
+        newest = trail.total - 1 - int(self.self_collision_skip * samples_per_segment)
+        if trail.grid.hit(self.x, self.z, self.self_collision_radius, newest):
+            self.handle_tail_collision()
 
     def reset(self):
         """Reset player state for new game"""
         self.position = (0, 1, 0)
         self.rotation_y = 0
         self.health = self.max_health
-        self.damage_cooldown = 0
-        
+        self.cancel_timer(self.damage_cooldown)
+        self.damage_cooldown = None
+        self.cancel_timer(self.jump_cooldown)
+        self.jump_cooldown = None
+        self.jump_timer = 0
+
+        # End power-ups and the combo now rather than when their timers run out
+        for powerup_type in list(self.active_powerups):
+            self.deactivate_powerup(powerup_type)
+        self.cancel_timer(self.combo_timer)
+        self.combo_timer = None
+        self.combo_count = 0
+
         # Clear segments
-        for segment in self.segments:
-            destroy(segment)
-        self.segments = []
+        self.segment_count = 0
+        self.trail.clear()
+        self.segment_positions = self.trail.segment_positions(0, self.segment_gap)
+        if self.body:
+            self.body.refresh(self.segment_positions, self.position)
         
         # Reset color
         self.color = self.original_color
+        if self.body:
+            self.body.color = color.green
         
         # Reset movement
         self.disable_movement = False
 
-    def update_powerups(self):
-        """Update all active power-ups and their timers"""
-        # Process each active power-up
-        powerups_to_remove = []
-        for powerup, timer in self.active_powerups.items():
-            # Decrease timer
-            self.active_powerups[powerup] -= time.dt
-            
-            # Check if power-up expired
-            if self.active_powerups[powerup] <= 0:
-                powerups_to_remove.append(powerup)
-                
-        # Remove expired power-ups
-        for powerup in powerups_to_remove:
-            self.deactivate_powerup(powerup)
-    
-    def update_combo(self):
-        """Update combo timer and reset when expired"""
-        if self.combo_count > 0:
-            self.combo_timer -= time.dt
-            if self.combo_timer <= 0:
-                self.reset_combo()
+    def on_cooldown(self, timer):
+        return timer is not None and timer.active
+
+    def cancel_timer(self, timer):
+        if timer is not None:
+            timer.cancel()
+
+    def powerup_time_left(self, powerup_type):
+        return self.timers.remaining(self.active_powerups.get(powerup_type))
     
     def apply_powerup(self, powerup_type, duration):
         """Apply a power-up effect to the player"""
-        # Add the power-up to active list with its duration
-        self.active_powerups[powerup_type] = duration
+        # (Re)start the power-up's expiry timer
+        self.cancel_timer(self.active_powerups.get(powerup_type))
+        self.active_powerups[powerup_type] = self.timers.after(duration, self.deactivate_powerup, powerup_type)
         
         # Apply power-up effects
         if powerup_type == 'speed':
@@ -257,8 +301,8 @@ class Player(Entity):
             self.is_invisible = True
             # Visual effect - make player semi-transparent
             self.alpha = 0.5
-            for segment in self.segments:
-                segment.alpha = 0.5
+            if self.body:
+                self.body.alpha = 0.5
             print("Invisibility power-up activated! You can pass through buildings")
             
         elif powerup_type == 'jump':
@@ -267,20 +311,15 @@ class Player(Entity):
             
         elif powerup_type == 'health':
             self.health = min(self.health + 1, self.max_health)
-            # Find game instance and update UI
-            game_instance = None
-            for entity in scene.entities:
-                if hasattr(entity, 'ui') and hasattr(entity, 'player'):
-                    game_instance = entity
-                    break
-            if game_instance and game_instance.ui:
-                game_instance.ui.set_health(self.health)
+            self.events.publish(Healed(self.health))
             print(f"Health power-up activated! Health restored to {self.health}")
+        
+        self.events.publish(PowerUpApplied(powerup_type, duration))
     
     def deactivate_powerup(self, powerup_type):
         """Remove a power-up effect when it expires"""
         if powerup_type in self.active_powerups:
-            del self.active_powerups[powerup_type]
+            self.active_powerups.pop(powerup_type).cancel()
             
             # Remove power-up effects
             if powerup_type == 'speed':
@@ -291,46 +330,37 @@ class Player(Entity):
                 self.is_invisible = False
                 # Restore original appearance
                 self.alpha = 1
-                for segment in self.segments:
-                    segment.alpha = 1
+                if self.body:
+                    self.body.alpha = 1
                 print("Invisibility power-up expired")
                 
             elif powerup_type == 'jump':
                 self.can_jump_obstacles = False
                 print("Jump power-up expired")
+            
+            self.events.publish(PowerUpExpired(powerup_type))
     
     def perform_jump(self):
         """Jump over obstacles"""
-        if self.can_jump_obstacles and self.jump_cooldown <= 0:
-            # Visual effect - leap animation
-            self.animate_position(
-                self.position + (self.forward * 3) + Vec3(0, 2, 0), 
-                duration=0.3,
-                curve=curve.out_back
-            )
+        if self.can_jump_obstacles and not self.on_cooldown(self.jump_cooldown):
+            # Leap 3 units forward along an arc, advanced by the simulation
+            self.jump_timer = self.jump_duration
+            self.jump_velocity = self.forward * (3 / self.jump_duration)
             # Set cooldown
-            self.jump_cooldown = self.jump_cooldown_max
+            self.jump_cooldown = self.timers.after(self.jump_cooldown_max)
             print("Jump!")
     
     def add_combo(self):
         """Increment combo counter when eating enemies in succession"""
         self.combo_count += 1
-        self.combo_timer = self.combo_timeout
+        self.cancel_timer(self.combo_timer)
+        self.combo_timer = self.timers.after(self.combo_timeout, self.reset_combo)
         
         # Apply combo bonuses
         bonus_score = self.combo_count * 10  # More points for higher combos
         
-        # Find game instance to update score
-        game_instance = None
-        for entity in scene.entities:
-            if hasattr(entity, 'ui') and hasattr(entity, 'score'):
-                game_instance = entity
-                break
-        
-        if game_instance:
-            game_instance.score += bonus_score
-            if game_instance.ui:
-                game_instance.ui.set_score(game_instance.score)
+        # Game adds the bonus to the score
+        self.events.publish(ComboChanged(self.combo_count, bonus_score))
         
         # Visual feedback
         print(f"Combo x{self.combo_count}! +{bonus_score} points")
@@ -350,4 +380,5 @@ class Player(Entity):
         """Reset combo counter when timeout expires"""
         if self.combo_count > 0:
             print(f"Combo x{self.combo_count} expired")
-            self.combo_count = 0
\ No newline at end of file
+            self.combo_count = 0
+            self.events.publish(ComboChanged(0))
\ No newline at end of file
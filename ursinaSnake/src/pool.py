@@ -0,0 +1,41 @@
+class Pool:
+    """Free lists of reusable game objects, one per variant (e.g. enemy type).
+
+    Pooled objects implement spawn(...) to start a new life and despawn()
+    to go dormant. Objects of the same variant share a model and collider,
+    so reusing one never needs new scene nodes.
+    """
+
+    def __init__(self, factory, keys=(None,)):
+        self.factory = factory  # factory(key) -> a new object of that variant
+        self.free = {key: [] for key in keys}
+        self.created = 0
+
+    def prewarm(self, count_per_key):
+        """Create objects up front so the first spawns don't allocate"""
+        for key, free in self.free.items():
+            while len(free) < count_per_key:
+                self.release(self._create(key))
+
+    def _create(self, key):
+        obj = self.factory(key)
+        obj.pool_key = key
+        self.created += 1
+        return obj
+
+    def acquire(self, key=None):
+        """A dormant object of the given variant; call its spawn() to bring it to life"""
+        free = self.free[key]
+        return free.pop() if free else self._create(key)
+
+    def release(self, obj):
+        obj.despawn()
+        self.free[obj.pool_key].append(obj)
+
+    def free_objects(self):
+        """Every dormant object, across all variants"""
+        return [obj for free in self.free.values() for obj in free]
+
+    @property
+    def free_count(self):
+        return sum(len(free) for free in self.free.values())
@@ -1,5 +1,9 @@
 from ursina import *
 import random
+import settings
+from layers import set_layer, POWERUP
+from particles import spread
+import numpy as np
 
 class PowerUp(Entity):
     """Power-up items that can be collected by the player for special abilities"""
@@ -31,13 +35,15 @@ class PowerUp(Entity):
         }
     }
     
-    def __init__(self, position=(0,0,0), powerup_type=None):
+    def __init__(self, position=(0,0,0), powerup_type=None, tweens=None, particles=None):
         # If no specific type provided, choose random type
         if not powerup_type:
             powerup_type = random.choice(list(PowerUp.TYPES.keys()))
         
         self.powerup_type = powerup_type
         self.config = PowerUp.TYPES[powerup_type]
+        self.tweens = tweens  # Spin and bob, started on every spawn
+        self.particles = particles  # Shared emitters for the pickup burst
         
         super().__init__(
             model=self.config['model'],
@@ -46,35 +52,42 @@ class PowerUp(Entity):
             position=position,
             collider='sphere'
         )
+        set_layer(self, POWERUP)
+        
+        # Label is visual only
+        if not settings.headless:
+            # Text indicator showing power-up type
+            self.indicator = Text(
+                text=self.config['description'],
+                parent=self,
+                billboard=True,
+                scale=10,
+                y=1.5,
+                color=self.config['color']
+            )
+        
+        self.spawn(position)
+
+    def spawn(self, position):
+        """Place the power-up in the world (also used when it is reused from a pool)"""
+        self.position = position
+        self.rotation_y = 0
         
         # Add floating animation
         self.y = 1  # Float at player height
         self.original_y = self.y
+        self.enable()
         
-        # Add rotation animation
-        self.animate_rotation_y(360, duration=4, loop=True)
-        
-        # Add bobbing animation - fixed to use supported parameters
-        self.animate_y(
-            self.y + 0.5,
-            duration=1,
-            curve=curve.in_out_sine,
-            loop=True
-        )
-        
-        # Text indicator showing power-up type
-        self.indicator = Text(
-            text=self.config['description'],
-            parent=self,
-            billboard=True,
-            scale=10,
-            y=1.5,
-            color=self.config['color']
-        )
-        
-    def update(self):
-        # Make the power-up rotate to be more visible
-        self.rotation_y += 100 * time.dt
+        # Spin and bob, advanced with every other pickup by the game's tween manager
+        if self.tweens is not None and not settings.headless:
+            self.tweens.spin(self, 190)
+            self.tweens.bob(self, 0.5, duration=1)
+
+    def despawn(self):
+        """Go dormant until the pool hands this power-up out again"""
+        self.disable()
+        if self.tweens is not None:
+            self.tweens.remove(self)
         
     def on_collect(self, player):
         """Called when player collects this power-up"""
@@ -82,31 +95,13 @@ class PowerUp(Entity):
         duration = self.config['duration']
         player.apply_powerup(self.powerup_type, duration)
         
-        # Play collection animation
-        self.disable()  # Hide the power-up
-        
-        # Create particle effect
-        for _ in range(20):
-            particle = Entity(
-                model='sphere',
-                color=self.config['color'],
-                position=self.position,
-                scale=0.1,
-                lifetime=1
-            )
-            # Random direction particle burst
-            direction = Vec3(
-                random.uniform(-1, 1),
-                random.uniform(0.5, 1),  # Upward bias
-                random.uniform(-1, 1)
-            ).normalized()
-            particle.animate_position(
-                self.position + (direction * random.uniform(2, 5)),
-                duration=0.5,
-                curve=curve.out_expo
-            )
-            particle.animate_scale(0, duration=0.5)
-            destroy(particle, delay=0.5)
-        
-        # Schedule destruction after effects finish
-        destroy(self, delay=1)
\ No newline at end of file
+        # Random direction particle burst with an upward bias
+        # (the game hides the power-up by returning it to its pool)
+        if self.particles is not None:
+            directions = spread(20, (-1, 0.5, -1), (1, 1, 1))
+            directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+            distances = np.random.uniform(2, 5, (20, 1))
+            self.particles.pickup_burst.emit(
+                self.position, directions * distances,
+                sizes=0.1, lifetimes=0.5, color=self.config['color']
+            )
\ No newline at end of file
@@ -0,0 +1,6 @@
+# Global runtime settings shared by all game modules
+
+# True when the game runs as a headless simulation (no window, no rendering).
+# Visual-only work such as particles, tweens and Text is skipped in this mode.
+# Set once by the entry point (headless.py) before the Game is built, never after.
+headless = False
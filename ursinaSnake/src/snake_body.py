@@ -0,0 +1,78 @@
+from ursina import *
+import numpy as np
+from dynamic_mesh import DynamicMesh, cube_template
+from layers import set_layer, SNAKE_BODY
+
+
+class SnakeBody(Entity):
+    """Draws every snake segment as one merged-cube mesh.
+
+    The whole body is a single scene node, so colour, alpha and damage
+    flashes are set once no matter how long the snake gets.
+    """
+
+    def __init__(self, segment_size=0.9, **kwargs):
+        self.template = cube_template(segment_size)
+        self.verts_per_segment = len(self.template)
+        self.mesh = DynamicMesh(max_vertices=self.verts_per_segment * 64)
+        super().__init__(model=self.mesh, texture='brick', color=color.green, **kwargs)
+        set_layer(self, SNAKE_BODY)
+        self.capacity = 0
+        self.reserve(64)
+
+    def reserve(self, segment_count):
+        """Grow the vertex and scratch buffers to fit segment_count segments"""
+        if segment_count <= self.capacity:
+            return
+        capacity = max(segment_count, self.capacity * 2)
+        self.capacity = capacity
+        self.mesh.reserve(capacity * self.verts_per_segment)
+
+        # UVs and the vertical components never change, so fill them once
+        view = self.mesh.buffer.reshape(-1, self.verts_per_segment, 8)
+        view[:, :, 6:8] = self.template[:, 6:8]
+        view[:, :, 4] = self.template[:, 4]
+
+        self._ahead = np.zeros((capacity, 3), dtype=np.float32)
+        self._cos = np.zeros((capacity, 1), dtype=np.float32)
+        self._sin = np.zeros((capacity, 1), dtype=np.float32)
+        self._tmp = np.zeros((capacity, self.verts_per_segment), dtype=np.float32)
+
+    def refresh(self, positions, head_position):
+        """Rebuild the body from (n, 3) segment positions, each cube facing the segment ahead of it"""
+        n = len(positions)
+        self.reserve(n)
+        if n == 0:
+            self.mesh.write(self.mesh.buffer, 0)
+            return
+
+        t = self.template
+        view = self.mesh.buffer[:n * self.verts_per_segment].reshape(n, self.verts_per_segment, 8)
+        c, s, tmp = self._cos[:n], self._sin[:n], self._tmp[:n]
+
+        # Heading of each segment: towards the head for the first, the previous segment for the rest
+        ahead = self._ahead[:n]
+        ahead[0] = head_position
+        ahead[1:] = positions[:-1]
+        np.subtract(ahead, positions, out=ahead)
+        np.hypot(ahead[:, 0:1], ahead[:, 2:3], out=c)
+        np.maximum(c, 1e-6, out=c)
+        np.divide(ahead[:, 0:1], c, out=s)
+        np.divide(ahead[:, 2:3], c, out=c)
+
+        # Rotate positions and normals of the template about y
+        for x_col, z_col in ((0, 2), (3, 5)):
+            np.multiply(c, t[:, x_col], out=view[:, :, x_col])
+            np.multiply(s, t[:, z_col], out=tmp)
+            np.add(view[:, :, x_col], tmp, out=view[:, :, x_col])
+
+            np.multiply(c, t[:, z_col], out=view[:, :, z_col])
+            np.multiply(s, t[:, x_col], out=tmp)
+            np.subtract(view[:, :, z_col], tmp, out=view[:, :, z_col])
+
+        # Translate each cube to its segment
+        np.add(view[:, :, 0], positions[:, 0:1], out=view[:, :, 0])
+        np.add(t[:, 1], positions[:, 1:2], out=view[:, :, 1])
+        np.add(view[:, :, 2], positions[:, 2:3], out=view[:, :, 2])
+
+        self.mesh.write(self.mesh.buffer, n * self.verts_per_segment)
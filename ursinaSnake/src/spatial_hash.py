@@ -0,0 +1,72 @@
+import math
+
+
+class SpatialHash:
+    """Dynamic uniform hash of moving objects on the xz plane, used as a collision broadphase.
+
+    Objects are bucketed by the cell containing their centre. move() only
+    touches the buckets when an object actually crosses into a new cell,
+    and query() only visits the cells overlapping the search area, so the
+    cost of a lookup depends on local density, not the total object count.
+    """
+
+    def __init__(self, cell_size=4.0):
+        self.cell_size = cell_size
+        self.cells = {}    # {(cx, cz): {obj: layer}}
+        self.entries = {}  # {obj: (cell, layer)}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, obj):
+        return obj in self.entries
+
+    def cell_of(self, x, z):
+        return (math.floor(x / self.cell_size), math.floor(z / self.cell_size))
+
+    def insert(self, obj, x, z, layer):
+        """Register obj at (x, z) on a collision layer (see layers.py)"""
+        if obj in self.entries:
+            self.remove(obj)
+        cell = self.cell_of(x, z)
+        self.cells.setdefault(cell, {})[obj] = layer
+        self.entries[obj] = (cell, layer)
+
+    def move(self, obj, x, z):
+        """Update obj's position, re-bucketing it only if it changed cell"""
+        cell, layer = self.entries[obj]
+        new_cell = self.cell_of(x, z)
+        if new_cell == cell:
+            return
+        self._discard(obj, cell)
+        self.cells.setdefault(new_cell, {})[obj] = layer
+        self.entries[obj] = (new_cell, layer)
+
+    def remove(self, obj):
+        entry = self.entries.pop(obj, None)
+        if entry:
+            self._discard(obj, entry[0])
+
+    def _discard(self, obj, cell):
+        bucket = self.cells[cell]
+        del bucket[obj]
+        if not bucket:
+            del self.cells[cell]
+
+    def query(self, x, z, radius, mask=~0):
+        """(obj, layer) pairs on the masked layers whose cell overlaps the square of half-size radius around (x, z).
+
+        This is a broadphase: callers still run an exact test on the result.
+        """
+        cx0, cz0 = self.cell_of(x - radius, z - radius)
+        cx1, cz1 = self.cell_of(x + radius, z + radius)
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cz in range(cz0, cz1 + 1):
+                bucket = self.cells.get((cx, cz))
+                if not bucket:
+                    continue
+                for obj, layer in bucket.items():
+                    if layer & mask:
+                        found.append((obj, layer))
+        return found
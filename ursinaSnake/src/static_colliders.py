@@ -0,0 +1,163 @@
+import numpy as np
+from layers import BUILDING, OBSTACLE
+
+
+class StaticColliders:
+    """Axis-aligned boxes of the static city, tested analytically instead of with engine raycasts.
+
+    Boxes are stored as parallel NumPy arrays so a swept move is tested
+    against every box in one vectorized pass.
+    """
+
+    def __init__(self, capacity=64):
+        self.entities = []
+        self._layers = np.zeros(capacity, dtype=np.int32)
+        self._lows = np.zeros((capacity, 3), dtype=np.float32)
+        self._highs = np.zeros((capacity, 3), dtype=np.float32)
+        self.index_of = {}  # {entity: box index}
+        self._view()
+
+    def __len__(self):
+        return len(self.entities)
+
+    def _view(self):
+        # The used rows of the backing arrays, which have spare room at the end
+        n = len(self.entities)
+        self.layers = self._layers[:n]  # Collision layer of each box
+        self.lows = self._lows[:n]      # min x, y, z
+        self.highs = self._highs[:n]    # max x, y, z
+
+    def _reserve(self, size):
+        capacity = len(self._layers)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        n = len(self.entities)
+        for name in ('_layers', '_lows', '_highs'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:n] = array[:n]
+            setattr(self, name, grown)
+
+    def add(self, entity, low, high, layer):
+        """Add one box (see add_many)"""
+        self.add_many([entity], [low], [high], [layer])
+
+    def add_many(self, entities, lows, highs, layers):
+        """Add a box per entity, e.g. everything in a chunk of the city as it loads.
+
+        The arrays double when full, so adding n boxes costs O(n) overall
+        whether they come one at a time or all at once.
+        """
+        entities = list(entities)
+        if not entities:
+            return
+        n, count = len(self.entities), len(entities)
+        self._reserve(n + count)
+        self._layers[n:n + count] = layers
+        self._lows[n:n + count] = np.asarray(lows, dtype=np.float32).reshape(count, 3)
+        self._highs[n:n + count] = np.asarray(highs, dtype=np.float32).reshape(count, 3)
+        for index, entity in enumerate(entities, n):
+            self.index_of[entity] = index
+        self.entities += entities
+        self._view()
+
+    def remove(self, entities):
+        """Drop the boxes of the given entities (e.g. everything in an unloaded chunk)"""
+        dropped = {self.index_of[entity] for entity in entities if entity in self.index_of}
+        if not dropped:
+            return
+        keep = [index for index in range(len(self.entities)) if index not in dropped]
+        count = len(keep)
+        self._layers[:count], self._lows[:count], self._highs[:count] = self.layers[keep], self.lows[keep], self.highs[keep]
+        self.entities = [self.entities[index] for index in keep]
+        self.index_of = {entity: index for index, entity in enumerate(self.entities)}
+        self._view()
+
+    def rekey(self, entity, owner):
+        """Make owner (e.g. the StaticRecord replacing a batched entity) own entity's box"""
+        index = self.index_of.pop(entity, None)
+        if index is not None:
+            self.entities[index] = owner
+            self.index_of[owner] = index
+
+    def layers_of(self, hits):
+        """Bitmask of the collision layers of the given box indices"""
+        mask = 0
+        for index in hits:
+            mask |= int(self.layers[index])
+        return mask
+
+    def set_top(self, entity, top):
+        """Lower or raise a box's top (e.g. when a building collapses)"""
+        index = self.index_of.get(entity)
+        if index is not None:
+            self.highs[index, 1] = top
+
+    def sweep(self, x, y, z, dx, dz, half_extents=(0.5, 0.5, 0.5), mask=BUILDING | OBSTACLE, max_slides=3):
+        """Move a box centred at (x, y, z) by (dx, dz), stopping at and sliding along static boxes.
+
+        Returns (new_x, new_z, hit_indices). Boxes already overlapping the
+        mover at the start are ignored so it can always move out of them.
+        """
+        hits = []
+        if not len(self.entities):
+            return x + dx, z + dz, hits
+
+        hx, hy, hz = half_extents
+        # Boxes this mover can hit: on a masked layer and overlapping it vertically
+        candidates = ((self.layers & mask) != 0) & (self.lows[:, 1] < y + hy) & (self.highs[:, 1] > y - hy)
+        if not candidates.any():
+            return x + dx, z + dz, hits
+
+        # Minkowski-grow the boxes by the mover's half size so the mover becomes a point
+        min_x = self.lows[candidates, 0] - hx
+        max_x = self.highs[candidates, 0] + hx
+        min_z = self.lows[candidates, 2] - hz
+        max_z = self.highs[candidates, 2] + hz
+        indices = np.flatnonzero(candidates)
+
+        for _ in range(max_slides):
+            length = (dx * dx + dz * dz) ** 0.5
+            if length < 1e-6:
+                return x, z, hits
+
+            enter_x, exit_x = self._slab(x, dx, min_x, max_x)
+            enter_z, exit_z = self._slab(z, dz, min_z, max_z)
+            enter = np.maximum(enter_x, enter_z)
+            leave = np.minimum(exit_x, exit_z)
+            blocking = (enter <= leave) & (enter >= 0) & (enter <= 1)
+
+            if not blocking.any():
+                return x + dx, z + dz, hits
+
+            # Earliest time of impact
+            times = np.where(blocking, enter, np.inf)
+            first = int(np.argmin(times))
+            t = float(times[first])
+            hits.append(int(indices[first]))
+
+            # Stop just short of the wall, then slide the rest of the move along it
+            t_safe = max(t - 1e-3 / length, 0.0)
+            x += dx * t_safe
+            z += dz * t_safe
+            remaining = 1.0 - t_safe
+            if enter_x[first] > enter_z[first]:
+                dx, dz = 0.0, dz * remaining  # Hit an x face
+            else:
+                dx, dz = dx * remaining, 0.0  # Hit a z face
+
+        # Out of slides - drop whatever movement is left
+        return x, z, hits
+
+    @staticmethod
+    def _slab(origin, delta, low, high):
+        """Entry and exit times of a point moving origin + delta * t through [low, high] on one axis"""
+        if abs(delta) < 1e-9:
+            inside = (low < origin) & (origin < high)
+            enter = np.where(inside, -np.inf, np.inf)
+            return enter, -enter
+        t1 = (low - origin) / delta
+        t2 = (high - origin) / delta
+        return np.minimum(t1, t2), np.maximum(t1, t2)
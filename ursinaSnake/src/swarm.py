@@ -0,0 +1,475 @@
+import random
+import numpy as np
+from ursina import Entity, color
+from enemy import Enemy
+from decisions import DecisionLayer, Snapshot
+from neighbor_grid import NeighborGrid
+from timestep import lerp_angle
+
+# Behavior ids, one per Enemy.TYPES 'behavior'
+PATROL = 0
+GUARD = 1
+CHASE = 2
+WANDER = 3
+BEHAVIORS = {'patrol': PATROL, 'guard': GUARD, 'chase': CHASE, 'wander': WANDER}
+
+# Level of detail tiers by distance to the player, and how often each one thinks (in ticks)
+NEAR = 0
+MID = 1
+FAR = 2
+THINK_EVERY = np.array([1, 4, 16])
+WRITE_EVERY = np.array([1, 2, 4])  # How often each tier's transform is written to the scene (in frames)
+MAX_WRITES = 400  # Transforms written to the scene per frame at most
+
+MAX_WAYPOINTS = 6
+HOVER_PERIOD = 3.0          # Seconds per bob of a hovering enemy, up and back down
+PULSE_PERIOD = 2.0          # Seconds per pulse of an enemy's own scale
+SHIELD_SCALE = 1.5
+SHIELD_PULSE_PERIOD = 3.0
+H_SIGN = Entity.rotation_directions[0]  # ursina rotation_y -> panda heading
+
+
+def heading_towards(dx, dz):
+    """ursina rotation_y that faces along (dx, dz)"""
+    return np.degrees(np.arctan2(dz, dx)) + 90
+
+
+def ping_pong(time, period):
+    """0 -> 1 -> 0 every period seconds, with a sine ease"""
+    return (1 - np.cos(time * (2 * np.pi / period))) * 0.5
+
+
+def take_turns(rows, count, cursor):
+    """Up to count of the sorted rows, going round from cursor, and the cursor to go on from next time"""
+    if len(rows) <= count:
+        return rows, cursor
+    if count <= 0:
+        return rows[:0], cursor
+    start = np.searchsorted(rows, cursor)
+    rows = rows[(start + np.arange(count)) % len(rows)]
+    return rows, rows[-1] + 1
+
+
+def normalized(dx, dz):
+    length = np.sqrt(dx * dx + dz * dz)
+    length = np.maximum(length, 1e-9)
+    return dx / length, dz / length, length
+
+
+class EnemySwarm:
+    """Simulation state of every active enemy, stored as parallel arrays.
+
+    Positions, directions, speeds, waypoints and behavior ids live in
+    NumPy arrays and each behavior advances all of its enemies in one
+    vectorized pass. The Enemy entities are only the visible side: enemies
+    beyond view_distance of the player are hidden, and transforms are
+    written back only where something looks at them - at most once per
+    frame for the visible ones (less often further out), blended between
+    the last two steps (apply), and for the ones near() hands out for
+    collision tests. Stepping itself writes nothing to the scene graph.
+
+    Enemies further from the player think less often: near ones run
+    their behavior every tick, mid-range ones every 4th and far ones
+    every 16th (staggered by row). In between they dead-reckon along
+    their last velocity, so the cost of behavior logic follows how many
+    enemies are near the player rather than how many there are.
+
+    Thinking enemies also steer like boids: away from neighbours closer
+    than separation_radius, and towards their neighbours' heading.
+    Neighbour queries and paths to the player come from a DecisionLayer,
+    which works from a snapshot of the previous tick (on a worker thread
+    when threaded).
+    """
+
+    def __init__(self, capacity=64, view_distance=60, lod_distances=(20, 45), particles=None, threaded=False):
+        self.view_distance = view_distance
+        self.lod_distances = lod_distances  # Where MID and FAR start
+        self.separation_radius = 1.5
+        self.separation_weight = 1.0  # Push apart, as a fraction of the enemy's own speed
+        self.alignment_weight = 0.3   # Blend towards the neighbours' average velocity
+        self.decisions = DecisionLayer(threaded=threaded)
+        self.occupancy = None  # The city's OccupancyGrid, passed to the decision layer as a view each tick
+        self.particles = particles  # Runner trails are emitted in one batch per step
+        self.trail_color = tuple(Enemy.TYPES['runner']['color'].tint(-.2))
+        self.rng = np.random.default_rng(random.getrandbits(32))  # Follows the game's seed
+        self.entities = []
+        self.index_of = {}  # {enemy: row}
+
+        self.uid = np.zeros(capacity, dtype=np.int64)  # Stable id, as rows move on removal
+        self.next_uid = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.z = np.zeros(capacity, dtype=np.float32)
+        self.dx = np.zeros(capacity, dtype=np.float32)
+        self.dz = np.zeros(capacity, dtype=np.float32)
+        self.heading = np.zeros(capacity, dtype=np.float32)
+        self.prev_x = np.zeros(capacity, dtype=np.float32)  # Transform before the last step, blended from in apply()
+        self.prev_z = np.zeros(capacity, dtype=np.float32)
+        self.prev_heading = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)  # Last velocity, for dead reckoning
+        self.vz = np.zeros(capacity, dtype=np.float32)
+        self.since_think = np.zeros(capacity, dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.behavior = np.zeros(capacity, dtype=np.int8)
+        self.runner = np.zeros(capacity, dtype=bool)
+        self.time_alive = np.zeros(capacity, dtype=np.float32)
+        self.next_direction_change = np.zeros(capacity, dtype=np.float32)
+        self.particle_timer = np.zeros(capacity, dtype=np.float32)
+        self.detection_range = np.zeros(capacity, dtype=np.float32)
+        self.guard_x = np.zeros(capacity, dtype=np.float32)
+        self.guard_z = np.zeros(capacity, dtype=np.float32)
+        self.guard_radius = np.zeros(capacity, dtype=np.float32)
+        self.waypoints = np.zeros((capacity, MAX_WAYPOINTS, 2), dtype=np.float32)
+        self.waypoint_count = np.zeros(capacity, dtype=np.int32)
+        self.current_waypoint = np.zeros(capacity, dtype=np.int32)
+        self.shown = np.zeros(capacity, dtype=bool)
+        # Looks, only applied to the rendered transform (see apply)
+        self.scale = np.ones(capacity, dtype=np.float32)
+        self.pulse = np.zeros(capacity, dtype=np.float32)   # Scale pulsed up to, 0 for none
+        self.hover = np.zeros(capacity, dtype=np.float32)   # Height floated above the simulated y
+        self.shield_pulse = np.zeros(capacity, dtype=np.float32)  # Shield scale pulsed up to, 0 for no shield
+        self.tier = np.zeros(capacity, dtype=np.int8)  # LOD tier as of the last step
+        self.appeared = np.zeros(capacity, dtype=bool)  # Shown since the last apply(), written on the next one
+        self.columns = (
+            'uid', 'x', 'z', 'dx', 'dz', 'heading', 'prev_x', 'prev_z', 'prev_heading', 'vx', 'vz', 'since_think', 'speed', 'behavior', 'runner', 'time_alive',
+            'next_direction_change', 'particle_timer', 'detection_range', 'guard_x', 'guard_z',
+            'guard_radius', 'waypoints', 'waypoint_count', 'current_waypoint', 'shown', 'tier', 'appeared',
+            'scale', 'pulse', 'hover', 'shield_pulse'
+        )
+        self.grid = NeighborGrid()  # Broadphase for near(), rebuilt at most once per step
+        self.grid_cell_size = 4.0
+        self.grid_valid = False
+        self.bounds = (-24, -24, 24, 24)  # (min_x, min_z, max_x, max_z) that wandering enemies turn back at
+        self.ticks = 0
+        self.frames = 0  # apply() calls, staggering the throttled writes
+        self.max_writes = MAX_WRITES
+        self.near_cursor = 0  # Rows the capped near and mid/far writes carry on from next frame
+        self.write_cursor = 0
+        self.thinking = 0  # Enemies that ran their behavior on the last step
+
+    def __len__(self):
+        return len(self.entities)
+
+    def add(self, enemy):
+        """Take over the simulation of a freshly spawned enemy"""
+        if enemy in self.index_of:
+            self.remove(enemy)
+        self.grid_valid = False
+        row = len(self.entities)
+        if row == len(self.x):
+            self._grow()
+        self.entities.append(enemy)
+        self.index_of[enemy] = row
+
+        self.uid[row] = self.next_uid
+        self.next_uid += 1
+        self.x[row], self.z[row] = enemy.x, enemy.z
+        self.dx[row], self.dz[row] = enemy.direction.x, enemy.direction.z
+        self.heading[row] = enemy.rotation_y
+        self.prev_x[row], self.prev_z[row], self.prev_heading[row] = self.x[row], self.z[row], self.heading[row]
+        self.vx[row] = self.vz[row] = 0
+        self.since_think[row] = 0
+        self.speed[row] = enemy.speed
+        self.behavior[row] = BEHAVIORS[enemy.behavior]
+        self.runner[row] = enemy.enemy_type == 'runner'
+        self.time_alive[row] = 0
+        self.next_direction_change[row] = enemy.next_direction_change
+        self.particle_timer[row] = 0
+        self.detection_range[row] = enemy.detection_range
+        self.guard_radius[row] = enemy.guard_radius
+        if enemy.guard_position is not None:
+            self.guard_x[row], self.guard_z[row] = enemy.guard_position.x, enemy.guard_position.z
+        waypoints = [(p.x, p.z) for p in enemy.patrol_waypoints[:MAX_WAYPOINTS]]
+        self.waypoint_count[row] = len(waypoints)
+        self.current_waypoint[row] = 0
+        if waypoints:
+            self.waypoints[row, :len(waypoints)] = waypoints
+        self.shown[row] = True
+        config = enemy.config
+        self.scale[row] = config['scale']
+        self.pulse[row] = config.get('pulse', 0)
+        self.hover[row] = config.get('hover', 0)
+        self.shield_pulse[row] = config.get('shield_pulse', 0) if enemy.shield else 0
+        self.tier[row] = NEAR
+        self.appeared[row] = True
+
+    def remove(self, enemy):
+        """Swap-remove an enemy's row (O(1)), writing its final transform back first"""
+        row = self.index_of.pop(enemy, None)
+        if row is None:
+            return
+        self.grid_valid = False
+        self._write(np.array([row]))
+        if not self.shown[row]:
+            enemy.visible = True  # Pooled enemies come back visible
+        last = len(self.entities) - 1
+        if row != last:
+            moved = self.entities[last]
+            self.entities[row] = moved
+            self.index_of[moved] = row
+            for name in self.columns:
+                array = getattr(self, name)
+                array[row] = array[last]
+        self.entities.pop()
+
+    def _grow(self):
+        for name in self.columns:
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def near(self, x, z, radius):
+        """Enemies whose centre lies within radius of (x, z), with their simulated transforms written back"""
+        n = len(self.entities)
+        if not self.grid_valid:
+            self.grid.build(self.x[:n], self.z[:n], self.grid_cell_size)
+            self.grid_valid = True
+        rows = self.grid.around(x, z, radius)
+        rows = np.sort(rows[(self.x[rows] - x) ** 2 + (self.z[rows] - z) ** 2 <= radius * radius])
+        self._write(rows)
+        return [self.entities[row] for row in rows]
+
+    def outside(self, min_x, min_z, max_x, max_z):
+        """Enemies whose centre lies outside a rectangle"""
+        n = len(self.entities)
+        x, z = self.x[:n], self.z[:n]
+        out = (x < min_x) | (x > max_x) | (z < min_z) | (z > max_z)
+        return [self.entities[row] for row in np.flatnonzero(out)]
+
+    def step(self, dt, player_position=None):
+        """Advance every enemy by dt seconds, then show or hide them by distance to the player"""
+        n = len(self.entities)
+        if not n:
+            return
+        self.ticks += 1
+        self.grid_valid = False
+        self.prev_x[:n], self.prev_z[:n], self.prev_heading[:n] = self.x[:n], self.z[:n], self.heading[:n]
+        self.time_alive[:n] += dt
+        self.since_think[:n] += dt
+
+        think = self._thinking(n, player_position)
+        coasting = np.flatnonzero(~think)
+        self.x[coasting] += self.vx[coasting] * dt
+        self.z[coasting] += self.vz[coasting] * dt
+
+        decisions = self.decisions.latest
+        rows = np.flatnonzero(think)
+        self.thinking = len(rows)
+        self.vx[rows] = self.vz[rows] = 0  # Enemies that don't move this tick stay put
+        behavior = self.behavior[rows]
+        wander = [rows[behavior == WANDER]]
+        if player_position is not None:
+            px, pz = player_position[0], player_position[2]
+            self._guard(rows[behavior == GUARD], px, pz, dt, decisions)
+            chase = rows[behavior == CHASE]
+            _, _, distance = normalized(px - self.x[chase], pz - self.z[chase])
+            in_range = distance < self.detection_range[chase]
+            self._pursue(chase[in_range], px, pz, dt, decisions)
+            wander.append(chase[~in_range])
+        else:
+            # Nobody to chase: chasers wander and guards hold still
+            wander.append(rows[behavior == CHASE])
+        self._patrol(rows[behavior == PATROL], dt)
+        self._wander(np.concatenate(wander), dt)
+        self._flock(rows, dt, decisions)
+        self.since_think[rows] = 0
+
+        self._sync(dt, player_position)
+        self._submit(n, player_position)
+
+    def _submit(self, n, player_position):
+        """Hand this tick's state to the decision layer for the next tick"""
+        behavior = self.behavior[:n]
+        self.decisions.submit(Snapshot(
+            self.uid[:n].copy(), self.x[:n].copy(), self.z[:n].copy(), self.vx[:n].copy(), self.vz[:n].copy(),
+            np.flatnonzero((behavior == CHASE) | (behavior == GUARD)),
+            None if player_position is None else tuple(player_position),
+            self.separation_radius,
+            None if self.occupancy is None else self.occupancy.view()
+        ))
+
+    def _thinking(self, n, player_position):
+        """Mask of the rows whose LOD tier is due to run its behavior this tick"""
+        if player_position is None:
+            self.tier[:n] = NEAR
+            return np.ones(n, dtype=bool)
+        near, mid = self.lod_distances
+        d2 = (self.x[:n] - player_position[0]) ** 2 + (self.z[:n] - player_position[2]) ** 2
+        tier = (d2 >= near * near).astype(np.intp) + (d2 >= mid * mid)
+        self.tier[:n] = tier
+        return (self.ticks + np.arange(n)) % THINK_EVERY[tier] == 0
+
+    def _move(self, rows, dx, dz, dt):
+        """Move rows along (dx, dz) at their own speed, facing the way they go"""
+        speed = self.speed[rows]
+        self.vx[rows], self.vz[rows] = dx * speed, dz * speed
+        self.x[rows] += self.vx[rows] * dt
+        self.z[rows] += self.vz[rows] * dt
+        self.heading[rows] = heading_towards(dx, dz)
+
+    def _pursue(self, rows, px, pz, dt, decisions):
+        """Head for the player along the flow field, or straight at them where it has no path"""
+        if not len(rows):
+            return
+        dx, dz, _ = normalized(px - self.x[rows], pz - self.z[rows])
+        if decisions is not None:
+            index, found = decisions.lookup(self.uid[rows])
+            covered = found & decisions.covered[index]
+            dx = np.where(covered, decisions.flow_x[index], dx)
+            dz = np.where(covered, decisions.flow_z[index], dz)
+        self._move(rows, dx, dz, dt)
+
+    def _flock(self, rows, dt, decisions):
+        """Separation and alignment with nearby enemies, on top of each behavior's velocity"""
+        if decisions is None or not len(rows):
+            return
+        index, found = decisions.lookup(self.uid[rows])
+        push_x = np.where(found, decisions.push_x[index], 0)
+        push_z = np.where(found, decisions.push_z[index], 0)
+        crowded = found & decisions.crowded[index]
+
+        speed = self.speed[rows]
+        vx, vz = self.vx[rows], self.vz[rows]
+        new_vx = vx + self.separation_weight * speed * push_x
+        new_vz = vz + self.separation_weight * speed * push_z
+        new_vx += np.where(crowded, self.alignment_weight * (decisions.mean_vx[index] - vx), 0)
+        new_vz += np.where(crowded, self.alignment_weight * (decisions.mean_vz[index] - vz), 0)
+
+        # Never faster than the enemy's own speed
+        length = np.sqrt(new_vx * new_vx + new_vz * new_vz)
+        scale = np.minimum(1, speed / np.maximum(length, 1e-9))
+        new_vx, new_vz = new_vx * scale, new_vz * scale
+        self.x[rows] += (new_vx - vx) * dt
+        self.z[rows] += (new_vz - vz) * dt
+        self.vx[rows], self.vz[rows] = new_vx, new_vz
+
+    def _patrol(self, rows, dt):
+        rows = rows[self.waypoint_count[rows] > 0]
+        target = self.waypoints[rows, self.current_waypoint[rows]]
+        dx, dz, _ = normalized(target[:, 0] - self.x[rows], target[:, 1] - self.z[rows])
+        self._move(rows, dx, dz, dt)
+
+        # Move on to the next waypoint once close enough
+        reached = (target[:, 0] - self.x[rows]) ** 2 + (target[:, 1] - self.z[rows]) ** 2 < 1
+        rows = rows[reached]
+        self.current_waypoint[rows] = (self.current_waypoint[rows] + 1) % self.waypoint_count[rows]
+
+    def _guard(self, rows, px, pz, dt, decisions):
+        # Chase the player while they are inside the guarded area...
+        intruder = (px - self.guard_x[rows]) ** 2 + (pz - self.guard_z[rows]) ** 2 < self.guard_radius[rows] ** 2
+        self._pursue(rows[intruder], px, pz, dt, decisions)
+
+        # ...otherwise walk back to the guard position
+        returning = rows[~intruder]
+        dx, dz, distance = normalized(self.guard_x[returning] - self.x[returning], self.guard_z[returning] - self.z[returning])
+        away = distance > 0.5
+        self._move(returning[away], dx[away], dz[away], dt)
+
+    def _wander(self, rows, dt):
+        # Count down all the time since the enemy last thought, not just this tick
+        self.next_direction_change[rows] -= self.since_think[rows]
+        turning = rows[self.next_direction_change[rows] <= 0]
+        if len(turning):
+            dx, dz, _ = normalized(*self.rng.uniform(-1, 1, (2, len(turning))))
+            self.dx[turning], self.dz[turning] = dx, dz
+            self.next_direction_change[turning] = self.rng.uniform(1, 3, len(turning))
+
+        self._move(rows, self.dx[rows], self.dz[rows], dt)
+
+        # Boundary check - reverse direction if hitting boundaries
+        min_x, min_z, max_x, max_z = self.bounds
+        x, z = self.x[rows], self.z[rows]
+        out = rows[(x < min_x) | (x > max_x) | (z < min_z) | (z > max_z)]
+        self.dx[out] = -self.dx[out]
+        self.dz[out] = -self.dz[out]
+        self.vx[out] = -self.vx[out]
+        self.vz[out] = -self.vz[out]
+        self.heading[out] = heading_towards(self.dx[out], self.dz[out])
+
+    def _sync(self, dt, player_position):
+        """Show enemies that came into view and hide the ones that left it"""
+        n = len(self.entities)
+        if player_position is None:
+            visible = np.ones(n, dtype=bool)
+        else:
+            px, pz = player_position[0], player_position[2]
+            visible = (self.x[:n] - px) ** 2 + (self.z[:n] - pz) ** 2 <= self.view_distance ** 2
+
+        shown = self.shown[:n]
+        for row in np.flatnonzero(visible != shown):
+            self.entities[row].visible = bool(visible[row])
+        self.appeared[:n] |= visible & ~shown  # Throttled rows would otherwise show up where they were hidden
+        shown[:] = visible
+
+        if self.particles is not None:
+            self._emit_trails(np.flatnonzero(visible), dt)
+
+    def apply(self, alpha):
+        """Write the transforms of visible enemies, blended alpha of the way from the previous step to the last.
+
+        Like thinking, writes follow the LOD tiers: near enemies are written
+        every frame, mid-range ones every 2nd and far ones every 4th
+        (staggered by row). At most max_writes are written per frame, near
+        ones first; when more are due they take turns, so a big crowd costs
+        a fixed amount per frame.
+        """
+        n = len(self.entities)
+        self.frames += 1
+        shown = self.shown[:n]
+        urgent = shown & ((self.tier[:n] == NEAR) | self.appeared[:n])
+        self.appeared[:n] = False
+        near, self.near_cursor = take_turns(np.flatnonzero(urgent), self.max_writes, self.near_cursor)
+        budget = self.max_writes - len(near)
+        due = (self.frames + np.arange(n)) % WRITE_EVERY[self.tier[:n]] == 0
+        rest = np.flatnonzero(shown & due & ~urgent)
+        if len(rest) > budget:
+            rest, self.write_cursor = take_turns(np.flatnonzero(shown & ~urgent), budget, self.write_cursor)
+        self._write(np.concatenate([near, rest]), alpha, looks=True)
+
+    def _write(self, rows, alpha=1.0, looks=False):
+        """Write the transforms of rows to their entities, computed for all of them at once.
+
+        With looks, hovering enemies are lifted and pulsing ones (and
+        shields) scaled too; every value written is absolute, so a row that
+        isn't written on some frame just keeps its last look.
+        """
+        if not len(rows):
+            return
+        x = self.prev_x[rows] + (self.x[rows] - self.prev_x[rows]) * alpha
+        z = self.prev_z[rows] + (self.z[rows] - self.prev_z[rows]) * alpha
+        h = lerp_angle(self.prev_heading[rows], self.heading[rows], alpha) * H_SIGN
+        # Add a subtle hover/bob to all enemies
+        t = self.time_alive[rows]
+        y = 1 + np.sin(t * 2) * 0.1
+        entities = self.entities
+        if not looks:
+            for row, x, y, z, h in zip(rows.tolist(), x.tolist(), y.tolist(), z.tolist(), h.tolist()):
+                entities[row].setPosHpr(x, y, z, h, 0, 0)  # Enemies never pitch or roll
+            return
+
+        hover = self.hover[rows]
+        y = y + hover * (1 + ping_pong(t, HOVER_PERIOD))
+        scale, pulse = self.scale[rows], self.pulse[rows]
+        scale = np.where(pulse > 0, scale + (pulse - scale) * ping_pong(t, PULSE_PERIOD), scale)
+        for row, x, y, z, h, s in zip(rows.tolist(), x.tolist(), y.tolist(), z.tolist(), h.tolist(), scale.tolist()):
+            entities[row].setPosHprScale(x, y, z, h, 0, 0, s, s, s)
+
+        shielded = self.shield_pulse[rows] > 0
+        rows, t = rows[shielded], t[shielded]
+        shield = SHIELD_SCALE + (self.shield_pulse[rows] - SHIELD_SCALE) * ping_pong(t, SHIELD_PULSE_PERIOD)
+        for row, s in zip(rows.tolist(), shield.tolist()):
+            entities[row].shield.setScale(s)
+
+    def _emit_trails(self, rows, dt):
+        """Runners drop a trail particle every 0.1 seconds"""
+        rows = rows[self.runner[rows]]
+        self.particle_timer[rows] -= dt
+        due = rows[self.particle_timer[rows] <= 0]
+        if not len(due):
+            return
+        self.particle_timer[due] = 0.1
+        origins = np.column_stack((self.x[due], np.full(len(due), 1.1, dtype=np.float32), self.z[due]))
+        self.particles.runner_trail.emit(
+            origins, np.zeros((len(due), 3), dtype=np.float32),
+            sizes=0.3, lifetimes=0.5, color=self.trail_color, end_color=color.clear
+        )
@@ -0,0 +1,77 @@
+import heapq
+
+
+class Timer:
+    """Handle for a scheduled callback, returned by Timers.after()"""
+    __slots__ = ('due', 'callback', 'args', 'cancelled', 'fired')
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+
+    @property
+    def active(self):
+        return not (self.cancelled or self.fired)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Timers:
+    """Min-heap of callbacks due at a point in simulation time.
+
+    advance() only looks at the top of the heap, so the per-tick cost is
+    O(1) when nothing is due no matter how many timers are pending, and
+    objects without timers cost nothing at all. Cancelled timers are
+    dropped lazily when they reach the top. Time only moves when the
+    simulation calls advance(), so timers pause with the game and run the
+    same headless.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.paused = False
+        self.heap = []    # (due, serial, timer)
+        self.serial = 0   # Tie-breaker so timers due together fire in scheduling order
+
+    def __len__(self):
+        return len(self.heap)
+
+    def after(self, delay, callback=None, *args):
+        """Call callback(*args) delay seconds of simulation time from now.
+
+        With no callback the timer just marks a span of time, e.g. a cooldown
+        that is over once the timer is no longer active.
+        """
+        timer = Timer(self.time + delay, callback, args)
+        heapq.heappush(self.heap, (timer.due, self.serial, timer))
+        self.serial += 1
+        return timer
+
+    def remaining(self, timer):
+        """Seconds until the timer fires (0 if it isn't pending)"""
+        if timer is None or not timer.active:
+            return 0.0
+        return max(timer.due - self.time, 0.0)
+
+    def advance(self, dt):
+        """Move simulation time forward, firing every timer that comes due"""
+        if self.paused:
+            return
+        self.time += dt
+        heap = self.heap
+        while heap and heap[0][0] <= self.time:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            timer.fired = True
+            if timer.callback is not None:
+                timer.callback(*timer.args)
+
+    def clear(self):
+        for _, _, timer in self.heap:
+            timer.cancelled = True
+        self.heap.clear()
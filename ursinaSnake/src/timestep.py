@@ -0,0 +1,79 @@
+from ursina import Vec3
+
+
+class FixedTimestep:
+    """Accumulates frame time and hands out a bounded number of fixed simulation steps"""
+
+    def __init__(self, rate=60, max_steps=5):
+        self.step_dt = 1.0 / rate
+        self.max_steps = max_steps  # Catch-up cap so a long frame can't spiral
+        self.accumulator = 0.0
+        self.alpha = 0.0  # How far the render frame is between the last two sim steps
+
+    def advance(self, frame_dt):
+        """Add a frame's worth of time and return how many sim steps to run"""
+        self.accumulator += frame_dt
+        steps = int(self.accumulator / self.step_dt)
+
+        if steps > self.max_steps:
+            # Drop the time we can't catch up on - the game slows down instead of stalling
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_dt
+
+        self.alpha = self.accumulator / self.step_dt
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+
+def lerp_angle(a, b, t):
+    """Interpolate between two angles in degrees along the shortest arc"""
+    delta = (b - a + 180) % 360 - 180
+    return a + delta * t
+
+
+class TransformInterpolator:
+    """Keeps simulation transforms separate from the blended transforms shown on screen.
+
+    The scene node holds the interpolated transform between frames, so before
+    stepping the simulation the last simulated transforms are restored.
+    """
+
+    def __init__(self):
+        self.previous = {}  # {entity: (position, rotation_y)} before the last sim step
+        self.current = {}   # {entity: (position, rotation_y)} after the last sim step
+
+    def restore(self, entities):
+        """Put entities back to their simulated transforms before stepping"""
+        for entity in entities:
+            state = self.current.get(entity)
+            if state:
+                entity.position, entity.rotation_y = state
+
+    def capture_previous(self, entities):
+        self.previous = {e: (Vec3(e.position), e.rotation_y) for e in entities}
+
+    def capture_current(self, entities):
+        self.current = {e: (Vec3(e.position), e.rotation_y) for e in entities}
+
+    def apply(self, entities, alpha):
+        """Write blended transforms to the scene nodes for rendering"""
+        for entity in entities:
+            current = self.current.get(entity)
+            previous = self.previous.get(entity, current)
+            if not current:
+                continue
+            entity.position = lerp(previous[0], current[0], alpha)
+            entity.rotation_y = lerp_angle(previous[1], current[1], alpha)
+
+    def clear(self):
+        self.previous = {}
+        self.current = {}
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
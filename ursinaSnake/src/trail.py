@@ -0,0 +1,202 @@
+import numpy as np
+import math
+from collections import deque
+
+
+class TrailBuffer:
+    """Preallocated ring buffer of head positions sampled at a fixed arc-length spacing.
+
+    Samples are evenly spaced along the path the head travelled, so a body
+    segment that sits a given distance behind the head maps straight to a
+    (fractional) sample index. That keeps segment spacing independent of the
+    frame rate and lets all segment positions be computed in one pass.
+    """
+
+    def __init__(self, sample_spacing=0.1, capacity=1024, grid=None):
+        self.sample_spacing = sample_spacing
+        self.grid = grid  # Optional TrailGrid that mirrors every sample written
+        self.samples = np.zeros((capacity, 3), dtype=np.float32)
+        self.newest = -1  # Ring index of the most recent sample
+        self.count = 0    # Number of valid samples in the ring
+        self.total = 0    # Samples ever written (never wraps)
+        self.head = np.zeros(3, dtype=np.float32)  # Latest head position (may be ahead of newest sample)
+        self.lead = 0.0   # Distance from the newest sample to the head
+
+        # Scratch buffers for segment_positions, grown alongside the snake
+        self._resize_scratch(64)
+
+    @property
+    def capacity(self):
+        return len(self.samples)
+
+    def clear(self):
+        self.newest = -1
+        self.count = 0
+        self.lead = 0.0
+        if self.grid is not None:
+            self.grid.clear()
+
+    def ensure_length(self, trail_length):
+        """Make sure the ring can hold a trail of the given arc length (called on growth, not per frame)"""
+        needed = int(trail_length / self.sample_spacing) + 2
+        if needed <= self.capacity:
+            return
+
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        # Unroll the ring oldest-first into the new buffer
+        ordered = self.ordered_samples()
+        self.samples = np.zeros((new_capacity, 3), dtype=np.float32)
+        self.samples[:len(ordered)] = ordered
+        self.newest = len(ordered) - 1
+
+    def ordered_samples(self):
+        """Return valid samples oldest-first (allocates - not for per-frame use)"""
+        if self.count == 0:
+            return self.samples[:0].copy()
+        indices = (self.newest - np.arange(self.count - 1, -1, -1)) % self.capacity
+        return self.samples[indices]
+
+    def push(self, position):
+        """Record the head position, emitting samples every sample_spacing units travelled"""
+        x, y, z = position[0], position[1], position[2]
+        self.head[:] = (x, y, z)
+
+        if self.count == 0:
+            self._write(x, y, z)
+            self.lead = 0.0
+            return
+
+        last = self.samples[self.newest]
+        lx, ly, lz = float(last[0]), float(last[1]), float(last[2])
+        dx, dy, dz = x - lx, y - ly, z - lz
+        distance = (dx * dx + dy * dy + dz * dz) ** 0.5
+
+        # Walk from the newest sample towards the head in fixed steps
+        spacing = self.sample_spacing
+        if distance >= spacing:
+            steps = int(distance / spacing)
+            step_x, step_y, step_z = dx / distance * spacing, dy / distance * spacing, dz / distance * spacing
+            for i in range(1, steps + 1):
+                self._write(lx + step_x * i, ly + step_y * i, lz + step_z * i)
+            distance -= steps * spacing
+
+        self.lead = distance
+
+    def _write(self, x, y, z):
+        self.newest = (self.newest + 1) % self.capacity
+        self.samples[self.newest] = (x, y, z)
+        self.count = min(self.count + 1, self.capacity)
+        if self.grid is not None:
+            self.grid.insert(self.total, x, z)
+        self.total += 1
+
+    def _resize_scratch(self, size):
+        self._offsets = np.arange(size, dtype=np.float32)
+        self._k = np.zeros(size, dtype=np.float32)
+        self._k0 = np.zeros(size, dtype=np.int64)
+        self._k1 = np.zeros(size, dtype=np.int64)
+        self._frac = np.zeros((size, 1), dtype=np.float32)
+        self._a = np.zeros((size, 3), dtype=np.float32)
+        self._b = np.zeros((size, 3), dtype=np.float32)
+        self._out = np.zeros((size, 3), dtype=np.float32)
+
+    def segment_positions(self, n, gap):
+        """Positions of n segments spaced gap units apart behind the head, as an (n, 3) view.
+
+        The returned array is reused on the next call.
+        """
+        if n > len(self._offsets):
+            self._resize_scratch(max(n, len(self._offsets) * 2))
+        out = self._out[:n]
+        if self.count == 0:
+            out[:] = self.head
+            return out
+
+        k, k0, k1 = self._k[:n], self._k0[:n], self._k1[:n]
+        frac, a, b = self._frac[:n], self._a[:n], self._b[:n]
+
+        # Fractional sample index (0 = newest) for each segment's arc distance
+        np.add(self._offsets[:n], 1, out=k)
+        np.multiply(k, gap, out=k)
+        np.subtract(k, self.lead, out=k)
+        np.divide(k, self.sample_spacing, out=k)
+        np.clip(k, 0, self.count - 1, out=k)
+
+        np.floor(k, out=frac[:, 0])
+        k0[:] = frac[:, 0]
+        np.subtract(k, frac[:, 0], out=frac[:, 0])
+        np.add(k0, 1, out=k1)
+        np.minimum(k1, self.count - 1, out=k1)
+
+        # Map "samples back from newest" to ring indices
+        np.subtract(self.newest, k0, out=k0)
+        np.mod(k0, self.capacity, out=k0)
+        np.subtract(self.newest, k1, out=k1)
+        np.mod(k1, self.capacity, out=k1)
+
+        np.take(self.samples, k0, axis=0, out=a)
+        np.take(self.samples, k1, axis=0, out=b)
+
+        # out = a + (b - a) * frac
+        np.subtract(b, a, out=b)
+        np.multiply(b, frac, out=b)
+        np.add(a, b, out=out)
+        return out
+
+
+class TrailGrid:
+    """Uniform grid over the trail samples that are currently covered by the body.
+
+    Samples enter the grid as the head lays them down and leave it in the
+    same order once the tail has passed, so both ends cost O(1) per sample.
+    A query only looks at the 3x3 cells around a point, which keeps
+    self-collision checks independent of snake length.
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.cells = {}       # {(cx, cz): deque of (serial, x, z)}, oldest first
+        self.order = deque()  # (serial, cell) for every sample in the grid, oldest first
+
+    def clear(self):
+        self.cells.clear()
+        self.order.clear()
+
+    def cell_of(self, x, z):
+        return (math.floor(x / self.cell_size), math.floor(z / self.cell_size))
+
+    def insert(self, serial, x, z):
+        cell = self.cell_of(x, z)
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            bucket = self.cells[cell] = deque()
+        bucket.append((serial, x, z))
+        self.order.append((serial, cell))
+
+    def evict_before(self, serial):
+        """Drop every sample older than serial (the tail has moved past them)"""
+        while self.order and self.order[0][0] < serial:
+            _, cell = self.order.popleft()
+            bucket = self.cells[cell]
+            bucket.popleft()
+            if not bucket:
+                del self.cells[cell]
+
+    def hit(self, x, z, radius, newest_serial):
+        """True if any sample with serial <= newest_serial lies within radius of (x, z)"""
+        cx, cz = self.cell_of(x, z)
+        radius_sq = radius * radius
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                bucket = self.cells.get((cx + dx, cz + dz))
+                if not bucket:
+                    continue
+                for serial, sx, sz in bucket:
+                    if serial > newest_serial:
+                        break  # Buckets are in serial order, the rest are too close to the head
+                    if (sx - x) ** 2 + (sz - z) ** 2 < radius_sq:
+                        return True
+        return False
@@ -0,0 +1,144 @@
+import numpy as np
+from ursina import Entity
+
+# Wave shapes for a looping tween
+RAMP = 0       # start -> end, then wrap (seamless for spins)
+PING_PONG = 1  # start -> end -> start with a sine ease, like in_out_sine there and back
+
+H_SIGN = Entity.rotation_directions[0]  # ursina rotation_y -> panda heading
+
+
+class TweenTrack:
+    """Looping tweens of one property, stored as parallel arrays.
+
+    Every tween is evaluated in closed form from the shared clock, so a
+    whole track advances in one vectorized pass; only the final write to
+    each scene node is per entity.
+    """
+
+    def __init__(self, width, write, capacity=64):
+        self.width = width    # Floats per value (1 for y/heading/scale, 4 for colour)
+        self.write = write    # write(entity, values) for one entity
+        self.entities = []
+        self.index_of = {}    # {entity: row}
+        self.start = np.zeros((capacity, width), dtype=np.float32)
+        self.delta = np.zeros((capacity, width), dtype=np.float32)
+        self.period = np.ones(capacity, dtype=np.float32)
+        self.t0 = np.zeros(capacity, dtype=np.float64)
+        self.wave = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def add(self, entity, start, end, period, wave, time):
+        if entity in self.index_of:
+            self.remove(entity)
+        row = len(self.entities)
+        if row == len(self.period):
+            self._grow()
+        self.entities.append(entity)
+        self.index_of[entity] = row
+        self.start[row] = start
+        self.delta[row] = np.asarray(end, dtype=np.float32) - self.start[row]
+        self.period[row] = period
+        self.t0[row] = time
+        self.wave[row] = wave
+
+    def remove(self, entity):
+        """Swap-remove an entity's tween (O(1))"""
+        row = self.index_of.pop(entity, None)
+        if row is None:
+            return
+        last = len(self.entities) - 1
+        if row != last:
+            moved = self.entities[last]
+            self.entities[row] = moved
+            self.index_of[moved] = row
+            for array in (self.start, self.delta, self.period, self.t0, self.wave):
+                array[row] = array[last]
+        self.entities.pop()
+
+    def _grow(self):
+        for name in ('start', 'delta', 'period', 't0', 'wave'):
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def advance(self, time):
+        n = len(self.entities)
+        if not n:
+            return
+        phase = np.mod((time - self.t0[:n]) / self.period[:n], 1.0)
+        ease = np.where(self.wave[:n] == PING_PONG, (1 - np.cos(phase * (2 * np.pi))) * 0.5, phase)
+        values = self.start[:n] + self.delta[:n] * ease[:, None]
+
+        write = self.write
+        for entity, value in zip(self.entities, values.tolist()):
+            write(entity, value)
+
+
+def _write_y(entity, value):
+    entity.setY(value[0])
+
+
+def _write_heading(entity, value):
+    entity.setH(value[0] * H_SIGN)
+
+
+def _write_scale(entity, value):
+    entity.setScale(value[0])
+
+
+def _write_color(entity, value):
+    if entity.model:
+        entity.model.setColorScale(*value)
+
+
+class TweenManager:
+    """All looping decorative animations, advanced together once per frame.
+
+    Replaces one ursina Sequence per animated property with a row in a
+    per-property TweenTrack. Tweens are purely visual, run on frame time
+    and never touch simulation state, so headless games don't create any.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.y = TweenTrack(1, _write_y)
+        self.heading = TweenTrack(1, _write_heading)
+        self.scale = TweenTrack(1, _write_scale)
+        self.color = TweenTrack(4, _write_color)
+        self.tracks = (self.y, self.heading, self.scale, self.color)
+
+    def __len__(self):
+        return sum(len(track) for track in self.tracks)
+
+    def bob(self, entity, height, duration):
+        """Float up by height and back down again every 2 * duration seconds"""
+        self.y.add(entity, entity.y, entity.y + height, duration * 2, PING_PONG, self.time)
+
+    def spin(self, entity, degrees_per_second):
+        """Turn around y at a constant rate"""
+        period = 360 / abs(degrees_per_second)
+        end = entity.rotation_y + (360 if degrees_per_second > 0 else -360)
+        self.heading.add(entity, entity.rotation_y, end, period, RAMP, self.time)
+
+    def pulse(self, entity, to_scale, duration):
+        """Grow to a uniform scale and shrink back every 2 * duration seconds"""
+        self.scale.add(entity, entity.scale_x, to_scale, duration * 2, PING_PONG, self.time)
+
+    def color_loop(self, entity, to_color, duration):
+        """Fade to a colour and back every 2 * duration seconds"""
+        self.color.add(entity, tuple(entity.color), tuple(to_color), duration * 2, PING_PONG, self.time)
+
+    def remove(self, *entities):
+        """Stop every tween on the given entities (call before destroying them)"""
+        for entity in entities:
+            for track in self.tracks:
+                track.remove(entity)
+
+    def advance(self, dt):
+        self.time += dt
+        for track in self.tracks:
+            track.advance(self.time)
@@ -1,7 +1,8 @@
 from ursina import *
+from events import Damaged, Healed, ScoreChanged, ComboChanged, PowerUpApplied, PowerUpExpired, GameOver, GameRestarted
 
 class UI(Entity):
-    def __init__(self):
+    def __init__(self, events):
         super().__init__()
         self.score = 0
         self.health = 3
@@ -63,6 +64,19 @@ class UI(Entity):
             scale=1,
             color=color.light_gray
         )
+        
+        # Game over screen, shown on GameOver
+        self.game_over_texts = []
+        
+        # Keep the HUD in sync with game events
+        events.subscribe(ScoreChanged, lambda event: self.set_score(event.score))
+        events.subscribe(Damaged, lambda event: self.set_health(event.health))
+        events.subscribe(Healed, lambda event: self.set_health(event.health))
+        events.subscribe(ComboChanged, lambda event: self.set_combo(event.count))
+        events.subscribe(PowerUpApplied, self.on_powerup_applied)
+        events.subscribe(PowerUpExpired, lambda event: self.update_powerup(event.powerup_type, False))
+        events.subscribe(GameOver, lambda event: self.show_game_over(event.score))
+        events.subscribe(GameRestarted, lambda event: self.reset())
 
     def update(self):
         # Update text displays
@@ -208,6 +222,18 @@ class UI(Entity):
             if 'max_duration' in indicator_data:
                 del indicator_data['max_duration']
     
+    def on_powerup_applied(self, event):
+        # Instant power-ups (health) have nothing to count down
+        if event.duration > 0:
+            self.update_powerup(event.powerup_type, True, event.duration)
+
+    def show_game_over(self, score):
+        self.game_over_texts = [
+            Text(text="GAME OVER", origin=(0, 0), scale=3, color=color.red),
+            Text(text=f"Final Score: {score}", origin=(0, 0), position=(0, -0.1), scale=2, color=color.yellow),
+            Text(text="Press R to restart", origin=(0, 0), position=(0, -0.2), scale=1.5, color=color.white),
+        ]
+
     def reset(self):
         """Reset UI elements for game restart"""
         self.score = 0
@@ -224,4 +250,9 @@ class UI(Entity):
         
         # Reset power-up indicators
         for powerup_type, indicator in self.powerup_indicators.items():
-            indicator['container'].disable()
\ No newline at end of file
+            indicator['container'].disable()
+        
+        # Clear the game over screen
+        for text in self.game_over_texts:
+            destroy(text)
+        self.game_over_texts = []
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import numpy as np
+from city_layout import CityLayout, TABLES, generate_chunk, chunk_key
+
+
+def assert_same_chunk(a, b):
+    assert a.key == b.key and a.origin == b.origin
+    for name in TABLES:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+
+def test_generate_chunk_is_deterministic_per_seed_and_key():
+    assert_same_chunk(generate_chunk(5, (1, -2)), generate_chunk(5, (1, -2)))
+    a, b = generate_chunk(5, (1, -2)), generate_chunk(6, (1, -2))
+    assert not np.array_equal(a.buildings, b.buildings)
+
+
+def test_chunk_key_floors_negative_positions():
+    assert chunk_key(-0.5, 31.9) == (-1, 0)
+    assert chunk_key(-32.0, 32.0) == (-1, 1)
+
+
+def test_region_chunks_match_generating_them_alone(tmp_path):
+    layout = CityLayout(3, region_size=2, cache_dir=tmp_path)
+    for key in [(0, 0), (1, 1), (-1, 0), (-3, -4)]:
+        assert_same_chunk(layout.chunk(key), generate_chunk(3, key))
+    assert layout.generated == 3  # (0, 0) and (1, 1) share a region
+
+
+def test_cached_regions_are_memory_mapped_back_unchanged(tmp_path):
+    first = CityLayout(3, region_size=2, cache_dir=tmp_path)
+    expected = [first.chunk((x, z)) for x in (-2, 1) for z in (0, 3)]
+    assert os.listdir(first.cache_dir)
+
+    second = CityLayout(3, region_size=2, cache_dir=tmp_path)
+    for chunk in expected:
+        assert_same_chunk(second.chunk(chunk.key), chunk)
+    assert second.generated == 0
+    index, tables = second.region((0, 0))
+    assert isinstance(index, np.memmap)
+    assert all(isinstance(table, np.memmap) for table in tables.values())
+    assert not [name for name in os.listdir(second.cache_dir) if name.endswith('.tmp')]
+
+
+def test_no_cache_dir_keeps_regions_in_memory_only():
+    layout = CityLayout(3, region_size=1, cache_dir=None, max_open=1)
+    assert layout.cache_dir is None
+    for key in [(0, 0), (5, 5), (0, 0)]:
+        assert_same_chunk(layout.chunk(key), generate_chunk(3, key))
+    assert layout.generated == 3  # Nothing to read back once (0, 0) was dropped
+    assert layout.load((0, 0)) is None
+
+
+def test_seeds_and_region_sizes_cache_apart(tmp_path):
+    CityLayout(3, region_size=2, cache_dir=tmp_path).chunk((0, 0))
+    other_seed = CityLayout(4, region_size=2, cache_dir=tmp_path)
+    other_seed.chunk((0, 0))
+    assert other_seed.generated == 1
+    other_size = CityLayout(3, region_size=4, cache_dir=tmp_path)
+    other_size.chunk((0, 0))
+    assert other_size.generated == 1
+
+
+def test_unreadable_cached_region_is_regenerated(tmp_path):
+    CityLayout(3, region_size=2, cache_dir=tmp_path).chunk((0, 0))
+    layout = CityLayout(3, region_size=2, cache_dir=tmp_path)
+    with open(layout.path((0, 0), 'buildings'), 'wb') as f:
+        f.write(b'not an array')
+    assert_same_chunk(layout.chunk((1, 0)), generate_chunk(3, (1, 0)))
+    assert layout.generated == 1
+
+
+def test_mismatched_cached_region_is_regenerated(tmp_path):
+    CityLayout(3, region_size=2, cache_dir=tmp_path).chunk((0, 0))
+    layout = CityLayout(3, region_size=2, cache_dir=tmp_path)
+    np.save(layout.path((0, 0), 'obstacles'), np.zeros(1, dtype=TABLES['obstacles']))
+    assert_same_chunk(layout.chunk((0, 1)), generate_chunk(3, (0, 1)))
+    assert layout.generated == 1
+
+
+def test_only_max_open_regions_stay_open(tmp_path):
+    layout = CityLayout(3, region_size=1, cache_dir=None, max_open=2)
+    for key in [(0, 0), (1, 0), (0, 0), (2, 0)]:
+        layout.chunk(key)
+    assert list(layout.regions) == [(0, 0), (2, 0)]  # (1, 0) was least recently used
+    assert layout.generated == 3
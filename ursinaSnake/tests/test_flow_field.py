@@ -0,0 +1,110 @@
+import numpy as np
+from flow_field import FlowField
+from occupancy import OccupancyGrid, OccupancyView
+
+
+def view(blocked, version=0):
+    blocked = np.asarray(blocked, dtype=bool)
+    return OccupancyView(0.0, 0.0, 1.0, len(blocked), version, blocked)
+
+
+def follow(field, occupancy, start, goal, limit=100):
+    """Cells visited walking the field from start until the goal cell (or a dead end)"""
+    path = [start]
+    while path[-1] != goal and len(path) < limit:
+        ix, iz = path[-1]
+        dx, dz, covered = field.directions(np.array([ix + 0.5]), np.array([iz + 0.5]))
+        if not covered[0]:
+            break
+        path.append((ix + int(np.sign(dx[0])), iz + int(np.sign(dz[0]))))
+        assert not occupancy.blocked[path[-1]]
+    return path
+
+
+def test_open_grid_points_straight_at_the_player():
+    field = FlowField(radius=8)
+    occupancy = view(np.zeros((10, 10)))
+    assert field.update(occupancy, 0.5, 0.5)
+    dx, dz, covered = field.directions(np.array([5.5, 0.5, 5.5]), np.array([0.5, 5.5, 5.5]))
+    assert covered.all()
+    np.testing.assert_allclose(dx, [-1, 0, -np.sqrt(0.5)], atol=1e-6)
+    np.testing.assert_allclose(dz, [0, -1, -np.sqrt(0.5)], atol=1e-6)
+
+
+def test_paths_go_around_a_wall_through_its_gap():
+    blocked = np.zeros((10, 10), dtype=bool)
+    blocked[5, :9] = True  # Wall across x = 5 with a gap at z = 9
+    occupancy = view(blocked)
+    field = FlowField(radius=10)
+    field.update(occupancy, 0.5, 0.5)
+    path = follow(field, occupancy, (8, 0), (0, 0))
+    assert path[-1] == (0, 0)
+    assert (5, 9) in path
+
+
+def test_diagonals_do_not_cut_past_blocked_corners():
+    blocked = np.zeros((5, 5), dtype=bool)
+    blocked[1, 0] = True
+    occupancy = view(blocked)
+    field = FlowField(radius=5)
+    field.update(occupancy, 0.5, 0.5)
+    # (1, 0) is blocked, so neither (2, 1) -> (1, 0) nor (1, 1) -> (0, 0) may be taken diagonally
+    path = follow(field, occupancy, (2, 1), (0, 0))
+    assert path == [(2, 1), (1, 1), (0, 1), (0, 0)]
+
+
+def test_unreachable_cells_and_the_goal_cell_are_not_covered():
+    blocked = np.zeros((8, 8), dtype=bool)
+    blocked[5, 5:] = blocked[5:, 5] = True  # Walls off the corner beyond (5, 5)
+    field = FlowField(radius=8)
+    field.update(view(blocked), 0.5, 0.5)
+    _, _, covered = field.directions(np.array([7.5, 0.5, 3.5]), np.array([7.5, 0.5, 3.5]))
+    assert covered.tolist() == [False, False, True]
+
+
+def test_player_may_stand_in_a_blocked_margin():
+    blocked = np.zeros((6, 6), dtype=bool)
+    blocked[2, 2] = True
+    field = FlowField(radius=6)
+    field.update(view(blocked), 2.5, 2.5)
+    _, _, covered = field.directions(np.array([4.5]), np.array([2.5]))
+    assert covered[0]
+
+
+def test_positions_outside_the_window_are_not_covered():
+    field = FlowField(radius=2)
+    field.update(view(np.zeros((20, 20))), 10.5, 10.5)
+    assert field.origin == (8, 8)
+    _, _, covered = field.directions(np.array([12.5, 13.5, -3.0]), np.array([10.5, 10.5, 10.5]))
+    assert covered.tolist() == [True, False, False]
+
+
+def test_rebuilds_only_when_the_goal_cell_or_blocked_cells_change():
+    grid = OccupancyGrid(half_size=5, cell_size=1.0)
+    field = FlowField(radius=10)
+    assert field.update(grid.view(), 0.5, 0.5)
+    assert not field.update(grid.view(), 0.9, 0.1)  # Same cell
+    assert field.update(grid.view(), 1.5, 0.5)
+    assert field.searches == 2
+
+    grid.blocked[0, 0] = True
+    grid.version += 1
+    assert field.update(grid.view(), 1.5, 0.5)
+    assert field.searches == 3
+
+
+def test_views_stay_frozen_while_the_grid_changes():
+    grid = OccupancyGrid(half_size=5, cell_size=1.0)
+    frozen = grid.view()
+    grid.blocked[3, 3] = True
+    grid.version += 1
+    assert not frozen.blocked[3, 3]
+    assert grid.view().blocked[3, 3]
+
+
+def test_player_off_the_grid_leaves_everyone_uncovered():
+    field = FlowField(radius=4)
+    assert field.update(view(np.zeros((6, 6))), -10.0, -10.0)
+    dx, dz, covered = field.directions(np.array([1.5, 2.5]), np.array([1.5, 2.5]))
+    assert not covered.any()
+    assert not dx.any() and not dz.any()
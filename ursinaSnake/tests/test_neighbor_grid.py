@@ -0,0 +1,84 @@
+import numpy as np
+from neighbor_grid import NeighborGrid
+
+
+def points(n, extent, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-extent, extent, n), rng.uniform(-extent, extent, n)
+
+
+def test_build_sorts_every_point_into_its_cell():
+    xs, zs = points(500, 20)
+    grid = NeighborGrid()
+    grid.build(xs, zs, 2.0)
+    assert sorted(grid.order.tolist()) == list(range(500))
+    keys = grid.cx * grid.depth + grid.cz
+    assert (np.diff(keys[grid.order]) >= 0).all()
+    assert grid.counts.sum() == 500
+    np.testing.assert_array_equal(grid.starts, np.cumsum(grid.counts) - grid.counts)
+
+
+def test_pairs_find_every_point_within_one_cell():
+    xs, zs = points(300, 10, seed=1)
+    grid = NeighborGrid(max_per_cell=300)
+    grid.build(xs, zs, 2.0)
+    i, j = grid.pairs(np.arange(300))
+    assert (i != j).all()
+    found = set(zip(i.tolist(), j.tolist()))
+    close = (xs[:, None] - xs) ** 2 + (zs[:, None] - zs) ** 2 < 2.0 ** 2
+    np.fill_diagonal(close, False)
+    expected = set(zip(*map(np.ndarray.tolist, np.nonzero(close))))
+    assert expected <= found
+
+
+def test_pairs_cap_the_neighbours_taken_from_each_cell():
+    xs = np.zeros(50)
+    zs = np.zeros(50)
+    grid = NeighborGrid(max_per_cell=8)
+    grid.build(xs, zs, 1.0)
+    i, j = grid.pairs(np.array([0]))
+    assert len(j) <= 8
+
+
+def test_around_returns_every_point_in_the_overlapping_cells():
+    xs, zs = points(1000, 30, seed=2)
+    grid = NeighborGrid()
+    grid.build(xs, zs, 4.0)
+    for x, z, radius in [(0, 0, 3), (25, -25, 5), (-30, 30, 1), (100, 100, 2)]:
+        rows = grid.around(x, z, radius)
+        assert len(np.unique(rows)) == len(rows)
+        inside = np.flatnonzero((xs - x) ** 2 + (zs - z) ** 2 <= radius * radius)
+        assert set(inside.tolist()) <= set(rows.tolist())
+
+
+def test_around_outside_the_grid_is_empty():
+    grid = NeighborGrid()
+    grid.build(np.array([0.0, 1.0]), np.array([0.0, 1.0]), 1.0)
+    assert len(grid.around(50.0, 50.0, 2.0)) == 0
+    assert len(grid.around(-50.0, 0.5, 2.0)) == 0
+
+
+def test_empty_grid_answers_nothing():
+    grid = NeighborGrid()
+    grid.build(np.zeros(0), np.zeros(0), 1.0)
+    assert len(grid.around(0.0, 0.0, 5.0)) == 0
+
+
+def test_widely_spread_points_grow_the_cells_to_fit_16_bit_ids():
+    xs = np.array([0.0, 5000.0, 2500.0])
+    zs = np.array([0.0, 5000.0, 2500.0])
+    grid = NeighborGrid()
+    grid.build(xs, zs, 1.0)
+    assert grid.width * grid.depth <= NeighborGrid.MAX_CELLS
+    assert grid.cell_size > 1.0
+    assert sorted(grid.order.tolist()) == [0, 1, 2]
+    assert 1 in grid.around(5000.0, 5000.0, 1.0)
+
+
+def test_rebuilding_with_fewer_points_forgets_the_old_ones():
+    grid = NeighborGrid()
+    grid.build(*points(100, 10), 2.0)
+    grid.build(np.array([1.0, 1.5]), np.array([1.0, 1.5]), 2.0)
+    assert sorted(grid.around(1.0, 1.0, 1.0).tolist()) == [0, 1]
+    i, j = grid.pairs(np.array([0, 1]))
+    assert sorted(zip(i.tolist(), j.tolist())) == [(0, 1), (1, 0)]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from layers import BUILDING, OBSTACLE
+from static_colliders import StaticColliders
+
+
+def wall(colliders, name, x0, x1, z0=-5.0, z1=5.0, layer=BUILDING, top=4.0):
+    colliders.add(name, (x0, 0.0, z0), (x1, top, z1), layer)
+
+
+def test_sweep_stops_just_short_of_a_box():
+    colliders = StaticColliders()
+    wall(colliders, 'wall', 3.0, 4.0)
+    x, z, hits = colliders.sweep(0.0, 1.0, 0.0, 5.0, 0.0)
+    assert x == pytest.approx(2.5, abs=1e-2) and x < 2.5
+    assert z == 0.0
+    assert hits == [0]
+
+
+def test_sweep_slides_along_the_face_it_hits():
+    colliders = StaticColliders()
+    wall(colliders, 'wall', 3.0, 4.0)
+    x, z, hits = colliders.sweep(0.0, 1.0, 0.0, 5.0, 2.0)
+    assert x == pytest.approx(2.5, abs=1e-2)
+    assert z == pytest.approx(2.0, abs=1e-2)
+    assert hits == [0]
+
+
+def test_sweep_hits_the_earliest_box_first():
+    colliders = StaticColliders()
+    wall(colliders, 'far', 6.0, 7.0)
+    wall(colliders, 'near', 3.0, 4.0)
+    _, _, hits = colliders.sweep(0.0, 1.0, 0.0, 10.0, 0.0)
+    assert hits[0] == colliders.index_of['near']
+
+
+def test_sweep_ignores_a_box_the_mover_starts_inside():
+    colliders = StaticColliders()
+    wall(colliders, 'wall', -1.0, 1.0)
+    assert colliders.sweep(0.0, 1.0, 0.0, 5.0, 0.0) == (5.0, 0.0, [])
+
+
+def test_sweep_only_tests_masked_layers_and_overlapping_heights():
+    colliders = StaticColliders()
+    wall(colliders, 'obstacle', 3.0, 4.0, layer=OBSTACLE)
+    wall(colliders, 'low', 5.0, 6.0, top=0.2)
+    assert colliders.sweep(0.0, 1.0, 0.0, 8.0, 0.0, mask=BUILDING) == (8.0, 0.0, [])
+    _, _, hits = colliders.sweep(0.0, 1.0, 0.0, 8.0, 0.0, mask=OBSTACLE)
+    assert hits == [0]
+
+
+def test_set_top_lets_movers_pass_over_a_collapsed_box():
+    colliders = StaticColliders()
+    wall(colliders, 'building', 3.0, 4.0)
+    colliders.set_top('building', 0.2)
+    assert colliders.sweep(0.0, 1.0, 0.0, 5.0, 0.0) == (5.0, 0.0, [])
+
+
+def test_sweep_without_movement_or_boxes():
+    colliders = StaticColliders()
+    assert colliders.sweep(1.0, 1.0, 2.0, 3.0, 0.0) == (4.0, 2.0, [])
+    wall(colliders, 'wall', 3.0, 4.0)
+    assert colliders.sweep(1.0, 1.0, 2.0, 0.0, 0.0) == (1.0, 2.0, [])
+
+
+def test_add_grows_past_capacity_and_keeps_every_box():
+    colliders = StaticColliders(capacity=4)
+    for i in range(37):
+        colliders.add(i, (i, 0, 0), (i + 0.5, 1, 1), BUILDING)
+    assert len(colliders) == 37
+    assert colliders.lows.shape == colliders.highs.shape == (37, 3)
+    np.testing.assert_array_equal(colliders.lows[:, 0], np.arange(37))
+    assert colliders.index_of[36] == 36
+
+
+def test_add_many_matches_adding_one_at_a_time():
+    lows = [(i, 0, 0) for i in range(10)]
+    highs = [(i + 0.5, 2, 1) for i in range(10)]
+    layers = [BUILDING if i % 2 else OBSTACLE for i in range(10)]
+    one_by_one, batched = StaticColliders(capacity=4), StaticColliders(capacity=4)
+    for i in range(10):
+        one_by_one.add(i, lows[i], highs[i], layers[i])
+    batched.add_many(range(10), lows, highs, layers)
+    batched.add_many([], [], [], [])
+    for name in ('lows', 'highs', 'layers'):
+        np.testing.assert_array_equal(getattr(batched, name), getattr(one_by_one, name))
+    assert batched.index_of == one_by_one.index_of
+
+
+def test_remove_compacts_and_reindexes():
+    colliders = StaticColliders()
+    for i in range(5):
+        colliders.add(i, (i, 0, 0), (i + 0.5, 1, 1), BUILDING)
+    colliders.remove([1, 3, 'unknown'])
+    assert colliders.entities == [0, 2, 4]
+    assert colliders.index_of == {0: 0, 2: 1, 4: 2}
+    np.testing.assert_array_equal(colliders.lows[:, 0], [0, 2, 4])
+
+    # Boxes added after a removal land after the kept ones
+    colliders.add(5, (5, 0, 0), (5.5, 1, 1), OBSTACLE)
+    np.testing.assert_array_equal(colliders.lows[:, 0], [0, 2, 4, 5])
+    assert colliders.layers_of([0, 3]) == BUILDING | OBSTACLE
+
+
+def test_rekey_hands_a_box_to_its_new_owner():
+    colliders = StaticColliders()
+    wall(colliders, 'entity', 3.0, 4.0)
+    colliders.rekey('entity', 'record')
+    assert colliders.index_of == {'record': 0}
+    assert colliders.entities == ['record']
+    colliders.remove(['record'])
+    assert len(colliders) == 0
@@ -0,0 +1,82 @@
+import pytest
+from timers import Timers
+
+
+def test_timers_fire_in_due_order_then_scheduling_order():
+    timers, fired = Timers(), []
+    timers.after(2.0, fired.append, 'late')
+    timers.after(1.0, fired.append, 'first')
+    timers.after(1.0, fired.append, 'second')
+    timers.advance(0.5)
+    assert fired == []
+    timers.advance(2.0)
+    assert fired == ['first', 'second', 'late']
+    assert len(timers) == 0
+
+
+def test_cancelled_timer_never_fires_and_is_dropped_when_due():
+    timers, fired = Timers(), []
+    timer = timers.after(1.0, fired.append, 'cancelled')
+    timer.cancel()
+    assert not timer.active
+    assert len(timers) == 1  # Still on the heap until it reaches the top
+    timers.advance(1.0)
+    assert fired == [] and not timer.fired
+    assert len(timers) == 0
+
+
+def test_rescheduling_cancels_the_old_timer_and_keeps_the_new_one():
+    timers, fired = Timers(), []
+    old = timers.after(1.0, fired.append, 'old')
+    timers.advance(0.5)
+    old.cancel()
+    new = timers.after(1.0, fired.append, 'new')
+    timers.advance(0.75)  # Past the old due time
+    assert fired == []
+    assert timers.remaining(new) == pytest.approx(0.25)
+    timers.advance(0.25)
+    assert fired == ['new']
+
+
+def test_timer_without_callback_marks_a_span():
+    timers = Timers()
+    cooldown = timers.after(1.0)
+    assert cooldown.active
+    timers.advance(1.0)
+    assert cooldown.fired and not cooldown.active
+    assert timers.remaining(cooldown) == 0.0
+    assert timers.remaining(None) == 0.0
+
+
+def test_callbacks_may_schedule_timers_that_are_already_due():
+    timers, fired = Timers(), []
+
+    def chain():
+        fired.append('chain')
+        timers.after(0.0, fired.append, 'chained')
+
+    timers.after(1.0, chain)
+    timers.advance(1.0)
+    assert fired == ['chain', 'chained']
+
+
+def test_paused_timers_do_not_advance():
+    timers, fired = Timers(), []
+    timer = timers.after(1.0, fired.append, 'done')
+    timers.paused = True
+    timers.advance(5.0)
+    assert fired == [] and timers.time == 0.0
+    assert timers.remaining(timer) == 1.0
+    timers.paused = False
+    timers.advance(1.0)
+    assert fired == ['done']
+
+
+def test_clear_cancels_everything_pending():
+    timers, fired = Timers(), []
+    pending = [timers.after(delay, fired.append, delay) for delay in (1.0, 2.0)]
+    timers.clear()
+    assert len(timers) == 0
+    assert not any(timer.active for timer in pending)
+    timers.advance(3.0)
+    assert fired == []
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from trail import TrailBuffer, TrailGrid
+
+
+def walk(trail, steps):
+    """Push the head along +x, exactly one sample spacing per push"""
+    for i in range(steps):
+        trail.push((i * trail.sample_spacing, 1.0, 0.0))
+
+
+def test_ring_wraps_and_keeps_newest_samples():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=8)
+    walk(trail, 20)
+    assert trail.count == 8
+    assert trail.total == 20
+    assert trail.newest == 19 % 8
+    np.testing.assert_array_equal(trail.ordered_samples()[:, 0], np.arange(12, 20) * 0.5)
+
+
+def test_ensure_length_unrolls_a_wrapped_ring_oldest_first():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=8)
+    walk(trail, 13)
+    before = trail.ordered_samples()
+    trail.ensure_length(15.0)
+    assert trail.capacity == 32
+    assert trail.newest == 7
+    np.testing.assert_array_equal(trail.ordered_samples(), before)
+
+    # Writing carries on after the unrolled samples
+    trail.push((6.5, 1.0, 0.0))
+    assert trail.count == 9
+    assert trail.ordered_samples()[-1, 0] == 6.5
+
+
+def test_push_emits_evenly_spaced_samples_and_tracks_lead():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=64)
+    trail.push((0, 0, 0))
+    trail.push((1.75, 0, 0))
+    np.testing.assert_array_equal(trail.ordered_samples()[:, 0], [0, 0.5, 1.0, 1.5])
+    assert trail.lead == pytest.approx(0.25)
+
+
+def test_segment_positions_follow_the_path_behind_the_head():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=16)
+    walk(trail, 40)  # Wraps the ring more than twice
+    trail.push((19.75, 1.0, 0.0))  # Head half a sample past the newest one
+    positions = trail.segment_positions(3, 1.0)
+    np.testing.assert_allclose(positions[:, 0], [18.75, 17.75, 16.75])
+    np.testing.assert_array_equal(positions[:, 1], 1.0)
+
+
+def test_segment_positions_clamp_to_the_oldest_sample():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=8)
+    walk(trail, 20)
+    np.testing.assert_array_equal(trail.segment_positions(2, 10.0)[:, 0], [6.0, 6.0])
+
+
+def test_segment_positions_before_any_sample_sit_on_the_head():
+    trail = TrailBuffer()
+    trail.head[:] = (1, 2, 3)
+    np.testing.assert_array_equal(trail.segment_positions(2, 0.5), [[1, 2, 3], [1, 2, 3]])
+
+
+def test_segment_positions_grow_their_scratch_buffers():
+    trail = TrailBuffer(sample_spacing=0.5, capacity=256)
+    walk(trail, 200)
+    assert trail.segment_positions(100, 0.5).shape == (100, 3)
+
+
+def test_clear_empties_ring_and_grid():
+    grid = TrailGrid()
+    trail = TrailBuffer(sample_spacing=0.5, capacity=8, grid=grid)
+    walk(trail, 5)
+    trail.clear()
+    assert trail.count == 0
+    assert not grid.cells and not grid.order
+    trail.push((7, 0, 0))
+    np.testing.assert_array_equal(trail.ordered_samples(), [[7, 0, 0]])
+
+
+def test_grid_ignores_samples_too_close_to_the_head_and_evicted_ones():
+    grid = TrailGrid(cell_size=1.0)
+    trail = TrailBuffer(sample_spacing=0.5, capacity=64, grid=grid)
+    walk(trail, 30)  # Samples 0..29 at x = 0.0..14.5
+    assert grid.hit(5.0, 0.0, 0.1, newest_serial=29)
+    assert not grid.hit(12.5, 0.0, 0.1, newest_serial=20)  # Sample 25 is newer than 20
+    grid.evict_before(15)
+    assert not grid.hit(5.0, 0.0, 0.1, newest_serial=29)
+    assert grid.hit(7.5, 0.0, 0.1, newest_serial=29)
+    assert len(grid.order) == 15